@@ -1,21 +1,10 @@
-from openai import OpenAI
 import json
 import requests
-import os
-from dotenv import load_dotenv
+from llm_client import complete_hedged, LLM_BASE_URL, DEFAULT_LLM_BASE_URL, LLM_API_KEY
 
-load_dotenv()
-
-api_key = os.getenv("OPEN_ROUTER_KEY")
-
-if not api_key:
+if not LLM_API_KEY and LLM_BASE_URL == DEFAULT_LLM_BASE_URL:
     raise ValueError("API key not found in .env file")
 
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=api_key
-)
-
 def ask_ai_to_generate_test(url, tag_dict, username, password):
     system_prompt = """
 You are a deterministic automation test generator.
@@ -48,16 +37,14 @@ Return minimal, clean, working code.
       "code": "complete pytest code"
     }}
     """
-    response = client.chat.completions.create(
-        model="nvidia/nemotron-nano-9b-v2:free",
+    # shared pooled client: rate-limit scheduling, retries and model failover (llm_client.py)
+    raw_output = complete_hedged(
         messages=[
             {"role": "system", "content": system_prompt},
             {"role": "user", "content": user_prompt}
         ],
         temperature=0  # ✅ fully deterministic
-    )
-
-    raw_output = response.choices[0].message.content
+    )["text"]
 
     try:
         plan = json.loads(raw_output)
@@ -1,13 +1,78 @@
-from openai import OpenAI
-import json, os
-from dotenv import load_dotenv
+import json
+from dom_pruner import prune_tag_dict, estimate_tokens, PROMPT_DOM_PRUNING, PROMPT_DOM_TOKEN_BUDGET
+from llm_cache import get_llm_cache, dom_fingerprint, make_cache_key, LLM_CACHE_BYPASS
+from llm_client import complete_hedged, is_json_answer, LLM_MODELS
+from tracing import span, traced, record_cache_lookup, LLM_CALLS, LLM_TOKENS, PROMPT_TOKENS
 
-load_dotenv()
+# Primary model; also part of the LLM cache key (hedges to LLM_MODELS[1:] share its entries)
+MODEL_NAME = LLM_MODELS[0]
 
-api_key = os.getenv("OPEN_ROUTER_KEY")
-client = OpenAI(base_url="https://openrouter.ai/api/v1", api_key=api_key)
+
+def _complete(system_prompt, user_prompt, kind="step"):
+    """
+    Sends one chat completion to the configured LLM endpoint and returns the
+    stripped text. Deadline-bounded and hedged across LLM_MODELS; the first
+    answer containing a JSON object wins.
+    """
+    prompt_estimate = estimate_tokens(system_prompt) + estimate_tokens(user_prompt)
+    PROMPT_TOKENS.observe(prompt_estimate)
+    LLM_CALLS.inc(kind=kind)
+
+    with span("llm_call", model=MODEL_NAME, kind=kind, prompt_tokens_estimate=prompt_estimate) as attrs:
+        result = complete_hedged(
+            messages=[
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            validate=is_json_answer,
+            temperature=0
+        )
+        attrs["model"] = result["model"]
+        attrs["attempts"] = result["attempts"]
+        attrs["queue_seconds"] = result["queue_seconds"]
+        usage = result["usage"]
+        if usage is not None:
+            attrs["prompt_tokens"] = usage.prompt_tokens
+            attrs["completion_tokens"] = usage.completion_tokens
+            LLM_TOKENS.inc(usage.prompt_tokens or 0, kind="prompt")
+            LLM_TOKENS.inc(usage.completion_tokens or 0, kind="completion")
+    return result["text"]
+
+
+def _failed_goals(history):
+    """Goals that already failed this run (part of the cache key)."""
+    return [h.get("goal") for h in history or [] if not h.get("success")]
+
+
+def record_step_outcome(answer, success):
+    """
+    Caches a step answer only once its code has run successfully; evicts it
+    when it failed (so a cached answer that stopped working is asked again).
+    """
+    cache_key = answer.get("cache_key")
+    if not cache_key:
+        return
+    cache = get_llm_cache()
+    if success:
+        cache.set(cache_key, {"goal": answer.get("goal"), "code": answer.get("code")}, model=MODEL_NAME)
+    else:
+        cache.delete(cache_key)
 
 
+def record_plan_outcome(plan, success):
+    """Caches a plan once all of its steps succeeded; evicts it when one failed."""
+    cache_key = plan[0].get("cache_key") if plan else None
+    if not cache_key:
+        return
+    cache = get_llm_cache()
+    if success:
+        steps = [{"goal": step.get("goal"), "code": step.get("code")} for step in plan]
+        cache.set(cache_key, {"steps": steps}, model=MODEL_NAME)
+    else:
+        cache.delete(cache_key)
+
+
+@traced("generate_step")
 def ask_ai_to_generate_test(
     url,
     tag_dict,
@@ -16,7 +81,10 @@ def ask_ai_to_generate_test(
     history=None,
     ui_user_prompt=None,
     global_steps=None,          # 🔥 NEW
-    next_required_step=None     # 🔥 NEW
+    next_required_step=None,    # 🔥 NEW
+    prune_dom=PROMPT_DOM_PRUNING,
+    dom_token_budget=PROMPT_DOM_TOKEN_BUDGET,
+    bypass_cache=LLM_CACHE_BYPASS
 ):
     """
     Deterministic Selenium step generator.
@@ -31,10 +99,43 @@ def ask_ai_to_generate_test(
 
 
     # --------------------------
-    # 🧩 Build final prompt sent to LLM
+    # ⚡ Response cache (same DOM + step + steps + model → same answer at temperature=0)
+    # --------------------------
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        dom_fingerprint(tag_dict),
+        next_required_step,
+        global_steps,
+        MODEL_NAME,
+        extra=[username, password],  # credentials end up inside the generated code
+        failures=_failed_goals(history),
+    )
+    if not bypass_cache:
+        cached = cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            print(f"⚡ LLM cache hit (hit rate {cache.hit_rate():.0%}) → goal: {cached.get('goal')}")
+            return {**cached, "cache_key": cache_key, "cached": True}
+
+    # --------------------------
+    # ✂️ Keep only DOM elements relevant to this step
     # --------------------------
-    step_index = len(history or [])
+    full_dom_text = json.dumps(tag_dict, indent=2)
+    if prune_dom:
+        dom_text, prune_stats = prune_tag_dict(tag_dict, next_required_step, dom_token_budget)
+        full_tokens = estimate_tokens(full_dom_text)
+        saved = full_tokens - prune_stats["tokens_pruned"]
+        print(
+            f"✂️ DOM pruned: {full_tokens} → {prune_stats['tokens_pruned']} tokens "
+            f"(saved ~{saved}, kept {prune_stats['elements_kept']}/{prune_stats['elements_total']} elements, "
+            f"{prune_stats['products_kept']}/{prune_stats['products_total']} products)"
+        )
+    else:
+        dom_text = full_dom_text
 
+    # --------------------------
+    # 🧩 Build final prompt sent to LLM
+    # --------------------------
     final_prompt = f"""
 Current URL: {url}
 
@@ -48,7 +149,7 @@ All Global Steps:
 {json.dumps(global_steps, indent=2)}
 
 DOM Metadata:
-{json.dumps(tag_dict, indent=2)}
+{dom_text}
 
 Credentials:
 username = {username}
@@ -105,18 +206,9 @@ from selenium.webdriver.common.by import By
     print("======================================================\n")
 
     # --------------------------
-    # 📤 Send prompt to OpenRouter
+    # 📤 Send prompt to the LLM endpoint
     # --------------------------
-    response = client.chat.completions.create(
-        model="nvidia/nemotron-nano-9b-v2:free",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": final_prompt}
-        ],
-        temperature=0
-    )
-
-    raw = response.choices[0].message.content.strip()
+    raw = _complete(system_prompt, final_prompt)
 
     # --------------------------
     # 🧾 Safe JSON extraction
@@ -125,8 +217,131 @@ from selenium.webdriver.common.by import By
         json_str = raw[raw.index("{"): raw.rindex("}") + 1]
         parsed = json.loads(json_str)
         print(f"✅ Model returned goal: {parsed.get('goal')}")
+        # cached by record_step_outcome() once the code has actually worked
+        if not bypass_cache and parsed.get("goal") not in ("no_action", "parse_error"):
+            parsed["cache_key"] = cache_key
         return parsed
 
     except Exception:
         print("⚠️ JSON parsing failed. Raw output:\n", raw)
         return {"goal": "parse_error", "code": raw}
+
+
+@traced("generate_plan")
+def ask_ai_to_generate_plan(
+    url,
+    tag_dict,
+    username,
+    password,
+    history=None,
+    ui_user_prompt=None,
+    global_steps=None,
+    start_index=0,
+    prune_dom=PROMPT_DOM_PRUNING,
+    dom_token_budget=PROMPT_DOM_TOKEN_BUDGET,
+    bypass_cache=LLM_CACHE_BYPASS
+):
+    """
+    Plan-ahead generator.
+    Produces code for ALL remaining global steps (from start_index) in one call.
+    Returns a list of {"goal", "code"} dicts, one per remaining step, or [] on failure.
+    """
+
+    if not global_steps:
+        raise ValueError("global_steps is required but missing.")
+
+    remaining_steps = global_steps[start_index:]
+    if not remaining_steps:
+        return []
+
+    # --------------------------
+    # ⚡ Response cache (plans share the step cache, keyed on the remaining steps)
+    # --------------------------
+    cache = get_llm_cache()
+    cache_key = make_cache_key(
+        dom_fingerprint(tag_dict),
+        "plan:" + " | ".join(remaining_steps),
+        global_steps,
+        MODEL_NAME,
+        extra=[username, password],
+        failures=_failed_goals(history),
+    )
+    if not bypass_cache:
+        cached = cache.get(cache_key)
+        record_cache_lookup("llm", cached is not None)
+        if cached is not None:
+            print(f"⚡ LLM cache hit for plan ({len(cached.get('steps', []))} steps)")
+            return [{**step, "cache_key": cache_key, "cached": True} for step in cached.get("steps", [])]
+
+    if prune_dom:
+        dom_text, _ = prune_tag_dict(tag_dict, " ".join(remaining_steps), dom_token_budget)
+    else:
+        dom_text = json.dumps(tag_dict, indent=2)
+
+    numbered = "\n".join(f"{i + 1}. {step}" for i, step in enumerate(remaining_steps))
+
+    final_prompt = f"""
+Current URL: {url}
+
+Completed History:
+{json.dumps(history or [], indent=2)}
+
+Remaining Steps (from UI, in order):
+{numbered}
+
+DOM Metadata (current page only):
+{dom_text}
+
+Credentials:
+username = {username}
+password = {password}
+
+User Freeform Prompt (optional):
+"{ui_user_prompt or ''}"
+
+IMPORTANT PLANNING RULES:
+- Return one entry per remaining step, in the same order.
+- The FIRST step runs on the current page: ONLY use elements present in DOM metadata.
+- Later steps may run on pages you cannot see. Use locators you can reasonably
+  infer (visible text, names, data-test values that follow the same pattern).
+- If you cannot infer any locator for a step, return {{"goal": "no_action", "code": ""}} for it.
+- Each "code" must do ONLY its own step.
+
+Return ONLY valid JSON:
+{{
+  "steps": [
+    {{"goal": "<step text>", "code": "Python Selenium code for ONLY this step"}}
+  ]
+}}
+"""
+
+    system_prompt = """
+You are a STRICT deterministic Selenium automation agent.
+You plan ALL remaining steps of an externally provided sequence at once.
+Return ONLY valid JSON with a "steps" list of {"goal", "code"} objects.
+
+Always include this import at the top of each code block:
+
+from selenium.webdriver.common.by import By
+"""
+
+    print(f"🗺 Asking model to plan {len(remaining_steps)} remaining steps in one call...")
+    raw = _complete(system_prompt, final_prompt, kind="plan")
+
+    try:
+        json_str = raw[raw.index("{"): raw.rindex("}") + 1]
+        steps = json.loads(json_str).get("steps", [])
+        plan = [
+            {"goal": str(step.get("goal", "no_action")), "code": str(step.get("code", ""))}
+            for step in steps if isinstance(step, dict)
+        ][:len(remaining_steps)]
+    except Exception:
+        print("⚠️ Plan JSON parsing failed. Raw output:\n", raw[:500])
+        return []
+
+    print(f"✅ Model planned {len(plan)} steps")
+    # cached by record_plan_outcome() once every planned step has worked
+    if not bypass_cache:
+        for step in plan:
+            step["cache_key"] = cache_key
+    return plan
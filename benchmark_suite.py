@@ -0,0 +1,475 @@
+# benchmark_suite.py
+import argparse
+import functools
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+
+# --- Configuration ---
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_fixtures")
+BENCHMARK_OUTPUT_DIR = os.getenv("BENCHMARK_OUTPUT_DIR", "benchmark_results")
+RESULTS_VERSION = 1
+
+SYNTHETIC_SIZES = (1_000, 10_000, 100_000)
+QUICK_SYNTHETIC_SIZES = (1_000, 10_000)
+MEMORY_ROWS = 100_000
+QUICK_MEMORY_ROWS = 20_000
+
+# Benchmarks must never touch the real DBs, caches, recordings or the network.
+_SCRATCH_DIR = tempfile.mkdtemp(prefix="agent-bench-")
+os.environ.setdefault("OPEN_ROUTER_KEY", "benchmark-offline")
+os.environ["LLM_CACHE_PATH"] = os.path.join(_SCRATCH_DIR, "llm_cache.db")
+os.environ["LLM_CACHE_BYPASS"] = "1"
+os.environ["TRACE_EXPORT"] = "0"
+os.environ["AGENT_RECORD_RUNS"] = "0"
+os.environ.setdefault("BROWSER_HEADLESS", "1")
+
+
+# ---------------------------------------------------------
+# FIXTURE SITES (local HTTP)
+# ---------------------------------------------------------
+
+def synthetic_page(nodes, seed=0):
+    """
+    Deterministic page with roughly `nodes` elements: product grids, deeply
+    nested wrappers, forms and plain content sections.
+    """
+    rng = random.Random(seed)
+    parts = ["<!DOCTYPE html><html><head><title>Synthetic</title></head><body>",
+             '<div class="inventory_list">']
+    count, i = 4, 0
+
+    while count < nodes:
+        kind = i % 4
+        if kind == 0:
+            parts.append(
+                f'<div class="inventory_item" data-test="inventory-item">'
+                f'<img src="img/{i}.jpg" alt="Product {i}">'
+                f'<div class="inventory_item_name">Product {i}</div>'
+                f'<div class="inventory_item_price">${rng.randint(1, 99)}.99</div>'
+                f'<button id="add-to-cart-{i}" data-test="add-to-cart-{i}" class="btn">Add to cart</button>'
+                f'</div>'
+            )
+            count += 5
+        elif kind == 1:
+            depth = rng.randint(10, 60)
+            parts.append('<div class="wrap">' * depth + f'<a href="p/{i}.html">Link {i}</a>' + "</div>" * depth)
+            count += depth + 1
+        elif kind == 2:
+            parts.append(
+                f'<form><label for="f{i}">Field {i}</label>'
+                f'<input id="f{i}" name="f{i}" type="text" placeholder="Field {i}">'
+                f'<select name="s{i}"><option>a</option><option>b</option></select></form>'
+            )
+            count += 6
+        else:
+            parts.append(f"<section><h2>Section {i}</h2><p>Lorem <span>ipsum</span> {i}</p>"
+                         f"<ul><li>one</li><li>two</li></ul></section>")
+            count += 7
+        i += 1
+
+    parts.append("</div></body></html>")
+    return "".join(parts)
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """Static fixtures, plus /synthetic/<nodes>.html generated on demand."""
+
+    def do_GET(self):
+        match = re.match(r"^/synthetic/(\d+)\.html$", self.path)
+        if not match:
+            return super().do_GET()
+
+        body = _synthetic_cache(int(match.group(1))).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@functools.lru_cache(maxsize=8)
+def _synthetic_cache(nodes):
+    return synthetic_page(nodes)
+
+
+class FixtureServer:
+    """Serves benchmark_fixtures/ on a free localhost port from a daemon thread."""
+
+    def __init__(self, directory=FIXTURES_DIR):
+        handler = functools.partial(_FixtureHandler, directory=directory)
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.base_url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def fetch(self, path):
+        with urllib.request.urlopen(f"{self.base_url}/{path.lstrip('/')}") as response:
+            return response.read().decode("utf-8")
+
+
+# ---------------------------------------------------------
+# TIMING
+# ---------------------------------------------------------
+
+def measure(fn, repeat=5, warmup=1, **extra):
+    """Runs `fn` warmup + repeat times; returns timing stats in seconds."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return _stats(samples, **extra)
+
+
+def _stats(samples, **extra):
+    ordered = sorted(samples)
+    return {
+        "seconds": statistics.median(ordered),
+        "min": ordered[0],
+        "max": ordered[-1],
+        "p99": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+        "runs": len(ordered),
+        **extra,
+    }
+
+
+# ---------------------------------------------------------
+# BENCHMARKS
+# ---------------------------------------------------------
+
+def bench_extract(server, sizes, include_bs4=False):
+    from locator_extractor_1 import extract_dom_metadata
+
+    results = {}
+    pages = {"saucedemo_login": server.fetch("saucedemo/index.html")}
+    pages.update({f"synthetic_{n}": server.fetch(f"synthetic/{n}.html") for n in sizes})
+
+    for name, html in pages.items():
+        repeat = 3 if len(html) > 2_000_000 else 5
+        results[f"extract_dom_metadata.lxml.{name}"] = measure(
+            lambda: extract_dom_metadata(html, backend="lxml"), repeat=repeat, html_chars=len(html))
+        # the legacy scanner is quadratic; only time it on small pages
+        if include_bs4 and len(html) < 200_000:
+            results[f"extract_dom_metadata.bs4.{name}"] = measure(
+                lambda: extract_dom_metadata(html, backend="bs4"), repeat=1, warmup=0, html_chars=len(html))
+    return results
+
+
+def bench_prompt_parsing(server):
+    from chat_routes import extract_test_parameters, parse_steps_from_ui_prompt
+
+    # every prompt carries URL + credentials, so extract_test_parameters stays on the regex path
+    steps = "\n".join(f"{i}. Click the button number {i} and check the result" for i in range(1, 21))
+    prompts = [f"Test {server.base_url}/saucedemo/index.html username: standard_user password: secret_sauce\n{steps}"]
+    prompts += [f"Go to https://example.com/shop/{i} username=user_{i} password=pw_{i}\n"
+                f"- log in\n* add item {i}\n+ checkout\n3) confirm order" for i in range(99)]
+
+    loops = 20
+    return {
+        "parse_steps_from_ui_prompt": measure(
+            lambda: [parse_steps_from_ui_prompt(p) for _ in range(loops) for p in prompts],
+            calls=loops * len(prompts)),
+        "extract_test_parameters.regex": measure(
+            lambda: [extract_test_parameters(p) for _ in range(loops) for p in prompts],
+            calls=loops * len(prompts)),
+    }
+
+
+def bench_memory_db(rows):
+    import memory_db_1
+
+    memory_db_1.DB_PATH = os.path.join(_SCRATCH_DIR, f"memory_{rows}.db")
+    rng = random.Random(1)
+    hosts = [f"shop{h}.example.com" for h in range(20)]
+    goals = [f"Step goal number {g}" for g in range(50)]
+
+    def row(i):
+        host = hosts[i % len(hosts)]
+        return (host, f"https://{host}/page/{i % 200}", goals[i % len(goals)],
+                f"driver.find_element(By.ID, 'el-{i}').click()", f"summary {i}", ["a", "b"], True)
+
+    memory_db_1.init_db()
+    results = {}
+
+    # inline writes (one commit per step, the old behaviour)
+    sync_rows = min(rows, 5_000)
+    memory_db_1.ASYNC_WRITES = False
+    started = time.perf_counter()
+    for i in range(sync_rows):
+        memory_db_1.save_step_memory(*row(i))
+    elapsed = time.perf_counter() - started
+    results["memory_db.write.sync"] = _stats([elapsed / sync_rows], rows=sync_rows,
+                                             rows_per_second=round(sync_rows / elapsed))
+
+    # queued + batched writes, including the final flush
+    memory_db_1.ASYNC_WRITES = True
+    started = time.perf_counter()
+    for i in range(sync_rows, rows):
+        memory_db_1.save_step_memory(*row(i))
+    memory_db_1.flush_writes()
+    elapsed = time.perf_counter() - started
+    async_rows = rows - sync_rows
+    if async_rows:
+        results["memory_db.write.batched"] = _stats([elapsed / async_rows], rows=async_rows,
+                                                    rows_per_second=round(async_rows / elapsed))
+
+    lookups = [row(rng.randrange(rows)) for _ in range(2_000)]
+    samples = []
+    for base_url, page_url, goal, *_ in lookups:
+        started = time.perf_counter()
+        memory_db_1.get_cached_success(base_url, page_url, goal)
+        samples.append(time.perf_counter() - started)
+    results["memory_db.get_cached_success"] = _stats(samples, table_rows=rows)
+
+    samples = []
+    for base_url, page_url, *_ in lookups:
+        started = time.perf_counter()
+        memory_db_1.get_recent_steps(base_url, page_url, limit=5)
+        samples.append(time.perf_counter() - started)
+    results["memory_db.get_recent_steps"] = _stats(samples, table_rows=rows)
+    return results
+
+
+def bench_page_keys(server, visits_count=2_000):
+    """Step-memory hit rate on raw URLs vs canonical page keys + fingerprints, for URL variants of one site."""
+    from locator_extractor_1 import extract_dom_metadata
+    from page_identity import canonicalize_url, page_fingerprint, hit_rate_report
+
+    rng = random.Random(7)
+    base = server.base_url + "/saucedemo"
+    pages = {name: page_fingerprint(extract_dom_metadata(server.fetch(f"saucedemo/{name}.html")))
+             for name in ("index", "inventory", "cart")}
+    goals = {"index": "Log in with the given credentials",
+             "inventory": "Add the Sauce Labs Backpack to the cart",
+             "cart": "Verify the backpack is in the cart"}
+
+    def variant(name):
+        url = f"{base}/{name}.html"
+        if name == "inventory":
+            url += f"?id={rng.randrange(6)}"
+        if rng.random() < 0.3:
+            url += ("&" if "?" in url else "?") + f"utm_source=mail&sessionid={rng.getrandbits(64):x}"
+        if rng.random() < 0.2:
+            url += "#top"
+        return url
+
+    visits = []
+    for _ in range(visits_count):
+        name = rng.choice(list(pages))
+        visits.append((server.base_url, variant(name), goals[name], pages[name]))
+
+    report = hit_rate_report(visits)
+    urls = [url for _, url, _, _ in visits]
+    return {"page_identity.canonicalize_url": measure(lambda: [canonicalize_url(u) for u in urls],
+                                                      calls=len(urls), **report)}
+
+
+# Scripted model answers for the saucedemo fixture, keyed by required step
+SAUCEDEMO_STEPS = {
+    "Log in with the given credentials": (
+        "driver.find_element(By.ID, 'user-name').send_keys('standard_user')\n"
+        "driver.find_element(By.ID, 'password').send_keys('secret_sauce')\n"
+        "driver.find_element(By.ID, 'login-button').click()\n"
+        "WebDriverWait(driver, 5).until(EC.url_contains('inventory'))"
+    ),
+    "Add the Sauce Labs Backpack to the cart": (
+        "WebDriverWait(driver, 5).until(EC.element_to_be_clickable((By.ID, 'add-to-cart-sauce-labs-backpack'))).click()\n"
+        "assert driver.find_element(By.ID, 'cart-badge').text == '1'"
+    ),
+    "Open the cart": (
+        "driver.find_element(By.CLASS_NAME, 'shopping_cart_link').click()\n"
+        "WebDriverWait(driver, 5).until(EC.url_contains('cart'))"
+    ),
+    "Verify the backpack is in the cart": (
+        "names = [e.text for e in driver.find_elements(By.CLASS_NAME, 'inventory_item_name')]\n"
+        "assert 'Sauce Labs Backpack' in names"
+    ),
+}
+
+
+def stub_llm(latency_ms=0):
+    """Replaces the model round trip with scripted answers (prompt building still runs)."""
+    import ai_test_generator_1
+
+    def complete(system_prompt, user_prompt, kind="step"):
+        if latency_ms:
+            time.sleep(latency_ms / 1000)
+        match = re.search(r'Next Required Step \(from UI\):\s*"(.*?)"', user_prompt)
+        step = match.group(1) if match else ""
+        return json.dumps({"goal": step, "code": SAUCEDEMO_STEPS.get(step, "")})
+
+    ai_test_generator_1._complete = complete
+
+
+def bench_agent_run(server, llm_latency_ms=0):
+    import memory_db_1
+    from browser_pool import get_browser_pool, shutdown_browser_pool
+    from controller_1 import run_agentic_test_with_details
+
+    stub_llm(llm_latency_ms)
+    memory_db_1.DB_PATH = os.path.join(_SCRATCH_DIR, "agent_memory.db")
+    url = f"{server.base_url}/saucedemo/index.html"
+    results = {}
+
+    try:
+        started = time.perf_counter()
+        get_browser_pool().start()
+        results["browser_pool.start"] = _stats([time.perf_counter() - started])
+
+        # cold: every step goes through the (stubbed) LLM; warm: replayed from step memory
+        for label in ("cold", "warm"):
+            started = time.perf_counter()
+            details = run_agentic_test_with_details(
+                url, "standard_user", "secret_sauce",
+                global_steps=list(SAUCEDEMO_STEPS), max_steps=8,
+                artifacts_dir=_SCRATCH_DIR, record=False,
+            )
+            results[f"run_agentic_test.saucedemo.{label}"] = _stats(
+                [time.perf_counter() - started],
+                passed=details["passed"],
+                llm_calls=details["llm_calls"],
+                agent_steps=details["agent_steps"],
+                settle_seconds=details["settle_seconds"],
+                phase_seconds=details.get("phase_seconds", {}),
+            )
+    finally:
+        shutdown_browser_pool()
+    return results
+
+
+# ---------------------------------------------------------
+# RESULTS + BASELINE COMPARISON
+# ---------------------------------------------------------
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare_results(current, baseline, threshold=0.25):
+    """
+    Compares median seconds per benchmark. Returns rows of
+    (name, baseline_s, current_s, ratio, status) with status in
+    regression / improvement / ok / new.
+    """
+    rows = []
+    for name, result in sorted(current["results"].items()):
+        base = baseline["results"].get(name)
+        if base is None or not base.get("seconds"):
+            rows.append((name, None, result["seconds"], None, "new"))
+            continue
+        ratio = result["seconds"] / base["seconds"]
+        status = "regression" if ratio > 1 + threshold else "improvement" if ratio < 1 - threshold else "ok"
+        rows.append((name, base["seconds"], result["seconds"], ratio, status))
+    return rows
+
+
+def print_comparison(rows):
+    emoji = {"regression": "❌", "improvement": "🚀", "ok": "✅", "new": "🆕"}
+    for name, base, cur, ratio, status in rows:
+        if ratio is None:
+            print(f"{emoji[status]} {name}: {cur * 1000:.3f}ms (no baseline)")
+        else:
+            print(f"{emoji[status]} {name}: {base * 1000:.3f}ms → {cur * 1000:.3f}ms ({ratio:.2f}x)")
+
+
+def run_benchmarks(groups, quick=False, include_bs4=False, llm_latency_ms=0):
+    results = {}
+    with FixtureServer() as server:
+        if "extract" in groups:
+            print("🧬 Benchmarking DOM extraction...")
+            results.update(bench_extract(server, QUICK_SYNTHETIC_SIZES if quick else SYNTHETIC_SIZES, include_bs4))
+        if "prompt" in groups:
+            print("📝 Benchmarking prompt parsing...")
+            results.update(bench_prompt_parsing(server))
+        if "memory" in groups:
+            print("💾 Benchmarking memory DB...")
+            results.update(bench_memory_db(QUICK_MEMORY_ROWS if quick else MEMORY_ROWS))
+        if "pagekey" in groups:
+            print("🔑 Measuring step-memory hit rate: raw URLs vs page keys...")
+            results.update(bench_page_keys(server))
+            keyed = results["page_identity.canonicalize_url"]
+            print(f"📊 Hit rate: raw URL {keyed['raw_url_hit_rate']:.1%} → page key {keyed['page_key_hit_rate']:.1%}")
+        if "agent" in groups:
+            print("🤖 Benchmarking a full agent run (stubbed LLM)...")
+            try:
+                results.update(bench_agent_run(server, llm_latency_ms))
+            except Exception as e:
+                print(f"⚠️ Agent run benchmark skipped: {type(e).__name__}: {e}")
+
+    return {
+        "version": RESULTS_VERSION,
+        "meta": {
+            "timestamp": time.time(),
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "quick": quick,
+        },
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline benchmarks for extraction, memory and the agent loop.")
+    parser.add_argument("--only", default="extract,prompt,memory,pagekey,agent",
+                        help="Comma-separated groups: extract, prompt, memory, pagekey, agent")
+    parser.add_argument("--quick", action="store_true", help="Smaller pages and tables")
+    parser.add_argument("--bs4", action="store_true", help="Also time the legacy bs4 extractor on small pages")
+    parser.add_argument("--llm-latency-ms", type=float, default=0, help="Simulated model latency for the agent run")
+    parser.add_argument("--output", help="Results JSON path (default: benchmark_results/<timestamp>.json)")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", metavar="PATH", help="Also write the results to PATH")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Allowed slowdown before flagging (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    try:
+        report = run_benchmarks(set(args.only.split(",")), quick=args.quick,
+                                include_bs4=args.bs4, llm_latency_ms=args.llm_latency_ms)
+    finally:
+        shutil.rmtree(_SCRATCH_DIR, ignore_errors=True)
+
+    output = args.output or os.path.join(BENCHMARK_OUTPUT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for path in filter(None, [output, args.save_baseline]):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"📊 Results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            rows = compare_results(report, json.load(f), args.threshold)
+        print_comparison(rows)
+        if any(status == "regression" for *_, status in rows):
+            sys.exit(1)
+    else:
+        for name, result in sorted(report["results"].items()):
+            print(f"⏱ {name}: {result['seconds'] * 1000:.3f}ms")
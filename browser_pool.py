@@ -0,0 +1,329 @@
+# browser_pool.py
+import os
+import threading
+import time
+from contextlib import contextmanager
+from browser_session import BrowserSession
+from tracing import traced
+
+try:
+    import psutil  # optional: only needed for RSS-based recycling
+except ImportError:
+    psutil = None
+
+# --- Configuration ---
+POOL_MIN_SIZE = int(os.getenv("BROWSER_POOL_MIN", "1"))
+POOL_MAX_SIZE = int(os.getenv("BROWSER_POOL_MAX", "4"))
+POOL_MAX_USES = int(os.getenv("BROWSER_POOL_MAX_USES", "20"))
+POOL_MAX_RSS_MB = int(os.getenv("BROWSER_POOL_MAX_RSS_MB", "1500"))
+# Recycle browsers older than this many seconds (0 = no age limit)
+POOL_MAX_AGE_SECONDS = float(os.getenv("BROWSER_POOL_MAX_AGE_SECONDS", "1800"))
+POOL_LEASE_TIMEOUT = float(os.getenv("BROWSER_POOL_LEASE_TIMEOUT", "120"))
+
+
+class BrowserPoolTimeout(RuntimeError):
+    """Raised when no browser becomes available within the lease timeout."""
+
+
+class _PooledBrowser:
+    """Book-keeping wrapper around one pre-launched BrowserSession."""
+
+    def __init__(self, session):
+        self.session = session
+        self.uses = 0
+        self.created_at = time.time()
+
+
+def _driver_rss_mb(driver):
+    """Resident memory of chromedriver + every Chrome process it spawned (MB)."""
+    if psutil is None:
+        return None
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        procs = [root] + root.children(recursive=True)
+        return sum(p.memory_info().rss for p in procs) / (1024 * 1024)
+    except Exception:
+        return None
+
+
+class BrowserPool:
+    """
+    Pool of warm headless Chrome sessions.
+
+    Runs lease a BrowserSession, and get it back reset to a blank state:
+    cookies and storage cleared, extra tabs closed, about:blank loaded.
+    Instances are recycled after `max_uses` leases, once their RSS goes
+    over `max_rss_mb`, or once they are older than `max_age_seconds`.
+    """
+
+    def __init__(self, min_size=POOL_MIN_SIZE, max_size=POOL_MAX_SIZE,
+                 max_uses=POOL_MAX_USES, max_rss_mb=POOL_MAX_RSS_MB,
+                 max_age_seconds=POOL_MAX_AGE_SECONDS, headless=True):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError("Browser pool needs 1 <= max_size and min_size <= max_size")
+
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_rss_mb = max_rss_mb
+        self.max_age_seconds = max_age_seconds
+        self.headless = headless
+
+        self._idle = []
+        self._total = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+    # ---------------------------------------------------------
+    # LAUNCH / DISCARD
+    # ---------------------------------------------------------
+
+    def _launch(self):
+        session = BrowserSession(headless=self.headless).start()
+        return _PooledBrowser(session)
+
+    def _discard(self, entry):
+        try:
+            entry.session.close()
+        except Exception as e:
+            print(f"⚠️ Browser shutdown error: {e}")
+
+    def start(self):
+        """Pre-launches `min_size` browsers so the first runs skip Chrome startup."""
+        while True:
+            with self._cond:
+                if self._closed or self._total >= self.min_size:
+                    return self
+                self._total += 1
+
+            try:
+                entry = self._launch()
+            except Exception:
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                closed = self._closed
+                if closed:
+                    self._total -= 1
+                else:
+                    self._idle.append(entry)
+                    self._cond.notify()
+            if closed:
+                # pool was shut down while Chrome was starting
+                self._discard(entry)
+
+    # ---------------------------------------------------------
+    # HEALTH + RESET
+    # ---------------------------------------------------------
+
+    def is_healthy(self, entry):
+        try:
+            entry.session.driver.execute_script("return 1")
+            return True
+        except Exception:
+            return False
+
+    def _needs_recycle(self, entry):
+        if entry.uses >= self.max_uses:
+            return True
+        if self.max_age_seconds and time.time() - entry.created_at > self.max_age_seconds:
+            return True
+        rss = _driver_rss_mb(entry.session.driver)
+        return rss is not None and rss > self.max_rss_mb
+
+    def reset(self, entry):
+        """Returns a browser to a clean about:blank state between leases."""
+        driver = entry.session.driver
+
+        # close every tab except the first one
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+
+        # storage is per-origin, so clear it before leaving the page
+        try:
+            driver.execute_script(
+                "try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}"
+            )
+        except Exception:
+            pass
+
+        try:
+            driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+            driver.execute_cdp_cmd("Network.clearBrowserCache", {})
+        except Exception:
+            driver.delete_all_cookies()
+
+        driver.get("about:blank")
+
+    # ---------------------------------------------------------
+    # LEASING
+    # ---------------------------------------------------------
+
+    @traced("browser_lease")
+    def acquire(self, timeout=POOL_LEASE_TIMEOUT):
+        """Leases a healthy browser, launching one if the pool has room."""
+        deadline = time.monotonic() + timeout
+
+        while True:
+            entry = None
+            launch = False
+
+            with self._cond:
+                while True:
+                    if self._closed:
+                        raise RuntimeError("Browser pool is closed")
+                    if self._idle:
+                        entry = self._idle.pop()
+                        break
+                    if self._total < self.max_size:
+                        self._total += 1
+                        launch = True
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise BrowserPoolTimeout(
+                            f"No browser available after {timeout}s (max_size={self.max_size})"
+                        )
+                    self._cond.wait(remaining)
+
+            if launch:
+                try:
+                    entry = self._launch()
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._cond.notify()
+                    raise
+
+            elif not self.is_healthy(entry):
+                print("⚠️ Pooled browser failed health check → replacing")
+                self._discard(entry)
+                with self._cond:
+                    self._total -= 1
+                    self._cond.notify()
+                continue
+
+            entry.uses += 1
+            entry.session.pool_entry = entry
+            return entry.session
+
+    def release(self, session):
+        """Resets a leased browser and puts it back, or recycles it."""
+        entry = getattr(session, "pool_entry", None)
+        if entry is None:
+            session.close()
+            return
+        session.pool_entry = None
+
+        keep = not self._closed and not self._needs_recycle(entry)
+        if keep:
+            try:
+                self.reset(entry)
+            except Exception as e:
+                print(f"⚠️ Browser reset failed → recycling: {e}")
+                keep = False
+
+        if keep:
+            with self._cond:
+                self._idle.append(entry)
+                self._cond.notify()
+            return
+
+        self._discard(entry)
+        with self._cond:
+            self._total -= 1
+            self._cond.notify()
+
+        # keep the warm floor after recycling, without making the caller wait for Chrome
+        if not self._closed:
+            threading.Thread(target=self._refill, name="browser-pool-refill", daemon=True).start()
+
+    def _refill(self):
+        try:
+            self.start()
+        except Exception as e:
+            print(f"⚠️ Could not refill browser pool: {e}")
+
+    @contextmanager
+    def lease(self, timeout=POOL_LEASE_TIMEOUT):
+        session = self.acquire(timeout=timeout)
+        try:
+            yield session
+        finally:
+            self.release(session)
+
+    def health_check(self):
+        """Drops idle browsers that no longer respond, then refills to min_size."""
+        with self._cond:
+            idle, self._idle = self._idle, []
+
+        healthy = []
+        for entry in idle:
+            if self.is_healthy(entry):
+                healthy.append(entry)
+            else:
+                self._discard(entry)
+                with self._cond:
+                    self._total -= 1
+
+        with self._cond:
+            self._idle.extend(healthy)
+            self._cond.notify_all()
+
+        self.start()
+        return len(healthy)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "idle": len(self._idle),
+                "total": self._total,
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+            }
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._total -= len(idle)
+            self._cond.notify_all()
+
+        for entry in idle:
+            self._discard(entry)
+
+
+# ---------------------------------------------------------
+# PROCESS-WIDE POOL
+# ---------------------------------------------------------
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_browser_pool():
+    """Returns the shared pool, creating (and warming) it on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            return _pool
+        pool = _pool = BrowserPool()
+
+    # Chrome launches outside the lock: other callers get the pool at once
+    # and lease (or launch) browsers concurrently
+    pool.start()
+    return pool
+
+
+def shutdown_browser_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
@@ -0,0 +1,92 @@
+# browser_session.py
+import os
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from page_settle import install_settle_instrumentation, wait_for_page_settle
+from tracing import span
+
+# Set BROWSER_HEADLESS=1 to run the agent browser without a window
+HEADLESS = os.getenv("BROWSER_HEADLESS", "0") == "1"
+
+
+def build_chrome_options(headless=HEADLESS):
+    """Chrome flags shared by every browser the agent launches."""
+    options = Options()
+    if headless:
+        options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    return options
+
+
+class BrowserSession:
+    """
+    One live Chrome driver shared by DOM extraction, step execution and
+    screenshots for the whole agent run.
+
+    Usage:
+        with BrowserSession() as session:
+            session.open(url)
+            html = session.page_source
+    """
+
+    def __init__(self, headless=HEADLESS, artifacts_dir="."):
+        self.headless = headless
+        self.artifacts_dir = artifacts_dir
+        self.driver = None
+        self.pool_entry = None  # set while leased from a BrowserPool
+
+    # ---------------------------------------------------------
+    # LIFECYCLE
+    # ---------------------------------------------------------
+
+    def start(self):
+        if self.driver is None:
+            with span("browser_launch", headless=self.headless):
+                self.driver = webdriver.Chrome(options=build_chrome_options(self.headless))
+                install_settle_instrumentation(self.driver)
+        return self
+
+    def close(self):
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            finally:
+                self.driver = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # ---------------------------------------------------------
+    # PAGE ACCESS
+    # ---------------------------------------------------------
+
+    def open(self, url, settle=True):
+        """
+        Navigates the shared driver and waits for the page to settle.
+        Returns the seconds spent waiting.
+        """
+        self.start()
+        with span("page_load", url=url):
+            self.driver.get(url)
+        if not settle:
+            return 0.0
+        return wait_for_page_settle(self.driver)
+
+    @property
+    def current_url(self):
+        return self.driver.current_url
+
+    @property
+    def page_source(self):
+        return self.driver.page_source
+
+    def screenshot(self, filename):
+        """Saves a screenshot of the live page into the session's artifacts dir."""
+        path = os.path.join(self.artifacts_dir, filename)
+        with span("screenshot", file=filename):
+            self.driver.save_screenshot(path)
+        return path
@@ -1,22 +1,20 @@
-from fastapi import APIRouter
-from fastapi.responses import PlainTextResponse
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
-from controller_1 import run_agentic_test
-from openai import OpenAI
-import os, re, json
-from dotenv import load_dotenv
+from job_queue import job_manager, JobQueueFull
+from startup import timed_import
+import os, re, json, asyncio
+
+# controller_1 (Selenium, lxml) and llm_client (OpenAI SDK) are imported on first use
+# or by the startup prewarm, so importing this router stays cheap
 
-load_dotenv()
 router = APIRouter()
 
 class ChatRequest(BaseModel):
     user_prompt: str
 
-# Initialize OpenRouter client
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=os.getenv("OPEN_ROUTER_KEY")
-)
+# How often the SSE stream checks a job for new progress events
+SSE_POLL_SECONDS = float(os.getenv("SSE_POLL_SECONDS", "0.5"))
 
 def extract_test_parameters(user_text: str):
     """
@@ -34,18 +32,18 @@ def extract_test_parameters(user_text: str):
     if not all([url, username, password]):
         print("⚠️ Missing info → falling back to LLM extraction")
 
-        response = client.chat.completions.create(
-            model="nvidia/nemotron-nano-9b-v2:free",
-            messages=[
-                {"role": "system", "content": "Extract website URL, username, password, and testing goal from text. Output valid JSON only."},
-                {"role": "user", "content": user_text},
-            ],
-        )
-
         try:
-            content = response.choices[0].message.content
+            llm = timed_import("llm_client")
+            # deadline-bounded and hedged across LLM_MODELS (LLM_BASE_URL, defaults to OpenRouter)
+            content = llm.complete_hedged(
+                messages=[
+                    {"role": "system", "content": "Extract website URL, username, password, and testing goal from text. Output valid JSON only."},
+                    {"role": "user", "content": user_text},
+                ],
+                validate=llm.is_json_answer,
+            )["text"]
             print("🧠 LLM Extraction:", content)
-            parsed = json.loads(content)
+            parsed = llm.extract_json(content)
 
             url = url or parsed.get("url")
             username = username or parsed.get("username")
@@ -93,16 +91,23 @@ def parse_steps_from_ui_prompt(ui_text: str):
     return steps
 
 
-@router.post("/", response_class=PlainTextResponse)
-def chat_with_ai(request: ChatRequest):
-    user_text = request.user_prompt
+class ChatRunError(ValueError):
+    """The message can't be turned into an agent run (no URL, no ordered steps)."""
+
+
+def run_chat_or_raise(user_text: str, progress_callback=None):
+    """
+    Full chat → agent run pipeline. Returns the plain-text report; raises
+    ChatRunError / the agent's exception on failure. Background jobs use
+    this so a failed run ends as a failed job.
+    """
     print(f"🧠 User said: {user_text}")
 
     url, username, password, goal = extract_test_parameters(user_text)
     print(f"🌐 URL: {url}, 👤 Username: {username}, 🔑 Password: {password}, 🎯 Goal: {goal}")
 
     if not url:
-        return "❌ Couldn't detect a valid URL in your message."
+        raise ChatRunError("Couldn't detect a valid URL in your message.")
 
     # 1️⃣ Try extracting steps from user input
     global_steps = parse_steps_from_ui_prompt(user_text)
@@ -113,25 +118,92 @@ def chat_with_ai(request: ChatRequest):
 
     # 3️⃣ Bail if we have no steps
     if not global_steps:
-        return (
-            "❌ I couldn't detect any ordered steps.\n"
+        raise ChatRunError(
+            "I couldn't detect any ordered steps.\n"
             "Please provide them like:\n"
             "1. Login\n2. Add item\n3. Verify cart"
         )
 
     print(f"📋 Parsed Steps: {global_steps}")
 
-    try:
-        result_text = run_agentic_test(
-            start_url=url,
-            username=username or "",
-            password=password or "",
-            user_prompt=goal,
-            global_steps=global_steps,
-            max_steps=8  # You control the limit
-        )
-        return result_text
+    return timed_import("controller_1").run_agentic_test(
+        start_url=url,
+        username=username or "",
+        password=password or "",
+        user_prompt=goal,
+        global_steps=global_steps,
+        max_steps=8,  # You control the limit
+        progress_callback=progress_callback
+    )
 
+
+def run_chat(user_text: str, progress_callback=None):
+    """run_chat_or_raise for the synchronous endpoint: failures come back as a ❌ message."""
+    try:
+        return run_chat_or_raise(user_text, progress_callback)
+    except ChatRunError as e:
+        return f"❌ {e}"
     except Exception as e:
         print(f"❌ Error: {e}")
         return f"❌ Error: {e}"
+
+
+@router.post("/", response_class=PlainTextResponse)
+def chat_with_ai(request: ChatRequest):
+    return run_chat(request.user_prompt)
+
+
+# ---------------------------------------------------------
+# JOB API (non-blocking runs + streamed progress)
+# ---------------------------------------------------------
+
+@router.post("/jobs", status_code=202)
+def submit_chat_job(request: ChatRequest):
+    """Queues an agent run and returns its job id right away."""
+    try:
+        job = job_manager.submit(run_chat_or_raise, request.user_prompt)
+    except JobQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+
+    return {
+        "job_id": job.id,
+        "status": job.status,
+        "status_url": f"/api/chat/jobs/{job.id}",
+        "events_url": f"/api/chat/jobs/{job.id}/events",
+    }
+
+
+@router.get("/jobs/{job_id}")
+def get_chat_job(job_id: str, include_events: bool = False):
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+    return job.to_dict(include_events=include_events)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_chat_job_events(job_id: str):
+    """Server-Sent Events stream of a job's progress, closed when the job ends."""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job id")
+
+    async def event_stream():
+        index = 0
+        while True:
+            done = job.done
+            events = job.events_since(index)
+            for event in events:
+                yield f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+            index += len(events)
+
+            if done:
+                yield f"event: result\ndata: {json.dumps(job.to_dict())}\n\n"
+                break
+            await asyncio.sleep(SSE_POLL_SECONDS)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -1,14 +1,79 @@
-from locator_extractor_1 import extract_locators_for_url, extract_dom_metadata
-from ai_test_generator_1 import ask_ai_to_generate_test
+from locator_extractor_1 import create_dom_extractor, scroll_to_render
+from ai_test_generator_1 import ask_ai_to_generate_test, ask_ai_to_generate_plan, record_step_outcome, record_plan_outcome
 from test_executor_1 import run_ai_code_safely
-from selenium import webdriver
+from browser_pool import get_browser_pool
 from urllib.parse import urlparse
-from memory_db_1 import init_db, save_step_memory, get_cached_success
+from memory_db_1 import init_db, save_step_memory, get_cached_success, flush_writes
+from page_settle import wait_for_page_settle
+from run_recorder import RunRecorder, RECORD_RUNS
+from screenshot_store import ScreenshotRecorder, new_run_dir
+from contextlib import nullcontext
+from locator_healer import heal_code, fingerprint_code
+from page_identity import page_fingerprint
+from tracing import start_trace, span, record_cache_lookup, RUNS, STEP_ATTEMPTS, STEP_RETRIES, LLM_CALLS_PER_RUN, HEAL_ATTEMPTS
+import os
 import time
 
-def run_agentic_test(start_url, username, password, user_prompt=None,
-                     global_steps=None, max_steps=8):
+# Set AGENT_PLAN_AHEAD=1 to generate all remaining steps in one LLM call
+PLAN_AHEAD = os.getenv("AGENT_PLAN_AHEAD", "0") == "1"
+
+
+def _emit(progress_callback, event, **data):
+    """Sends a progress event to the caller (job API / SSE), never raising."""
+    if progress_callback is None:
+        return
+    try:
+        progress_callback({"event": event, "time": time.time(), **data})
+    except Exception as e:
+        print(f"⚠️ Progress callback error: {e}")
 
+
+def run_agentic_test(start_url, username, password, user_prompt=None,
+                     global_steps=None, max_steps=8, **kwargs):
+    """Runs the agent loop and returns the plain-text report."""
+    return run_agentic_test_with_details(
+        start_url, username, password, user_prompt=user_prompt,
+        global_steps=global_steps, max_steps=max_steps, **kwargs
+    )["report"]
+
+
+def run_agentic_test_with_details(start_url, username, password, user_prompt=None,
+                                  global_steps=None, max_steps=8, progress_callback=None,
+                                  plan_ahead=PLAN_AHEAD, session=None, start_index=0,
+                                  record=RECORD_RUNS, artifacts_dir=None):
+    """
+    Runs the agent loop over `global_steps` and returns a dict with the
+    report text plus structured results (history, pass/fail, counters).
+
+    Pass a live `session` (plus `start_index`) to continue a run that is
+    already on the right page, e.g. when a replay hands over to the agent.
+    Screenshots go to `artifacts_dir` (default: a fresh per-run directory
+    under SCREENSHOT_DIR), written in the background. Phase timings are traced and exported
+    as JSON (see tracing.py).
+    """
+    with start_trace("agent_run", start_url=start_url, steps=len(global_steps or []),
+                     start_index=start_index, plan_ahead=plan_ahead) as trace:
+        try:
+            details = _run_agent_loop(
+                start_url, username, password, user_prompt, global_steps, max_steps,
+                progress_callback, plan_ahead, session, start_index, record, artifacts_dir
+            )
+        except Exception:
+            RUNS.inc(outcome="error")
+            raise
+
+    RUNS.inc(outcome="passed" if details["passed"] else "failed")
+    LLM_CALLS_PER_RUN.observe(details["llm_calls"])
+    details["phase_seconds"] = trace.totals()
+    # time spent waiting for LLM rate-limit budget rather than failing on 429s
+    details["llm_queue_seconds"] = round(sum(
+        s["attrs"].get("queue_seconds", 0) for s in trace.spans if s["name"] == "llm_call"), 3)
+    details["trace_path"] = getattr(trace, "path", None)
+    return details
+
+
+def _run_agent_loop(start_url, username, password, user_prompt, global_steps, max_steps,
+                    progress_callback, plan_ahead, session, start_index, record, artifacts_dir):
     # Initialize DB
     init_db()
 
@@ -18,122 +83,282 @@ def run_agentic_test(start_url, username, password, user_prompt=None,
     print("📋 Global steps received:", global_steps)
 
     print("🧭 Extracting initial DOM metadata...")
-    tag_dict = extract_locators_for_url(start_url)
-
-    driver = webdriver.Chrome()
-    driver.get(start_url)
-
-    history = []
-    log_text = "🧭 Extracting initial DOM metadata...\n"
-
-    base_url = urlparse(start_url).netloc
 
-    current_step_index = 0       # <-- controls which UI step we're on
-    agent_steps_taken = 0        # <-- total attempts (not steps)
+    artifacts_dir = artifacts_dir or new_run_dir()
+    screenshots = ScreenshotRecorder(artifacts_dir)
 
-    while agent_steps_taken < max_steps:
-
-        log_text += f"\n===== Agent Attempt {agent_steps_taken + 1} =====\n"
-        print(f"\n===== Agent Attempt {agent_steps_taken + 1} =====")
-
-        # Stop if all UI steps done
-        if current_step_index >= len(global_steps):
-            print("🎉 All global steps completed.")
-            break
-
-        next_required_step = global_steps[current_step_index]
-        print(f"➡ Required step: {next_required_step}")
+    # One pooled browser for extraction, execution and screenshots
+    lease = get_browser_pool().lease() if session is None else nullcontext(session)
+    with lease as session:
+        session.artifacts_dir = artifacts_dir
+        if start_index == 0 or session.driver is None:
+            initial_settle = session.open(start_url)
+        else:
+            initial_settle = wait_for_page_settle(session.driver)
+        driver = session.driver
+        scroll_to_render(driver)
+        dom_extractor = create_dom_extractor(driver)
+        tag_dict = dom_extractor.extract()
+
+        history = []
+        log_text = "🧭 Extracting initial DOM metadata...\n"
+
+        base_url = urlparse(start_url).netloc
+
+        current_step_index = start_index  # <-- controls which UI step we're on
+        agent_steps_taken = 0        # <-- total attempts (not steps)
+        settle_waits = [initial_settle]  # <-- seconds actually waited for the page per attempt
+
+        llm_calls = 0                # <-- real LLM completions (plan calls included, LLM-cache hits not)
+        heal_attempts = 0            # <-- failed cached steps we tried to repair locally
+        heals_succeeded = 0
+        cache_lookups = 0            # <-- step-memory lookups / hits (page key or page fingerprint)
+        cache_hits = 0
+        planned = {}                 # <-- step index -> {"goal", "code"} from the plan-ahead call
+        plan = []                    # <-- the whole plan, cached once every step of it worked
+        plan_requested = False
+        plan_steps_succeeded = 0
+
+        recorder = RunRecorder(start_url, username, password, global_steps)
+
+        while agent_steps_taken < max_steps:
+
+            log_text += f"\n===== Agent Attempt {agent_steps_taken + 1} =====\n"
+            print(f"\n===== Agent Attempt {agent_steps_taken + 1} =====")
+
+            # Stop if all UI steps done
+            if current_step_index >= len(global_steps):
+                print("🎉 All global steps completed.")
+                break
+
+            next_required_step = global_steps[current_step_index]
+            print(f"➡ Required step: {next_required_step}")
+            url_before = driver.current_url
+            _emit(progress_callback, "step_started",
+                  attempt=agent_steps_taken + 1,
+                  step=current_step_index + 1,
+                  total_steps=len(global_steps),
+                  required_step=next_required_step)
+
+            page_fp = page_fingerprint(tag_dict)
+            cached = get_cached_success(base_url, url_before, next_required_step, page_fp)
+            record_cache_lookup("step_memory", cached is not None)
+            cache_lookups += 1
+            cache_hits += cached is not None
+
+            if cached:
+                print("⚡ Using cached successful code (skipping LLM)")
+                if cached["similarity"] < 1:
+                    print(f"🔎 Fuzzy memory match ({cached['similarity']:.2f}) for '{cached['matched_goal']}'")
+                    record_cache_lookup("step_memory_fuzzy", True)
+                code = cached["code"]
+
+                success = run_ai_code_safely(driver, code)
+                source = "cache"
+
+                # Self-healing: rewrite broken locators from stored fingerprints before paying for an LLM call
+                if not success and cached["fingerprints"]:
+                    heal_attempts += 1
+                    with span("heal", fingerprints=len(cached["fingerprints"])) as attrs:
+                        healed_code, changes = heal_code(code, cached["fingerprints"], tag_dict)
+                        attrs["changes"] = changes
+
+                    if healed_code:
+                        print(f"🩹 Healed {sum(c['healed'] for c in changes)} locator(s) → retrying without LLM")
+                        success = run_ai_code_safely(driver, healed_code)
+                        HEAL_ATTEMPTS.inc(result="healed" if success else "healed_code_failed")
+                        if success:
+                            heals_succeeded += 1
+                            source = "healed"
+                            code = healed_code
+                            save_step_memory(
+                                base_url=base_url,
+                                page_url=url_before,
+                                goal=next_required_step,
+                                code=code,
+                                summary=f"healed: {next_required_step[:110]}",
+                                tags=[c["new_value"] for c in changes if c["healed"]],
+                                success=True,
+                                fingerprints=fingerprint_code(code, tag_dict),
+                                page_fingerprint=page_fp
+                            )
+                    else:
+                        print("🩹 No confident locator match → healing skipped")
+                        HEAL_ATTEMPTS.inc(result="no_match")
+
+                screenshots.capture(driver, f"cached_{agent_steps_taken + 1}.png", success)
+
+                _emit(progress_callback, "step_finished",
+                      attempt=agent_steps_taken + 1,
+                      step=current_step_index + 1,
+                      required_step=next_required_step,
+                      source=source,
+                      success=success)
+                STEP_ATTEMPTS.inc(source=source, result="success" if success else "failure")
+
+                if success:
+                    print("🎯 Cached code succeeded → advancing" if source == "cache"
+                          else "🎯 Healed code succeeded → advancing")
+                    history.append({
+                        "step": current_step_index + 1,
+                        "goal": next_required_step,
+                        "url": driver.current_url,
+                        "success": True
+                    })
+                    current_step_index += 1
+                    agent_steps_taken += 1
+                    settle_waits.append(wait_for_page_settle(driver))
+                    recorder.record_step(current_step_index - 1, next_required_step, code,
+                                         url_before, driver.current_url, settle_waits[-1])
+                    _emit(progress_callback, "page_settled", seconds=round(settle_waits[-1], 3))
+                    tag_dict = dom_extractor.extract()
+                    # memory covered this planned step; once it was the plan's last one the plan is done
+                    if planned.pop(current_step_index - 1, None) is not None and not planned:
+                        record_plan_outcome(plan, True)
+                    continue  # ⬅ SKIP LLM
+                else:
+                    print("❌ Cached code failed → falling back to LLM")
+                    # (optional later: delete failed memory)
+
+            # Plan-ahead: one call for every remaining step (only once per run)
+            if plan_ahead and not plan_requested:
+                plan_requested = True
+                llm_started = time.perf_counter()
+                plan = ask_ai_to_generate_plan(
+                    url=driver.current_url,
+                    tag_dict=tag_dict,
+                    username=username,
+                    password=password,
+                    history=history,
+                    ui_user_prompt=user_prompt,
+                    global_steps=global_steps,
+                    start_index=current_step_index
+                )
+                llm_calls += not (plan and plan[0].get("cached"))
+                planned = {current_step_index + i: step for i, step in enumerate(plan)}
+                _emit(progress_callback, "plan_created",
+                      steps=len(plan),
+                      latency_ms=round((time.perf_counter() - llm_started) * 1000, 1))
+
+            planned_step = planned.pop(current_step_index, None)
+            if planned_step and planned_step.get("goal") not in ("no_action", "parse_error"):
+                source = "plan"
+                ai_plan = planned_step
+                print("🗺 Using planned code (speculative, skipping LLM)")
+            else:
+                if planned or planned_step:
+                    print("🗺 Plan has no usable code for this step → per-step generation")
+                    planned.clear()
+                    record_plan_outcome(plan, False)
+
+                # Call AI
+                source = "llm"
+                llm_started = time.perf_counter()
+                ai_plan = ask_ai_to_generate_test(
+                    url=driver.current_url,
+                    tag_dict=tag_dict,
+                    username=username,
+                    password=password,
+                    history=history,
+                    ui_user_prompt=user_prompt,
+                    global_steps=global_steps,
+                    next_required_step=next_required_step
+                )
+                llm_calls += not ai_plan.get("cached")
 
-        cached = get_cached_success(base_url, driver.current_url, next_required_step)
+                llm_latency_ms = (time.perf_counter() - llm_started) * 1000
 
-        if cached:
-            print("⚡ Using cached successful code (skipping LLM)")
-            code = cached["code"]
+            goal = ai_plan.get("goal", "parse_error")
+            code = ai_plan.get("code", "")
 
-            success = run_ai_code_safely(driver, code)
-            driver.save_screenshot(f"cached_{agent_steps_taken + 1}.png")
+            print(f"🤖 AI decided: {goal}")
+            if source == "llm":
+                _emit(progress_callback, "llm_response",
+                      attempt=agent_steps_taken + 1,
+                      step=current_step_index + 1,
+                      goal=goal,
+                      latency_ms=round(llm_latency_ms, 1))
 
+            # Execute code safely
+            success = False
+            if goal == "no_action" or goal == "parse_error":
+                print("⚠️ Ignoring invalid agent action, marking as failure")
+            else:
+                success = run_ai_code_safely(driver, code)
+            screenshots.capture(driver, f"step_{agent_steps_taken + 1}.png", success)
+            _emit(progress_callback, "step_finished",
+                  attempt=agent_steps_taken + 1,
+                  step=current_step_index + 1,
+                  required_step=next_required_step,
+                  source=source,
+                  success=success)
+            STEP_ATTEMPTS.inc(source=source, result="success" if success else "failure")
+
+            # LLM answers are only cached once their code has worked
+            if goal not in ("no_action", "parse_error"):
+                if source == "llm":
+                    record_step_outcome(ai_plan, success)
+                elif not success or not planned:
+                    record_plan_outcome(plan, success)
+
+            # Save history
+            history.append({
+                "step": current_step_index + 1,
+                "goal": goal,
+                "url": driver.current_url,
+                "success": success
+            })
+
+            # Save to DB
+            try:
+                tag_ids = [t.get("id") for t in tag_dict.get("inputs", []) if t.get("id")]
+                if goal in ["no_action", "parse_error"]:
+                    print("🚫 NOT saving invalid step to DB")
+                else:
+                    save_step_memory(
+                        base_url=base_url,
+                        page_url=url_before,  # keyed on the page the step starts from, like the lookup
+                        goal=goal,
+                        code=code,
+                        summary=goal[:120] + "..." if len(goal) > 120 else goal,
+                        tags=tag_ids,
+                        success=success,
+                        fingerprints=fingerprint_code(code, tag_dict) if success else None,
+                        page_fingerprint=page_fp
+                    )
+                    print(f"💾 Step recording saved ({'✅' if success else '❌'})")
+            except Exception as db_err:
+                print(f"⚠️ DB save error: {db_err}")
+
+            # === STEP CONTROL LOGIC ===
             if success:
-                print("🎯 Cached code succeeded → advancing")
-                history.append({
-                    "step": current_step_index + 1,
-                    "goal": next_required_step,
-                    "url": driver.current_url,
-                    "success": True
-                })
+                print("🎯 Success → advancing to next UI step")
                 current_step_index += 1
-                agent_steps_taken += 1
-                time.sleep(2)
-                tag_dict = extract_dom_metadata(driver.page_source)
-                continue  # ⬅ SKIP LLM
+                if source == "plan":
+                    plan_steps_succeeded += 1
             else:
-                print("❌ Cached code failed → falling back to LLM")
-                # (optional later: delete failed memory)
-
-        # Call AI
-        ai_plan = ask_ai_to_generate_test(
-            url=driver.current_url,
-            tag_dict=tag_dict,
-            username=username,
-            password=password,
-            history=history,
-            ui_user_prompt=user_prompt,
-            global_steps=global_steps,
-            next_required_step=next_required_step
-        )
-
-        goal = ai_plan.get("goal", "parse_error")
-        code = ai_plan.get("code", "")
-
-        print(f"🤖 AI decided: {goal}")
-
-        # Execute code safely
-        success = False
-        if goal == "no_action" or goal == "parse_error":
-            print("⚠️ Ignoring invalid agent action, marking as failure")
-        else:
-            success = run_ai_code_safely(driver, code)
-        driver.save_screenshot(f"step_{agent_steps_taken + 1}.png")
-
-        # Save history
-        history.append({
-            "step": current_step_index + 1,
-            "goal": goal,
-            "url": driver.current_url,
-            "success": success
-        })
-
-        # Save to DB
-        try:
-            tag_ids = [t.get("id") for t in tag_dict.get("inputs", []) if t.get("id")]
-            if goal in ["no_action", "parse_error"]:
-                print("🚫 NOT saving invalid step to DB")
-            else:
-                save_step_memory(
-                    base_url=base_url,
-                    page_url=driver.current_url,
-                    goal=goal,
-                    code=code,
-                    summary=goal[:120] + "..." if len(goal) > 120 else goal,
-                    tags=tag_ids,
-                    success=success
-                )
-                print(f"💾 Step recording saved ({'✅' if success else '❌'})")
-        except Exception as db_err:
-            print(f"⚠️ DB save error: {db_err}")
-
-        # === STEP CONTROL LOGIC ===
-        if success:
-            print("🎯 Success → advancing to next UI step")
-            current_step_index += 1
-        else:
-            print("🔁 Failure → staying on same required step")
+                print("🔁 Failure → staying on same required step")
+                STEP_RETRIES.inc()
+                if source == "plan":
+                    print("🗺 Planned step failed → dropping rest of plan, back to per-step generation")
+                    planned.clear()
+
+            agent_steps_taken += 1
+            settle_waits.append(wait_for_page_settle(driver))
+            _emit(progress_callback, "page_settled", seconds=round(settle_waits[-1], 3))
+            if success:
+                recorder.record_step(current_step_index - 1, next_required_step, code,
+                                     url_before, driver.current_url, settle_waits[-1])
+            tag_dict = dom_extractor.extract()
 
-        agent_steps_taken += 1
-        time.sleep(3)
-        tag_dict = extract_dom_metadata(driver.page_source)
+    # make this run's step memory visible to the next run
+    flush_writes()
+    screenshots.flush()
 
-    driver.quit()
+    # a fully successful fresh run becomes a replayable recording
+    recording_path = None
+    if record and start_index == 0 and recorder.is_complete():
+        recording_path = recorder.save()
 
     print("\n📊 Final history:")
     for h in history:
@@ -148,7 +373,55 @@ def run_agentic_test(start_url, username, password, user_prompt=None,
     if agent_steps_taken >= max_steps:
         log_text += "\n🛑 Stopped due to max step budget.\n"
 
-    return log_text
+    if plan_ahead:
+        # without the plan every succeeded planned step would have been its own LLM call
+        plan_call = plan_requested and not (plan and plan[0].get("cached"))
+        saved_calls = plan_steps_succeeded - plan_call
+        log_text += (
+            f"\n🗺 Plan-ahead: {plan_steps_succeeded} steps ran from the plan, "
+            f"{llm_calls} LLM calls total, {max(saved_calls, 0)} LLM calls saved\n"
+        )
+
+    # Fixed sleeps used to be 2s (cached step) / 3s (LLM step) per attempt
+    log_text += (
+        f"\n⏱ Page settle waits: {sum(settle_waits):.2f}s total over {len(settle_waits)} waits "
+        f"({', '.join(f'{w:.2f}s' for w in settle_waits)})\n"
+    )
+
+    if cache_lookups:
+        log_text += (
+            f"\n🔑 Step memory: {cache_hits}/{cache_lookups} lookups hit "
+            f"({cache_hits / cache_lookups:.0%}, keyed on canonical URL + page fingerprint)\n"
+        )
+
+    if heal_attempts:
+        log_text += (
+            f"\n🩹 Self-healing: {heals_succeeded}/{heal_attempts} failed cached steps repaired "
+            f"without the LLM ({heals_succeeded / heal_attempts:.0%})\n"
+        )
+
+    log_text += f"\n📸 Screenshots: {screenshots.summary()}\n"
+
+    if recording_path:
+        log_text += f"\n🎞 Run recorded for replay: {recording_path}\n"
+
+    return {
+        "report": log_text,
+        "history": history,
+        "steps_total": len(global_steps),
+        "steps_completed": current_step_index,
+        "passed": current_step_index >= len(global_steps),
+        "agent_steps": agent_steps_taken,
+        "llm_calls": llm_calls,
+        "cache_lookups": cache_lookups,
+        "cache_hits": cache_hits,
+        "heal_attempts": heal_attempts,
+        "heals_succeeded": heals_succeeded,
+        "settle_seconds": round(sum(settle_waits), 3),
+        "recording_path": recording_path,
+        "screenshots_dir": artifacts_dir,
+        "screenshots": dict(screenshots.stats),
+    }
 
 
 
@@ -0,0 +1,169 @@
+# dom_pruner.py
+import json
+import os
+import re
+
+# --- Configuration ---
+PROMPT_DOM_TOKEN_BUDGET = int(os.getenv("PROMPT_DOM_TOKEN_BUDGET", "3000"))
+PROMPT_DOM_PRUNING = os.getenv("PROMPT_DOM_PRUNING", "1") == "1"
+
+# Element categories in the order we prefer them when scores tie
+CATEGORY_PRIORITY = ["inputs", "selects", "buttons", "clickables", "links", "labels", "images"]
+
+# Fields kept in the compact element form (everything else is dropped)
+COMPACT_FIELDS = [
+    "tag", "text", "id", "name", "data_test", "type", "placeholder", "value",
+    "aria_label", "title", "alt", "role", "href", "css_selector", "xpath", "options",
+]
+MAX_TEXT_CHARS = 80
+
+STRONG_FIELDS = ["text", "data_test", "id", "name", "aria_label", "placeholder", "title", "alt"]
+WEAK_FIELDS = ["value", "type", "role", "href", "class"]
+
+STOPWORDS = {
+    "a", "an", "the", "to", "on", "in", "of", "for", "and", "or", "into", "with",
+    "then", "it", "is", "that", "this", "my", "your", "from", "at", "by", "as",
+}
+
+# Step verbs that hint at which kind of element the step needs
+INTENT_BOOSTS = {
+    "inputs": {"type", "enter", "fill", "input", "write", "login", "log", "username", "password", "search", "email"},
+    "selects": {"select", "choose", "sort", "pick", "dropdown", "filter"},
+    "clickables": {"click", "press", "tap", "add", "remove", "open", "submit", "checkout", "continue", "finish", "login", "log"},
+}
+
+
+def estimate_tokens(text):
+    """Cheap token estimate (~4 characters per token), no tokenizer dependency."""
+    return (len(text) + 3) // 4
+
+
+def _tokens(value):
+    """Lower-cased word tokens, splitting camelCase, kebab-case and snake_case."""
+    if value is None:
+        return set()
+    if isinstance(value, (list, tuple)):
+        value = " ".join(str(v) for v in value)
+    value = re.sub(r"([a-z])([A-Z])", r"\1 \2", str(value))
+    return set(re.findall(r"[a-z0-9]+", value.lower()))
+
+
+def _score(info, categories, step_tokens, intents):
+    strong = set()
+    for field in STRONG_FIELDS:
+        strong |= _tokens(info.get(field))
+    weak = set()
+    for field in WEAK_FIELDS:
+        weak |= _tokens(info.get(field))
+
+    score = 0.0
+    for tok in step_tokens:
+        if tok in strong:
+            score += 3
+        elif tok in weak:
+            score += 1
+        elif len(tok) > 3 and any(tok in s or s in tok for s in strong if len(s) > 3):
+            score += 1  # partial match, e.g. "backpack" vs "backpacks"
+
+    for cat in categories:
+        if cat in intents:
+            score += 1.5
+
+    return score
+
+
+def _compact(info, categories):
+    out = {"in": categories}
+    for field in COMPACT_FIELDS:
+        value = info.get(field)
+        if value in (None, "", []):
+            continue
+        if field == "text" and len(value) > MAX_TEXT_CHARS:
+            value = value[:MAX_TEXT_CHARS] + "…"
+        out[field] = value
+    return out
+
+
+def _element_key(info):
+    return info.get("xpath") or (info.get("tag"), info.get("id"), info.get("css_selector"), info.get("text"))
+
+
+def prune_tag_dict(tag_dict, next_required_step, token_budget=PROMPT_DOM_TOKEN_BUDGET):
+    """
+    Ranks DOM elements against the required step and keeps the best ones
+    that fit into `token_budget`.
+
+    Elements listed in several categories (buttons + clickables + ...) are
+    merged into one compact entry. Returns (dom_text, stats).
+    """
+    step_tokens = _tokens(next_required_step) - STOPWORDS
+    intents = {cat for cat, words in INTENT_BOOSTS.items() if step_tokens & words}
+
+    # ---- dedupe across categories ----
+    merged = {}
+    for cat in CATEGORY_PRIORITY:
+        for info in tag_dict.get(cat, []) or []:
+            key = _element_key(info)
+            if key in merged:
+                merged[key][1].append(cat)
+            else:
+                merged[key] = (info, [cat])
+
+    ranked = []
+    for position, (info, categories) in enumerate(merged.values()):
+        if not any(info.get(f) for f in STRONG_FIELDS) \
+                and "inputs" not in categories and "selects" not in categories:
+            continue  # nothing an LLM could target reliably
+        score = _score(info, categories, step_tokens, intents)
+        priority = min(CATEGORY_PRIORITY.index(c) for c in categories)
+        ranked.append((-score, priority, position, info, categories))
+    ranked.sort(key=lambda r: r[:3])
+
+    # ---- products: score on title + price ----
+    products, seen_products = [], set()
+    for product in tag_dict.get("products", []) or []:
+        button = product.get("button")
+        key = (product.get("title"), product.get("price"), button and _element_key(button))
+        if key in seen_products or not (product.get("title") or button):
+            continue  # card selectors overlap, so the same card shows up several times
+        seen_products.add(key)
+
+        text_tokens = _tokens(product.get("title")) | _tokens(product.get("price"))
+        score = 3 * len(step_tokens & text_tokens)
+        entry = {"title": product.get("title"), "price": product.get("price")}
+        if button:
+            entry["button"] = _compact(button, ["buttons"])
+            score += _score(button, ["buttons"], step_tokens, intents)
+        products.append((-score, len(products), entry))
+    products.sort(key=lambda p: p[:2])
+
+    # ---- fill the budget greedily ----
+    kept_elements, kept_products = [], []
+    used = estimate_tokens('{"elements":[],"products":[]}')
+
+    candidates = [("element", r[0], r[3], r[4]) for r in ranked]
+    candidates += [("product", p[0], p[2], None) for p in products]
+    candidates.sort(key=lambda c: c[1])  # stable: ties keep element-before-product order
+
+    for kind, _, item, categories in candidates:
+        entry = _compact(item, categories) if kind == "element" else item
+        cost = estimate_tokens(json.dumps(entry, separators=(",", ":"), ensure_ascii=False)) + 1
+        if used + cost > token_budget:
+            continue
+        used += cost
+        (kept_elements if kind == "element" else kept_products).append(entry)
+
+    dom_text = json.dumps(
+        {"elements": kept_elements, "products": kept_products},
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+
+    stats = {
+        "elements_total": len(merged),
+        "elements_kept": len(kept_elements),
+        "products_total": len(products),
+        "products_kept": len(kept_products),
+        "tokens_pruned": estimate_tokens(dom_text),
+    }
+    return dom_text, stats
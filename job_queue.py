@@ -0,0 +1,130 @@
+# job_queue.py
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# --- Configuration ---
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "4"))
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+JOB_TTL_SECONDS = int(os.getenv("JOB_TTL_SECONDS", "3600"))
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when too many jobs are queued or running."""
+
+
+class Job:
+    """One background agent run plus the progress events it emitted."""
+
+    def __init__(self, job_id):
+        self.id = job_id
+        self.status = "queued"       # queued → running → finished | failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.events = []
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("finished", "failed")
+
+    def add_event(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def events_since(self, index):
+        with self._lock:
+            return self.events[index:]
+
+    def to_dict(self, include_events=False):
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "event_count": len(self.events),
+        }
+        if include_events:
+            data["events"] = self.events_since(0)
+        return data
+
+
+class JobManager:
+    """
+    Runs jobs on a bounded worker pool so the API can accept many runs
+    without tying up request threads for the whole agent loop.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_pending=JOB_MAX_PENDING, ttl_seconds=JOB_TTL_SECONDS):
+        self.max_pending = max_pending
+        self.ttl_seconds = ttl_seconds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="agent-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Queues fn(*args, progress_callback=job.add_event, **kwargs).
+        Returns the Job immediately.
+        """
+        self._prune()
+
+        with self._lock:
+            active = sum(1 for j in self._jobs.values() if not j.done)
+            if active >= self.max_pending:
+                raise JobQueueFull(f"{active} jobs already queued or running")
+
+            job = Job(uuid.uuid4().hex)
+            self._jobs[job.id] = job
+
+        job.add_event({"event": "job_queued", "time": job.created_at})
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = "running"
+        job.started_at = time.time()
+        job.add_event({"event": "job_started", "time": job.started_at})
+
+        status = "failed"
+        try:
+            job.result = fn(*args, progress_callback=job.add_event, **kwargs)
+            status = "finished"
+        except Exception as e:
+            traceback.print_exc()
+            job.error = str(e)
+        finally:
+            # last event goes in before the status flips, so streams never miss it
+            job.finished_at = time.time()
+            job.add_event({"event": f"job_{status}", "time": job.finished_at})
+            job.status = status
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _prune(self):
+        """Forgets finished jobs older than the TTL."""
+        cutoff = time.time() - self.ttl_seconds
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job.done and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+
+    def shutdown(self, wait=False):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+
+
+job_manager = JobManager()
@@ -0,0 +1,190 @@
+# llm_cache.py
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- Configuration ---
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "llm_cache.db")
+LLM_CACHE_MEMORY_ENTRIES = int(os.getenv("LLM_CACHE_MEMORY_ENTRIES", "256"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "5000"))
+LLM_CACHE_MAX_AGE_DAYS = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30"))
+LLM_CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+# Evict on disk every N stores instead of on every write
+EVICT_EVERY = 50
+
+
+def dom_fingerprint(tag_dict):
+    """Order-independent hash of the DOM metadata."""
+    normalized = json.dumps(tag_dict, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def make_cache_key(dom_hash, next_required_step, global_steps, model, extra=None, failures=None):
+    """
+    Cache key for one step generation request.
+    `extra` carries anything else that ends up verbatim in the generated code
+    (e.g. credentials), so different inputs never share an answer.
+    `failures` are the goals that already failed this run, so a retry asks
+    the model again instead of getting the answer that just failed.
+    """
+    parts = {
+        "dom": dom_hash,
+        "step": " ".join((next_required_step or "").lower().split()),
+        "steps": [" ".join(s.lower().split()) for s in (global_steps or [])],
+        "model": model,
+        "extra": extra,
+        "failures": list(failures or []),
+    }
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """
+    Two-tier cache for parsed LLM answers: an in-memory LRU in front of a
+    SQLite table. Disk entries expire after `max_age_days`, and the oldest
+    (least recently used) are evicted past `max_entries`.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, memory_entries=LLM_CACHE_MEMORY_ENTRIES,
+                 max_entries=LLM_CACHE_MAX_ENTRIES, max_age_days=LLM_CACHE_MAX_AGE_DAYS):
+        self.path = path
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_days * 86400
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stores = 0
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=10)
+
+    def _init_db(self):
+        conn = self._connect()
+        conn.execute("""
+        CREATE TABLE IF NOT EXISTS llm_cache (
+            key TEXT PRIMARY KEY,
+            model TEXT,
+            response TEXT,
+            created_at REAL,
+            last_used REAL
+        )""")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_last_used ON llm_cache (last_used)")
+        conn.commit()
+        conn.close()
+
+    # ---------------------------------------------------------
+    # MEMORY TIER
+    # ---------------------------------------------------------
+
+    def _remember(self, key, value):
+        with self._lock:
+            self._memory[key] = value
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    # ---------------------------------------------------------
+    # PUBLIC API
+    # ---------------------------------------------------------
+
+    def get(self, key):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                return self._memory[key]
+
+        now = time.time()
+        conn = self._connect()
+        row = conn.execute(
+            "SELECT response, created_at FROM llm_cache WHERE key = ?", (key,)
+        ).fetchone()
+
+        if row and now - row[1] <= self.max_age_seconds:
+            conn.execute("UPDATE llm_cache SET last_used = ? WHERE key = ?", (now, key))
+            conn.commit()
+            conn.close()
+            value = json.loads(row[0])
+            self._remember(key, value)
+            with self._lock:
+                self.stats["disk_hits"] += 1
+            return value
+
+        conn.close()
+        with self._lock:
+            self.stats["misses"] += 1
+        return None
+
+    def set(self, key, value, model=None):
+        now = time.time()
+        self._remember(key, value)
+
+        conn = self._connect()
+        conn.execute("""
+            INSERT OR REPLACE INTO llm_cache (key, model, response, created_at, last_used)
+            VALUES (?, ?, ?, ?, ?)
+        """, (key, model, json.dumps(value, ensure_ascii=False), now, now))
+        conn.commit()
+        conn.close()
+
+        with self._lock:
+            self.stats["stores"] += 1
+            self._stores += 1
+            evict = self._stores % EVICT_EVERY == 0
+        if evict:
+            self.evict()
+
+    def delete(self, key):
+        """Invalidates one answer (e.g. its code failed when run)."""
+        with self._lock:
+            self._memory.pop(key, None)
+        conn = self._connect()
+        conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+        conn.commit()
+        conn.close()
+
+    def evict(self):
+        """Drops expired entries, then the least recently used ones past max_entries."""
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute("DELETE FROM llm_cache WHERE created_at < ?", (time.time() - self.max_age_seconds,))
+        removed = cur.rowcount
+        cur.execute("""
+            DELETE FROM llm_cache WHERE key IN (
+                SELECT key FROM llm_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.max_entries,))
+        removed += cur.rowcount
+        conn.commit()
+        conn.close()
+
+        with self._lock:
+            self.stats["evictions"] += removed
+        return removed
+
+    def hit_rate(self):
+        with self._lock:
+            hits = self.stats["memory_hits"] + self.stats["disk_hits"]
+            total = hits + self.stats["misses"]
+        return hits / total if total else 0.0
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    """Process-wide cache instance (created on first use)."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
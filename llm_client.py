@@ -0,0 +1,397 @@
+# llm_client.py
+import asyncio
+import collections
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+import httpx
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient, RateLimitError, InternalServerError, \
+    APIConnectionError, APITimeoutError
+from dotenv import load_dotenv
+from tracing import LLM_MODEL_SECONDS, LLM_HEDGES, LLM_QUEUE_SECONDS, LLM_RETRIES
+
+load_dotenv()
+
+# --- Configuration ---
+# Any OpenAI-compatible chat-completions endpoint works, e.g. the local
+# stand-in from llm_stub_server.py: LLM_BASE_URL=http://127.0.0.1:8001/v1
+DEFAULT_LLM_BASE_URL = "https://openrouter.ai/api/v1"
+LLM_BASE_URL = os.getenv("LLM_BASE_URL", DEFAULT_LLM_BASE_URL)
+LLM_API_KEY = os.getenv("LLM_API_KEY") or os.getenv("OPEN_ROUTER_KEY")
+LLM_MODEL = os.getenv("LLM_MODEL", "nvidia/nemotron-nano-9b-v2:free")
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "60"))
+
+# Ordered fallback/hedge list; the first entry is the primary model
+LLM_MODELS = [m.strip() for m in os.getenv("LLM_MODELS", LLM_MODEL).split(",") if m.strip()]
+# Hard wall-clock budget for one logical call, hedges included
+LLM_CALL_DEADLINE = float(os.getenv("LLM_CALL_DEADLINE", "90"))
+# Send a hedge to the next model once the current one is slower than this percentile of its own history
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "0.95"))
+# Hedge delay before a model has LLM_HEDGE_MIN_SAMPLES answers, and the floor afterwards
+LLM_HEDGE_DEFAULT_DELAY = float(os.getenv("LLM_HEDGE_DEFAULT_DELAY", "15"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "1"))
+LLM_HEDGE_MIN_SAMPLES = int(os.getenv("LLM_HEDGE_MIN_SAMPLES", "20"))
+LLM_LATENCY_WINDOW = int(os.getenv("LLM_LATENCY_WINDOW", "200"))
+
+# Provider budgets (0 = unlimited); callers queue for them instead of collecting 429s
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "0"))
+LLM_TOKENS_PER_MINUTE = float(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))
+# Tokens reserved for the answer when a request doesn't set max_tokens (corrected from usage afterwards)
+LLM_COMPLETION_TOKEN_RESERVE = int(os.getenv("LLM_COMPLETION_TOKEN_RESERVE", "512"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "8"))
+# Keep-alive connection pool shared by every caller
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE = int(os.getenv("LLM_MAX_KEEPALIVE", "10"))
+# Retries of one model on 429 / 5xx / connection errors, with full-jitter exponential backoff
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", "0.5"))
+LLM_BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", "20"))
+
+
+class LLMDeadlineExceeded(TimeoutError):
+    """No model produced an answer within the call deadline."""
+
+
+class LLMUnavailable(RuntimeError):
+    """Every model in the list failed."""
+
+
+def extract_json(text):
+    """The outermost {...} object in a model answer, parsed, or None."""
+    try:
+        return json.loads(text[text.index("{"): text.rindex("}") + 1])
+    except (ValueError, AttributeError):
+        return None
+
+
+def is_json_answer(text):
+    return isinstance(extract_json(text), dict)
+
+
+# ---------------------------------------------------------
+# PER-MODEL LATENCY
+# ---------------------------------------------------------
+
+class LatencyWindow:
+    """Latencies of the last N successful answers of one model."""
+
+    def __init__(self, size=LLM_LATENCY_WINDOW):
+        self.samples = collections.deque(maxlen=size)
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+
+    def percentile(self, fraction):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return None
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+_latencies = collections.defaultdict(LatencyWindow)
+
+
+def hedge_delay(model):
+    """Seconds to wait on `model` before hedging to the next one."""
+    window = _latencies[model]
+    if len(window.samples) < LLM_HEDGE_MIN_SAMPLES:
+        return LLM_HEDGE_DEFAULT_DELAY
+    return max(LLM_HEDGE_MIN_DELAY, window.percentile(LLM_HEDGE_PERCENTILE))
+
+
+def model_latency_stats():
+    """{model: {"samples", "p50", "p95", "p99", "hedge_delay"}} from recent successful answers."""
+    return {
+        model: {
+            "samples": len(window.samples),
+            "p50": window.percentile(0.50),
+            "p95": window.percentile(0.95),
+            "p99": window.percentile(0.99),
+            "hedge_delay": hedge_delay(model),
+        }
+        for model, window in list(_latencies.items())
+    }
+
+
+# ---------------------------------------------------------
+# RATE-LIMIT-AWARE SCHEDULER (token buckets, runs on the client loop)
+# ---------------------------------------------------------
+
+class TokenBucket:
+    """`per_minute` units, refilled continuously; the level may go negative after usage corrections."""
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60.0
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        self._refill()
+        amount = min(amount, self.capacity)  # one oversized request must still get through
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+class LLMScheduler:
+    """
+    Admits requests in FIFO order once the requests/min and tokens/min
+    buckets have room and fewer than `max_in_flight` are running. A 429
+    pauses admission for everyone, so one rate limit doesn't become a retry storm.
+    """
+
+    def __init__(self, requests_per_minute=LLM_REQUESTS_PER_MINUTE, tokens_per_minute=LLM_TOKENS_PER_MINUTE,
+                 max_in_flight=LLM_MAX_IN_FLIGHT):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._admission = asyncio.Lock()
+        self._in_flight = asyncio.Semaphore(max(1, max_in_flight))
+        self._paused_until = 0.0
+
+    def pause(self, seconds):
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def settle(self, reserved_tokens, used_tokens):
+        """Corrects the token bucket once the real usage is known."""
+        if self.tokens is not None and used_tokens is not None:
+            self.tokens.take(used_tokens - reserved_tokens)
+
+    @contextlib.asynccontextmanager
+    async def slot(self, tokens):
+        """Waits for budget and a free slot; yields the seconds spent queueing."""
+        started = time.monotonic()
+        async with self._admission:
+            while True:
+                wait = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens) if self.tokens else 0.0,
+                )
+                if wait <= 0:
+                    break
+                await asyncio.sleep(wait)
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+        await self._in_flight.acquire()
+        try:
+            queued = time.monotonic() - started
+            LLM_QUEUE_SECONDS.observe(queued)
+            yield queued
+        finally:
+            self._in_flight.release()
+
+
+def _estimate_tokens(messages, params):
+    prompt = sum(len(str(m.get("content", ""))) for m in messages) // 4
+    return prompt + int(params.get("max_tokens") or LLM_COMPLETION_TOKEN_RESERVE)
+
+
+def _backoff_delay(error, retry):
+    """Retry-After when the provider sends one, else full-jitter exponential backoff."""
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        if retry_after is not None:
+            return min(LLM_BACKOFF_MAX, float(retry_after))
+    except ValueError:
+        pass
+    return random.uniform(0, min(LLM_BACKOFF_MAX, LLM_BACKOFF_BASE * 2 ** retry))
+
+
+# ---------------------------------------------------------
+# SHARED ASYNC CLIENT (one loop thread, one keep-alive pool)
+# ---------------------------------------------------------
+
+_loop = None
+_async_client = None
+_scheduler = None
+_loop_lock = threading.Lock()
+
+
+def _get_loop():
+    global _loop, _async_client, _scheduler
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="llm-client-loop", daemon=True).start()
+            api_key = LLM_API_KEY or ("local" if LLM_BASE_URL != DEFAULT_LLM_BASE_URL else None)
+            http_client = DefaultAsyncHttpxClient(limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS, max_keepalive_connections=LLM_MAX_KEEPALIVE))
+            # retries are ours (scheduler-aware backoff + model failover), not the SDK's
+            _async_client = AsyncOpenAI(base_url=LLM_BASE_URL, api_key=api_key, max_retries=0,
+                                        timeout=LLM_TIMEOUT, http_client=http_client)
+            _scheduler = asyncio.run_coroutine_threadsafe(_make_scheduler(), _loop).result()
+    return _loop
+
+
+async def _make_scheduler():
+    return LLMScheduler()
+
+
+async def _request(model, messages, clock, params, info):
+    """
+    One model's answer: queued by the scheduler, retried on 429 / 5xx /
+    connection errors. The call deadline starts with the first request sent.
+    """
+    loop = asyncio.get_running_loop()
+    reserved = _estimate_tokens(messages, params)
+    for retry in range(LLM_MAX_RETRIES + 1):
+        async with _scheduler.slot(reserved) as queued:
+            info["queue_seconds"] = round(info["queue_seconds"] + queued, 3)
+            info["sent_at"] = loop.time()
+            if clock["deadline_at"] is None:
+                clock["deadline_at"] = info["sent_at"] + clock["deadline"]
+            deadline_at = clock["deadline_at"]
+            try:
+                response = await _async_client.chat.completions.create(
+                    model=model, messages=messages,
+                    timeout=max(0.1, min(LLM_TIMEOUT, deadline_at - loop.time())), **params)
+            except (RateLimitError, InternalServerError, APIConnectionError) as e:
+                if isinstance(e, APITimeoutError) or retry == LLM_MAX_RETRIES:
+                    raise
+                reason = "429" if isinstance(e, RateLimitError) else "connection" if isinstance(e, APIConnectionError) else "5xx"
+                delay = _backoff_delay(e, retry)
+                if loop.time() + delay >= deadline_at:
+                    raise
+                if reason == "429":
+                    _scheduler.pause(delay)
+                LLM_RETRIES.inc(model=model, reason=reason)
+                info["retries"] += 1
+                info["sent_at"] = None
+            else:
+                usage = getattr(response, "usage", None)
+                _scheduler.settle(reserved, getattr(usage, "total_tokens", None))
+                return response
+        await asyncio.sleep(delay)
+
+
+# ---------------------------------------------------------
+# HEDGED CALLS (losers are cancelled on the client loop)
+# ---------------------------------------------------------
+
+async def _hedged_call(messages, models, deadline, validate, params):
+    loop = asyncio.get_running_loop()
+    # queueing for rate-limit budget is reported, not failed; the deadline bounds provider time
+    clock = {"deadline": deadline, "deadline_at": None}
+    queue = list(models)
+    pending = {}      # task -> (model, is a hedge, info)
+    attempts = []
+    last_answer = None
+
+    def launch(hedge):
+        model = queue.pop(0)
+        info = {"launched": loop.time(), "sent_at": None, "queue_seconds": 0.0, "retries": 0}
+        task = loop.create_task(_request(model, messages, clock, params, info))
+        pending[task] = (model, hedge, info)
+        if hedge:
+            LLM_HEDGES.inc(result="launched")
+        return info
+
+    def finish(model, info, outcome, error=None):
+        now = loop.time()
+        # service time (after queueing) feeds the per-model latency; the attempt also records queue time
+        seconds = now - info["sent_at"] if info["sent_at"] else 0.0
+        if info["sent_at"]:
+            LLM_MODEL_SECONDS.observe(seconds, model=model, outcome=outcome)
+        attempts.append({"model": model, "seconds": round(now - info["launched"], 3), "outcome": outcome,
+                         "queue_seconds": info["queue_seconds"], "retries": info["retries"],
+                         **({"error": error} if error else {})})
+        return seconds
+
+    current = launch(hedge=False)
+    current_model = models[0]
+    try:
+        while pending:
+            now = loop.time()
+            remaining = clock["deadline_at"] - now if clock["deadline_at"] else float("inf")
+            if remaining <= 0:
+                raise LLMDeadlineExceeded(f"No LLM answer within {deadline:g}s")
+            # the hedge clock starts when a request is actually sent, not while it queues for budget
+            if queue and current["sent_at"]:
+                wait = min(remaining, max(0.0, current["sent_at"] + hedge_delay(current_model) - now))
+            elif queue:
+                wait = min(remaining, 0.25)
+            else:
+                wait = remaining if remaining != float("inf") else 0.25
+            done, _ = await asyncio.wait(pending, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+
+            for task in done:
+                model, hedge, info = pending.pop(task)
+                try:
+                    response = task.result()
+                except Exception as e:
+                    finish(model, info, "error", f"{type(e).__name__}: {e}")
+                    continue
+                text = (response.choices[0].message.content or "").strip()
+                if validate and not validate(text):
+                    finish(model, info, "invalid")
+                    last_answer = (model, response, text)
+                    continue
+                _latencies[model].add(finish(model, info, "ok"))
+                if hedge:
+                    LLM_HEDGES.inc(result="won")
+                return model, response, text, attempts
+
+            # hedge when the current model is slow; fail over at once when nothing is in flight
+            # a model backing off after 429/5xx counts as slow too
+            slow = (loop.time() >= current["sent_at"] + hedge_delay(current_model) if current["sent_at"]
+                    else current["retries"] > 0)
+            if queue and (not pending or slow):
+                current_model = queue[0]
+                current = launch(hedge=bool(pending))
+    finally:
+        for task, (model, _, info) in pending.items():
+            task.cancel()
+            finish(model, info, "cancelled")
+
+    if last_answer:
+        # nothing valid: hand back the last answer so callers' own parse-error handling runs
+        model, response, text = last_answer
+        return model, response, text, attempts
+    raise LLMUnavailable("All LLM models failed: " + "; ".join(
+        f"{a['model']}: {a.get('error', a['outcome'])}" for a in attempts))
+
+
+def _result(model, response, text, attempts):
+    return {"text": text, "model": model, "usage": getattr(response, "usage", None), "attempts": attempts,
+            "queue_seconds": round(sum(a["queue_seconds"] for a in attempts), 3)}
+
+
+def complete_hedged(messages, models=None, deadline=LLM_CALL_DEADLINE, validate=None, **params):
+    """
+    One logical chat completion across the ordered model list. Starts with
+    the first model; if it hasn't answered by its latency percentile, the
+    next model is tried in parallel (errors fail over immediately). The first
+    answer accepted by `validate` wins and the others are cancelled.
+
+    Returns {"text", "model", "usage", "attempts", "queue_seconds"}. Raises
+    LLMDeadlineExceeded or LLMUnavailable. Time spent queueing for rate-limit
+    budget (queue_seconds) doesn't count against `deadline`.
+    """
+    future = asyncio.run_coroutine_threadsafe(
+        _hedged_call(messages, list(models or LLM_MODELS), deadline, validate, params), _get_loop())
+    try:
+        return _result(*future.result())
+    except BaseException:
+        future.cancel()
+        raise
+
+
+async def acomplete_hedged(messages, models=None, deadline=LLM_CALL_DEADLINE, validate=None, **params):
+    """Async form of complete_hedged(), awaitable from any event loop (cancelling it cancels the call)."""
+    future = asyncio.run_coroutine_threadsafe(
+        _hedged_call(messages, list(models or LLM_MODELS), deadline, validate, params), _get_loop())
+    return _result(*await asyncio.wrap_future(future))
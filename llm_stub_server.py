@@ -0,0 +1,282 @@
+# llm_stub_server.py
+import argparse
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+# Local OpenAI-compatible stand-in for load tests:
+#   python llm_stub_server.py --port 8001 --latency lognormal:6,0.5 --error-rate 0.02
+#   LLM_BASE_URL=http://127.0.0.1:8001/v1 uvicorn main:app
+
+
+# ---------------------------------------------------------
+# LATENCY / ERRORS
+# ---------------------------------------------------------
+
+def parse_latency(spec):
+    """
+    Returns a function giving one latency sample in seconds. Specs (ms):
+      fixed:200 | uniform:100,500 | normal:300,50 | exp:300 | lognormal:<mu>,<sigma>
+    (lognormal parameters are for ln(ms), e.g. lognormal:6,0.5 ≈ 400ms median)
+    """
+    kind, _, args = spec.partition(":")
+    values = [float(v) for v in args.split(",") if v]
+    samplers = {
+        "fixed": lambda: values[0],
+        "uniform": lambda: random.uniform(values[0], values[1]),
+        "normal": lambda: random.gauss(values[0], values[1]),
+        "exp": lambda: random.expovariate(1 / values[0]),
+        "lognormal": lambda: random.lognormvariate(values[0], values[1]),
+    }
+    if kind not in samplers:
+        raise ValueError(f"Unknown latency distribution: {spec}")
+    return lambda: max(0.0, samplers[kind]()) / 1000
+
+
+class FaultConfig:
+    """Error injection: HTTP errors (e.g. 429/500/503) and hung requests."""
+
+    def __init__(self, error_rate=0.0, error_codes=(429, 500, 503), timeout_rate=0.0, hang_seconds=120):
+        self.error_rate = error_rate
+        self.error_codes = tuple(error_codes)
+        self.timeout_rate = timeout_rate
+        self.hang_seconds = hang_seconds
+
+    def draw(self):
+        """Returns None, ("error", status) or ("hang", seconds) for one request."""
+        roll = random.random()
+        if roll < self.timeout_rate:
+            return ("hang", self.hang_seconds)
+        if roll < self.timeout_rate + self.error_rate:
+            return ("error", random.choice(self.error_codes))
+        return None
+
+
+# ---------------------------------------------------------
+# RESPONSES
+# ---------------------------------------------------------
+
+def _messages_key(messages):
+    text = json.dumps([[m.get("role"), m.get("content")] for m in messages], sort_keys=True)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class ResponseBook:
+    """
+    Picks the reply for a request, in order:
+      1. recorded replies (exact match on the message list),
+      2. scripted rules ({"match": <regex on the last user message>, "response": str | [str, ...]}),
+      3. a built-in default that understands this repo's prompts.
+    """
+
+    def __init__(self, rules=None, recorded=None):
+        self.rules = [(re.compile(r["match"], re.S), r["response"]) for r in (rules or [])]
+        self.recorded = recorded or {}
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_files(cls, script_path=None, recorded_path=None):
+        rules, recorded = [], {}
+        if script_path:
+            with open(script_path, "r", encoding="utf-8") as f:
+                rules = json.load(f)
+        if recorded_path:
+            with open(recorded_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        recorded[_messages_key(entry["messages"])] = entry["content"]
+        return cls(rules, recorded)
+
+    def reply(self, messages):
+        key = _messages_key(messages)
+        if key in self.recorded:
+            return self.recorded[key]
+
+        last_user = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        for index, (pattern, response) in enumerate(self.rules):
+            if pattern.search(last_user):
+                if isinstance(response, list):
+                    with self._lock:
+                        count = self._counters.get(index, 0)
+                        self._counters[index] = count + 1
+                    return response[count % len(response)]
+                return response
+
+        return default_reply(messages, last_user)
+
+
+def default_reply(messages, last_user):
+    """Shape-correct answers for the agent step, plan and parameter-extraction prompts."""
+    step = re.search(r'Next Required Step \(from UI\):\s*"(.*?)"', last_user, re.S)
+    if step:
+        return json.dumps({"goal": step.group(1), "code": "time.sleep(0)"})
+
+    remaining = re.search(r"Remaining Steps \(from UI, in order\):\n(.*?)\n\n", last_user, re.S)
+    if remaining:
+        steps = [re.sub(r"^\d+\.\s*", "", line) for line in remaining.group(1).splitlines() if line.strip()]
+        return json.dumps({"steps": [{"goal": s, "code": "time.sleep(0)"} for s in steps]})
+
+    url = re.search(r"https?://\S+", last_user)
+    return json.dumps({
+        "url": url.group(0) if url else None,
+        "username": None,
+        "password": None,
+        "goal": last_user,
+    })
+
+
+def completion_payload(model, content, prompt_text):
+    prompt_tokens = max(1, len(prompt_text) // 4)
+    completion_tokens = max(1, len(content) // 4)
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": model,
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": content},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        },
+    }
+
+
+# ---------------------------------------------------------
+# SERVER
+# ---------------------------------------------------------
+
+class StubStats:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.responses = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def begin(self):
+        with self.lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def end(self, outcome):
+        with self.lock:
+            self.in_flight -= 1
+            self.responses[outcome] = self.responses.get(outcome, 0) + 1
+
+    def to_dict(self):
+        with self.lock:
+            return {"requests": self.requests, "responses": dict(self.responses),
+                    "in_flight": self.in_flight, "max_in_flight": self.max_in_flight}
+
+
+def make_handler(book, latency, faults, stats):
+    class StubHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status, payload, headers=None):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path.rstrip("/") in ("/stats", "/v1/stats"):
+                return self._send_json(200, stats.to_dict())
+            if self.path.rstrip("/") in ("/models", "/v1/models"):
+                return self._send_json(200, {"object": "list", "data": [{"id": "stub", "object": "model"}]})
+            self._send_json(404, {"error": {"message": "not found"}})
+
+        def do_POST(self):
+            if self.path.rstrip("/") not in ("/chat/completions", "/v1/chat/completions"):
+                return self._send_json(404, {"error": {"message": "not found"}})
+
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            messages = request.get("messages", [])
+            stats.begin()
+            outcome = "200"
+
+            try:
+                fault = faults.draw()
+                time.sleep(latency())
+
+                if fault and fault[0] == "hang":
+                    outcome = "hang"
+                    time.sleep(fault[1])
+                    return self._send_json(504, {"error": {"message": "stub hang"}})
+
+                if fault:
+                    outcome = str(fault[1])
+                    headers = {"Retry-After": "1"} if fault[1] == 429 else None
+                    return self._send_json(fault[1], {"error": {"message": f"stub error {fault[1]}",
+                                                                "type": "stub_fault"}}, headers)
+
+                content = book.reply(messages)
+                prompt_text = "".join(str(m.get("content", "")) for m in messages)
+                self._send_json(200, completion_payload(request.get("model", "stub"), content, prompt_text))
+
+            except (BrokenPipeError, ConnectionResetError):
+                outcome = "client_disconnected"
+            finally:
+                stats.end(outcome)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+def serve(host="127.0.0.1", port=8001, latency="fixed:0", error_rate=0.0, error_codes=(429, 500, 503),
+          timeout_rate=0.0, script=None, recorded=None):
+    """Builds the stub server (call .serve_forever() or run it in a thread)."""
+    book = ResponseBook.from_files(script, recorded)
+    stats = StubStats()
+    handler = make_handler(book, parse_latency(latency),
+                           FaultConfig(error_rate, error_codes, timeout_rate), stats)
+    httpd = ThreadingHTTPServer((host, port), handler)
+    httpd.daemon_threads = True
+    httpd.stats = stats
+    return httpd
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local OpenAI-compatible chat-completions stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8001)
+    parser.add_argument("--latency", default="fixed:0",
+                        help="fixed:MS | uniform:LO,HI | normal:MEAN,SD | exp:MEAN | lognormal:MU,SIGMA")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with an error")
+    parser.add_argument("--error-codes", default="429,500,503")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Fraction of requests that hang")
+    parser.add_argument("--script", help='JSON list of {"match": regex, "response": str | [str, ...]}')
+    parser.add_argument("--recorded", help='JSONL of {"messages": [...], "content": str} recorded replies')
+    args = parser.parse_args()
+
+    httpd = serve(args.host, args.port, args.latency, args.error_rate,
+                  tuple(int(c) for c in args.error_codes.split(",") if c), args.timeout_rate,
+                  args.script, args.recorded)
+    print(f"🤖 LLM stand-in listening on http://{args.host}:{args.port}/v1 (latency {args.latency}, "
+          f"errors {args.error_rate:.0%}, hangs {args.timeout_rate:.0%})")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {json.dumps(httpd.stats.to_dict())}")
@@ -0,0 +1,137 @@
+# load_test.py
+import argparse
+import json
+import os
+import socket
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+# Drives /api/chat concurrently, e.g. against an app that talks to llm_stub_server.py:
+#   python load_test.py --target http://127.0.0.1:8000 --concurrency 1,2,4,8 --requests 20
+
+# --- Configuration ---
+LOAD_TEST_OUTPUT_DIR = os.getenv("LOAD_TEST_OUTPUT_DIR", "load_test_results")
+
+DEFAULT_PROMPT = (
+    "Test https://www.saucedemo.com/ username: standard_user password: secret_sauce\n"
+    "1. Log in with the given credentials\n"
+    "2. Add the Sauce Labs Backpack to the cart\n"
+    "3. Open the cart"
+)
+
+
+def _percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def send_chat(target, prompt, timeout):
+    """One POST /api/chat/. Returns (seconds, outcome) where outcome names the failure mode."""
+    body = json.dumps({"user_prompt": prompt}).encode("utf-8")
+    request = urllib.request.Request(f"{target.rstrip('/')}/api/chat/", data=body,
+                                     headers={"Content-Type": "application/json"})
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            text = response.read().decode("utf-8", errors="replace")
+        # run_chat reports pipeline errors as a 200 with a ❌ report
+        if text.startswith("❌"):
+            outcome = "app_error"
+        elif "🛑 Stopped due to max step budget" in text:
+            outcome = "step_budget"
+        else:
+            outcome = "ok"
+    except urllib.error.HTTPError as e:
+        outcome = f"http_{e.code}"
+    except (socket.timeout, TimeoutError):
+        outcome = "timeout"
+    except urllib.error.URLError as e:
+        outcome = "timeout" if isinstance(e.reason, socket.timeout) else "connection_error"
+    except ConnectionError:
+        outcome = "connection_error"
+    return time.perf_counter() - started, outcome
+
+
+def run_level(target, prompts, concurrency, total_requests, timeout):
+    """Fires `total_requests` with at most `concurrency` in flight; returns the level summary."""
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda i: send_chat(target, prompts[i % len(prompts)], timeout), range(total_requests)))
+    wall = time.perf_counter() - started
+
+    outcomes = {}
+    for _, outcome in results:
+        outcomes[outcome] = outcomes.get(outcome, 0) + 1
+    ok_latencies = sorted(seconds for seconds, outcome in results if outcome == "ok")
+    all_latencies = sorted(seconds for seconds, _ in results)
+
+    return {
+        "concurrency": concurrency,
+        "requests": total_requests,
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(total_requests / wall, 3) if wall else None,
+        "ok_throughput_rps": round(len(ok_latencies) / wall, 3) if wall else None,
+        "p50_seconds": _percentile(ok_latencies, 0.50),
+        "p99_seconds": _percentile(ok_latencies, 0.99),
+        "p50_all_seconds": _percentile(all_latencies, 0.50),
+        "p99_all_seconds": _percentile(all_latencies, 0.99),
+        "mean_seconds": statistics.mean(all_latencies) if all_latencies else None,
+        "failure_rate": round(1 - len(ok_latencies) / total_requests, 4) if total_requests else 0.0,
+        "outcomes": outcomes,
+    }
+
+
+def run_load_test(target, concurrency_levels, requests_per_level, prompts=None, timeout=300):
+    prompts = prompts or [DEFAULT_PROMPT]
+    levels = []
+    for concurrency in concurrency_levels:
+        print(f"🚦 Concurrency {concurrency}: sending {requests_per_level} requests to {target}")
+        level = run_level(target, prompts, concurrency, requests_per_level, timeout)
+        levels.append(level)
+
+        p50 = f"{level['p50_seconds']:.2f}s" if level["p50_seconds"] is not None else "n/a"
+        p99 = f"{level['p99_seconds']:.2f}s" if level["p99_seconds"] is not None else "n/a"
+        emoji = "✅" if level["failure_rate"] == 0 else "⚠️"
+        print(f"{emoji} {level['throughput_rps']} req/s, p50 {p50}, p99 {p99}, "
+              f"failures {level['failure_rate']:.1%} {level['outcomes']}")
+
+    return {"target": target, "timestamp": time.time(), "levels": levels}
+
+
+def _load_prompts(path):
+    """One prompt per JSON line ({"prompt": ...}) or a plain-text file holding a single prompt."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read()
+    if path.endswith(".jsonl"):
+        return [json.loads(line)["prompt"] for line in raw.splitlines() if line.strip()]
+    return [raw]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Concurrent load generator for /api/chat.")
+    parser.add_argument("--target", default="http://127.0.0.1:8000", help="Base URL of the running app")
+    parser.add_argument("--concurrency", default="1,2,4,8", help="Comma-separated concurrency levels")
+    parser.add_argument("--requests", type=int, default=20, help="Requests per concurrency level")
+    parser.add_argument("--prompts", help="Prompt file (.jsonl of {\"prompt\": ...} or plain text)")
+    parser.add_argument("--timeout", type=float, default=300, help="Per-request timeout in seconds")
+    parser.add_argument("--output", help="Results JSON path (default: load_test_results/<timestamp>.json)")
+    args = parser.parse_args()
+
+    report = run_load_test(
+        args.target,
+        [int(c) for c in args.concurrency.split(",") if c],
+        args.requests,
+        _load_prompts(args.prompts) if args.prompts else None,
+        args.timeout,
+    )
+
+    output = args.output or os.path.join(LOAD_TEST_OUTPUT_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📊 Results written to {output}")
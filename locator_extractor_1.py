@@ -1,30 +1,39 @@
 # locator_extractor.py
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
 from bs4 import BeautifulSoup
 from selenium.webdriver.common.by import By
-import time
+import os
 from lxml import etree
+from locator_extractor_lxml import extract_dom_metadata_lxml
+from locator_extractor_live import LiveDomExtractor
+from browser_pool import get_browser_pool
+from page_settle import wait_for_page_settle
+from tracing import span
+
+# "lxml" = single-pass scanner (absolute page XPaths), "bs4" = legacy scanner,
+# "live" = in-browser snapshots with per-step deltas (raw HTML still goes to lxml)
+DOM_EXTRACTOR_BACKEND = os.getenv("DOM_EXTRACTOR_BACKEND", "lxml")
 
 
 def get_rendered_html(url):
     """Loads a URL headlessly and returns fully rendered HTML."""
-    options = Options()
-    options.add_argument("--headless=new")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--disable-dev-shm-usage")
+    with get_browser_pool().lease() as session:
+        session.open(url)
+        return get_rendered_html_from_driver(session.driver)
 
-    driver = webdriver.Chrome(options=options)
-    driver.get(url)
-    time.sleep(2)
 
-    # Scroll to force full DOM render
-    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-    time.sleep(1)
+def get_rendered_html_from_driver(driver, scroll=True):
+    """Returns fully rendered HTML of the page already loaded in `driver`."""
+    if scroll:
+        scroll_to_render(driver)
+
+    return driver.page_source
 
-    html = driver.page_source
-    driver.quit()
-    return html
+
+def scroll_to_render(driver):
+    """Scrolls to the bottom to force lazy content to render, then back to the top."""
+    driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
+    wait_for_page_settle(driver)
+    driver.execute_script("window.scrollTo(0, 0);")
 
 
 # ---------------------------------------------------------
@@ -101,8 +110,19 @@ def extract_common_attrs(tag):
 # MAIN DOM SCANNER
 # ---------------------------------------------------------
 
-def extract_dom_metadata(html):
+def extract_dom_metadata(html, backend=None):
     """Extracts full DOM metadata including inputs, buttons, images, clickables, etc."""
+    backend = backend or DOM_EXTRACTOR_BACKEND
+    if backend not in ("lxml", "live", "bs4"):
+        raise ValueError(f"Unknown DOM extractor backend: {backend}")
+    with span("dom_parse", backend=backend, html_chars=len(html)):
+        if backend == "bs4":
+            return extract_dom_metadata_bs4(html)
+        return extract_dom_metadata_lxml(html)
+
+
+def extract_dom_metadata_bs4(html):
+    """Legacy BeautifulSoup scanner (fragment-relative XPaths)."""
     soup = BeautifulSoup(html, "html.parser")
 
     inputs, buttons, links, images, labels, selects, products = [], [], [], [], [], [], []
@@ -193,3 +213,34 @@ def extract_dom_metadata(html):
 def extract_locators_for_url(url):
     html = get_rendered_html(url)
     return extract_dom_metadata(html)
+
+
+def extract_locators_from_driver(driver, scroll=True):
+    """Extracts DOM metadata from a live driver without launching a new browser."""
+    html = get_rendered_html_from_driver(driver, scroll=scroll)
+    return extract_dom_metadata(html)
+
+
+# ---------------------------------------------------------
+# PER-RUN EXTRACTORS (live driver, called after every step)
+# ---------------------------------------------------------
+
+class PageSourceExtractor:
+    """Pulls driver.page_source and re-parses it on every call."""
+
+    def __init__(self, driver, backend=None):
+        self.driver = driver
+        self.backend = backend
+
+    def extract(self):
+        with span("dom_extract", backend=self.backend or DOM_EXTRACTOR_BACKEND):
+            return extract_dom_metadata(self.driver.page_source, backend=self.backend)
+
+
+def create_dom_extractor(driver, backend=None):
+    """Returns the extractor a run should call after each step."""
+    backend = backend or DOM_EXTRACTOR_BACKEND
+    if backend == "live":
+        return LiveDomExtractor(driver)
+    return PageSourceExtractor(driver, backend=backend)
+
@@ -0,0 +1,234 @@
+# locator_extractor_live.py
+from tracing import span
+
+# ---------------------------------------------------------
+# IN-BROWSER SNAPSHOT SCRIPT
+# ---------------------------------------------------------
+# Builds the same element metadata as extract_dom_metadata, but inside the
+# page, and remembers what it sent last time (window.__domSnap). Later calls
+# only return elements that were added, changed or removed, plus the new
+# element order if it moved. A fresh document (navigation) has no
+# __domSnap, so the first call on every page is a full snapshot.
+
+SNAPSHOT_JS = r"""
+var forceFull = arguments[0];
+var state = window.__domSnap;
+var full = false;
+if (!state || forceFull) {
+  state = window.__domSnap = {
+    nextKey: 1, keys: new WeakMap(), sigs: new Map(), order: '', products: ''
+  };
+  full = true;
+}
+
+function keyOf(el) {
+  var k = state.keys.get(el);
+  if (!k) { k = state.nextKey++; state.keys.set(el, k); }
+  return k;
+}
+
+// --- absolute xpaths, same rules as lxml getpath() ---
+var segs = new Map(), paths = new Map();
+function assignSegments(parent) {
+  var kids = parent.children, totals = {}, seen = {}, i, t;
+  for (i = 0; i < kids.length; i++) { t = kids[i].localName; totals[t] = (totals[t] || 0) + 1; }
+  for (i = 0; i < kids.length; i++) {
+    t = kids[i].localName; seen[t] = (seen[t] || 0) + 1;
+    segs.set(kids[i], totals[t] > 1 ? t + '[' + seen[t] + ']' : t);
+  }
+}
+function xpathOf(el) {
+  var p = paths.get(el);
+  if (p) { return p; }
+  var parent = el.parentElement;
+  if (!parent) { p = '/' + el.localName; }
+  else {
+    if (!segs.has(el)) { assignSegments(parent); }
+    p = xpathOf(parent) + '/' + segs.get(el);
+  }
+  paths.set(el, p);
+  return p;
+}
+
+// --- BeautifulSoup get_text(strip=True) equivalent ---
+function textOf(el) {
+  var out = [], walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT), n, t, pn;
+  while ((n = walker.nextNode())) {
+    pn = n.parentNode && n.parentNode.localName;
+    if (pn === 'script' || pn === 'style') { continue; }
+    t = n.nodeValue.trim();
+    if (t) { out.push(t); }
+  }
+  return out.join('');
+}
+
+function infoOf(el) {
+  var attrs = {}, i, a;
+  for (i = 0; i < el.attributes.length; i++) {
+    a = el.attributes[i];
+    attrs[a.name] = a.name === 'class' ? a.value.split(/\s+/).filter(Boolean) : a.value;
+  }
+  var tag = el.localName, cls = attrs['class'];
+  var css = attrs.id ? '#' + attrs.id : (cls && cls.length ? tag + '.' + cls.join('.') : tag);
+  function g(name) { return attrs[name] === undefined ? null : attrs[name]; }
+  return {
+    tag: tag, attributes: attrs, text: textOf(el),
+    id: g('id'), 'class': g('class'), name: g('name'), placeholder: g('placeholder'),
+    value: g('value'), type: g('type'), role: g('role'), href: g('href'), src: g('src'),
+    title: g('title'), alt: g('alt'), aria_label: g('aria-label'),
+    aria_labelledby: g('aria-labelledby'),
+    data_test: g('data-test') || g('data-testid') || g('data-qa') || null,
+    css_selector: css, xpath: xpathOf(el)
+  };
+}
+
+function categoriesOf(el) {
+  var tag = el.localName, cats = [];
+  if (tag === 'input') { cats.push('inputs'); }
+  else if (tag === 'button') { cats.push('buttons'); }
+  else if (tag === 'a') { cats.push('links'); }
+  else if (tag === 'img') { cats.push('images'); }
+  else if (tag === 'label' || tag === 'span') { cats.push('labels'); }
+  else if (tag === 'select') { cats.push('selects'); }
+
+  var clickable = tag === 'button' || tag === 'a' ||
+    el.getAttribute('onclick') || el.getAttribute('role') === 'button' ||
+    el.getAttribute('tabindex') === '0' ||
+    (el.getAttribute('class') || '').toLowerCase().indexOf('click') !== -1 ||
+    el.getAttribute('data-test') || el.getAttribute('data-testid');
+  if (clickable) { cats.push('clickables'); }
+  return cats;
+}
+
+// --- element pass ---
+var all = document.getElementsByTagName('*');
+var order = [], upserts = [], seenKeys = new Set(), i, el, cats, key, item, sig;
+for (i = 0; i < all.length; i++) {
+  el = all[i];
+  cats = categoriesOf(el);
+  if (!cats.length) { continue; }
+  key = keyOf(el);
+  seenKeys.add(key);
+  order.push(key);
+
+  item = { key: key, cats: cats, info: infoOf(el) };
+  if (el.localName === 'select') {
+    item.info.options = Array.prototype.map.call(el.querySelectorAll('option'), textOf);
+  }
+  sig = JSON.stringify(item);
+  if (state.sigs.get(key) !== sig) {
+    state.sigs.set(key, sig);
+    upserts.push(item);
+  }
+}
+
+var removed = [];
+state.sigs.forEach(function (_, k) { if (!seenKeys.has(k)) { removed.push(k); } });
+removed.forEach(function (k) { state.sigs.delete(k); });
+
+var orderSig = order.join(',');
+var orderChanged = orderSig !== state.order;
+state.order = orderSig;
+
+// --- product-like cards (few per page, so always recomputed) ---
+var cardSelectors = ['[class*=product]', '[class*=inventory]', '.card', '.item', '[data-test*=item]'];
+function ownString(node) {
+  return node.children.length === 0 && node.textContent.trim() ? node.textContent : null;
+}
+var products = [];
+cardSelectors.forEach(function (sel) {
+  document.querySelectorAll(sel).forEach(function (card) {
+    var title = null, price = null, btn = null;
+    var nodes = card.querySelectorAll('h1,h2,h3,span,div,button');
+    for (var j = 0; j < nodes.length; j++) {
+      var n = nodes[j], t = n.localName, s = ownString(n);
+      if (!btn && t === 'button') { btn = n; }
+      if (!title && t !== 'button' && s) { title = n; }
+      if (!price && (t === 'span' || t === 'div') && s && s.indexOf('$') !== -1) { price = n; }
+      if (title && price && btn) { break; }
+    }
+    products.push({
+      title: title ? textOf(title) : null,
+      price: price ? textOf(price) : null,
+      button: btn ? infoOf(btn) : null
+    });
+  });
+});
+var productSig = JSON.stringify(products);
+var productsChanged = productSig !== state.products;
+state.products = productSig;
+
+return {
+  full: full,
+  upserts: upserts,
+  removed: removed,
+  order: (full || orderChanged) ? order : null,
+  products: (full || productsChanged) ? products : null,
+  total: order.length
+};
+"""
+
+CATEGORIES = ["inputs", "buttons", "links", "images", "labels", "selects", "products", "clickables"]
+
+
+class LiveDomExtractor:
+    """
+    In-browser DOM extractor for one live driver.
+
+    The first call returns the full element set. Later calls only pull the
+    elements that were added, changed or removed since the previous call,
+    and merge them into the locally kept element store. Transfer and
+    parsing cost then follows what changed, not the page size.
+    """
+
+    def __init__(self, driver):
+        self.driver = driver
+        self.elements = {}     # key -> {"cats": [...], "info": {...}}
+        self.order = []
+        self.products = []
+        self.last_delta = None
+
+    def reset(self):
+        self.elements, self.order, self.products = {}, [], []
+
+    def extract(self, force_full=False):
+        with span("dom_extract", backend="live") as attrs:
+            payload = self.driver.execute_script(SNAPSHOT_JS, force_full)
+            attrs.update(full=payload["full"], upserts=len(payload["upserts"]), total=payload["total"])
+
+        if payload["full"]:
+            self.reset()
+
+        for item in payload["upserts"]:
+            self.elements[item["key"]] = item
+        for key in payload["removed"]:
+            self.elements.pop(key, None)
+        if payload["order"] is not None:
+            self.order = payload["order"]
+        if payload["products"] is not None:
+            self.products = payload["products"]
+
+        self.last_delta = {
+            "full": payload["full"],
+            "upserted": len(payload["upserts"]),
+            "removed": len(payload["removed"]),
+            "total": payload["total"],
+        }
+        kind = "full snapshot" if payload["full"] else "delta"
+        print(
+            f"🧬 DOM {kind}: {self.last_delta['upserted']} added/changed, "
+            f"{self.last_delta['removed']} removed, {self.last_delta['total']} tracked"
+        )
+        return self.tag_dict()
+
+    def tag_dict(self):
+        """Rebuilds the categorized payload from the merged element store."""
+        result = {cat: [] for cat in CATEGORIES}
+        for key in self.order:
+            item = self.elements.get(key)
+            if item is None:
+                continue
+            for cat in item["cats"]:
+                result[cat].append(item["info"])
+        result["products"] = list(self.products)
+        return result
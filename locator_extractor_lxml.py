@@ -0,0 +1,235 @@
+# locator_extractor_lxml.py
+from collections import Counter
+from lxml import etree
+
+
+# ---------------------------------------------------------
+# PRODUCT CARD MATCHING
+# ---------------------------------------------------------
+# Same card selectors as locator_extractor_1, expressed as plain predicates
+# so they can be evaluated during the single tree walk.
+
+CARD_MATCHERS = [
+    ("[class*=product]", lambda el: "product" in (el.get("class") or "")),
+    ("[class*=inventory]", lambda el: "inventory" in (el.get("class") or "")),
+    (".card", lambda el: "card" in (el.get("class") or "").split()),
+    (".item", lambda el: "item" in (el.get("class") or "").split()),
+    ("[data-test*=item]", lambda el: "item" in (el.get("data-test") or "")),
+]
+
+TITLE_TAGS = ("h1", "h2", "h3", "span", "div")
+PRICE_TAGS = ("span", "div")
+
+
+def _text(el):
+    """Same result as BeautifulSoup's get_text(strip=True)."""
+    return "".join(s.strip() for s in el.itertext())
+
+
+def _own_string(el):
+    """Rough equivalent of BeautifulSoup's `.string` for leaf elements."""
+    if len(el) == 0 and el.text and el.text.strip():
+        return el.text
+    return None
+
+
+# ---------------------------------------------------------
+# CSS SELECTOR + ATTRIBUTE EXTRACTION
+# ---------------------------------------------------------
+
+def build_css_selector(el):
+    """Generate a reliable CSS selector for any element."""
+    if el.get("id"):
+        return f'#{el.get("id")}'
+
+    if el.get("class"):
+        classes = ".".join(el.get("class").split())
+        return f"{el.tag}.{classes}"
+
+    return el.tag
+
+
+def extract_common_attrs(el, xpath=None):
+    """Extract all meaningful attributes (same shape as locator_extractor_1)."""
+    attributes = dict(el.attrib)
+    if "class" in attributes:
+        # BeautifulSoup exposes class as a list; keep the payload identical
+        attributes["class"] = attributes["class"].split()
+
+    return {
+        "tag": el.tag,
+        "attributes": attributes,
+        "text": _text(el),
+
+        # key attributes
+        "id": attributes.get("id"),
+        "class": attributes.get("class"),
+        "name": attributes.get("name"),
+        "placeholder": attributes.get("placeholder"),
+        "value": attributes.get("value"),
+        "type": attributes.get("type"),
+        "role": attributes.get("role"),
+        "href": attributes.get("href"),
+        "src": attributes.get("src"),
+        "title": attributes.get("title"),
+        "alt": attributes.get("alt"),
+        "aria_label": attributes.get("aria-label"),
+        "aria_labelledby": attributes.get("aria-labelledby"),
+        "data_test": (
+            attributes.get("data-test")
+            or attributes.get("data-testid")
+            or attributes.get("data-qa")
+        ),
+
+        # selectors
+        "css_selector": build_css_selector(el),
+        "xpath": xpath,
+    }
+
+
+# ---------------------------------------------------------
+# SINGLE-PASS TREE WALK
+# ---------------------------------------------------------
+
+def _walk_with_xpaths(root):
+    """
+    Yields (element, absolute_xpath) in document order.
+
+    XPaths are built from the parent's path plus a sibling index, so every
+    node is visited once instead of calling getpath() per element.
+    Like lxml's getpath(), the [n] index is only added when the parent has
+    more than one child with the same tag.
+    """
+    paths = {root: f"/{root.tag}"}
+    yield root, paths[root]
+
+    for el in root.iterdescendants():
+        if not isinstance(el.tag, str):
+            continue  # comments / processing instructions
+
+        if el not in paths:
+            parent = el.getparent()
+            parent_path = paths[parent]
+            children = [c for c in parent if isinstance(c.tag, str)]
+            totals = Counter(c.tag for c in children)
+            seen = Counter()
+            for child in children:
+                seen[child.tag] += 1
+                if totals[child.tag] > 1:
+                    paths[child] = f"{parent_path}/{child.tag}[{seen[child.tag]}]"
+                else:
+                    paths[child] = f"{parent_path}/{child.tag}"
+
+        yield el, paths[el]
+
+
+def _find_card_details(item, xpaths):
+    """Title / price / button lookup inside one product card."""
+    title = price = btn = None
+
+    for el in item.iterdescendants(*TITLE_TAGS, "button"):
+        tag = el.tag
+        if btn is None and tag == "button":
+            btn = el
+        if title is None and tag in TITLE_TAGS and _own_string(el):
+            title = el
+        if price is None and tag in PRICE_TAGS and "$" in (_own_string(el) or ""):
+            price = el
+        if title is not None and price is not None and btn is not None:
+            break
+
+    return {
+        "title": _text(title) if title is not None else None,
+        "price": _text(price) if price is not None else None,
+        "button": extract_common_attrs(btn, xpaths.get(btn)) if btn is not None else None,
+    }
+
+
+# ---------------------------------------------------------
+# MAIN DOM SCANNER
+# ---------------------------------------------------------
+
+def extract_dom_metadata_lxml(html):
+    """
+    Single-pass DOM scanner.
+    Parses the page once with lxml and returns the same payload as
+    locator_extractor_1.extract_dom_metadata, with absolute page XPaths.
+    """
+    empty = {
+        "inputs": [], "buttons": [], "links": [], "images": [],
+        "labels": [], "selects": [], "products": [], "clickables": [],
+    }
+    if not html or not html.strip():
+        return empty
+
+    root = etree.HTML(html, etree.HTMLParser())
+    if root is None:
+        return empty
+
+    inputs, buttons, links, images, labels, selects, products = [], [], [], [], [], [], []
+    clickables = []
+    cards = {sel: [] for sel, _ in CARD_MATCHERS}
+    xpaths = {}
+
+    for el, xpath in _walk_with_xpaths(root):
+        xpaths[el] = xpath
+        info = extract_common_attrs(el, xpath)
+        tag = el.tag
+
+        # basic categorization
+        if tag == "input":
+            inputs.append(info)
+
+        elif tag == "button":
+            buttons.append(info)
+
+        elif tag == "a":
+            links.append(info)
+
+        elif tag == "img":
+            images.append(info)
+
+        elif tag in ("label", "span"):
+            labels.append(info)
+
+        elif tag == "select":
+            info["options"] = [_text(opt) for opt in el.iterdescendants("option")]
+            selects.append(info)
+
+        # unified CLICKABLE detection
+        is_clickable = (
+            tag in ("button", "a") or
+            el.get("onclick") or
+            el.get("role") == "button" or
+            el.get("tabindex") == "0" or
+            "click" in (el.get("class") or "").lower() or
+            el.get("data-test") or
+            el.get("data-testid")
+        )
+
+        if is_clickable:
+            clickables.append(info)
+
+        # product card candidates, grouped per selector like the bs4 scanner
+        for sel, matches in CARD_MATCHERS:
+            if matches(el):
+                cards[sel].append(el)
+
+    # -----------------------------------------------------
+    # Product-like card grouping
+    # -----------------------------------------------------
+    for sel, _ in CARD_MATCHERS:
+        for item in cards[sel]:
+            products.append(_find_card_details(item, xpaths))
+
+    # final data payload
+    return {
+        "inputs": inputs,
+        "buttons": buttons,
+        "links": links,
+        "images": images,
+        "labels": labels,
+        "selects": selects,
+        "products": products,
+        "clickables": clickables
+    }
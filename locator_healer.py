@@ -0,0 +1,330 @@
+# locator_healer.py
+import ast
+import os
+import re
+import textwrap
+
+# --- Configuration ---
+# Minimum fingerprint similarity (0..1) for a candidate to replace a broken locator
+HEAL_MIN_SCORE = float(os.getenv("HEAL_MIN_SCORE", "0.5"))
+# Best candidate must beat the runner-up by this much, otherwise the match is ambiguous
+HEAL_MIN_MARGIN = float(os.getenv("HEAL_MIN_MARGIN", "0.1"))
+
+# Fingerprint fields and how much agreement on each one counts
+FINGERPRINT_WEIGHTS = {
+    "data_test": 3.0,
+    "text": 3.0,
+    "name": 2.0,
+    "id": 2.0,
+    "aria_label": 2.0,
+    "placeholder": 2.0,
+    "label": 2.0,
+    "href": 1.5,
+    "alt": 1.5,
+    "value": 1.5,
+    "role": 1.0,
+    "type": 1.0,
+    "class": 1.0,
+}
+
+BY_STRATEGIES = {"ID", "NAME", "CLASS_NAME", "CSS_SELECTOR", "XPATH", "LINK_TEXT",
+                 "PARTIAL_LINK_TEXT", "TAG_NAME"}
+
+
+# ---------------------------------------------------------
+# LOCATORS IN GENERATED CODE
+# ---------------------------------------------------------
+
+def _source(code):
+    return textwrap.dedent(code).strip()
+
+
+def find_locators(code):
+    """
+    Returns [(strategy, value, by_node, value_node)] for every `By.X, "value"`
+    pair in the code: find_element(By.ID, "x"), EC...((By.ID, "x")), etc.
+    """
+    try:
+        tree = ast.parse(_source(code))
+    except SyntaxError:
+        return []
+
+    found = []
+    for node in ast.walk(tree):
+        items = node.args if isinstance(node, ast.Call) else node.elts if isinstance(node, ast.Tuple) else None
+        if not items:
+            continue
+        for by_node, value_node in zip(items, items[1:]):
+            if (isinstance(by_node, ast.Attribute) and isinstance(by_node.value, ast.Name)
+                    and by_node.value.id == "By" and by_node.attr in BY_STRATEGIES
+                    and isinstance(value_node, ast.Constant) and isinstance(value_node.value, str)):
+                found.append((by_node.attr, value_node.value, by_node, value_node))
+    return found
+
+
+# ---------------------------------------------------------
+# MATCHING LOCATORS AGAINST tag_dict
+# ---------------------------------------------------------
+
+def all_elements(tag_dict):
+    """Every element info in tag_dict once (categories overlap)."""
+    seen, elements = set(), []
+    for category, items in tag_dict.items():
+        if category == "products" or not isinstance(items, list):
+            continue
+        for info in items:
+            if not isinstance(info, dict):
+                continue
+            key = info.get("xpath") or id(info)
+            if key not in seen:
+                seen.add(key)
+                elements.append(info)
+    return elements
+
+
+def _attr(info, name):
+    value = (info.get("attributes") or {}).get(name)
+    if isinstance(value, list):
+        return " ".join(value)
+    return value
+
+
+_CSS_SIMPLE = re.compile(r"^([a-zA-Z][\w-]*|\*)?((?:#[\w-]+|\.[\w-]+|\[[\w-]+(?:[*^$~]?=(?:\"[^\"]*\"|'[^']*'|[^\]]*))?\])*)$")
+_CSS_PART = re.compile(r"#([\w-]+)|\.([\w-]+)|\[([\w-]+)(?:([*^$~]?=)(?:\"([^\"]*)\"|'([^']*)'|([^\]]*)))?\]")
+
+_XPATH_ATTR = re.compile(r"^//([\w-]+|\*)\[@([\w-]+)\s*=\s*['\"]([^'\"]*)['\"]\]$")
+_XPATH_TEXT = re.compile(r"^//([\w-]+|\*)\[(?:text\(\)|normalize-space\(\)|normalize-space\(\.\)|\.)\s*=\s*['\"]([^'\"]*)['\"]\]$")
+_XPATH_CONTAINS = re.compile(r"^//([\w-]+|\*)\[contains\((?:@([\w-]+)|text\(\)|\.)\s*,\s*['\"]([^'\"]*)['\"]\)\]$")
+
+
+def _match_css(selector, info):
+    m = _CSS_SIMPLE.match(selector.strip())
+    if not m or not (m.group(1) or m.group(2)):
+        return None  # combinators / pseudo-classes: can't judge locally
+    if m.group(1) and m.group(1) != "*" and m.group(1) != info.get("tag"):
+        return False
+
+    for id_, cls, attr, op, v1, v2, v3 in _CSS_PART.findall(m.group(2)):
+        if id_ and info.get("id") != id_:
+            return False
+        if cls and cls not in (info.get("class") or []):
+            return False
+        if attr:
+            actual = _attr(info, attr)
+            expected = v1 or v2 or v3.strip()
+            if actual is None:
+                return False
+            if op == "=" and actual != expected:
+                return False
+            if op == "*=" and expected not in actual:
+                return False
+            if op == "^=" and not actual.startswith(expected):
+                return False
+            if op == "$=" and not actual.endswith(expected):
+                return False
+            if op == "~=" and expected not in actual.split():
+                return False
+    return True
+
+
+def _match_xpath(xpath, info):
+    if xpath == info.get("xpath"):
+        return True
+    tag_ok = lambda t: t == "*" or t == info.get("tag")
+
+    m = _XPATH_ATTR.match(xpath)
+    if m:
+        return tag_ok(m.group(1)) and _attr(info, m.group(2)) == m.group(3)
+    m = _XPATH_TEXT.match(xpath)
+    if m:
+        return tag_ok(m.group(1)) and (info.get("text") or "").strip() == m.group(2).strip()
+    m = _XPATH_CONTAINS.match(xpath)
+    if m:
+        haystack = _attr(info, m.group(2)) if m.group(2) else info.get("text")
+        return tag_ok(m.group(1)) and haystack is not None and m.group(3) in haystack
+    if xpath.startswith("/html"):
+        return False  # absolute path that no current element has
+    return None
+
+
+def locator_matches(strategy, value, info):
+    """True / False, or None when the locator syntax is too complex to judge locally."""
+    if strategy == "ID":
+        return info.get("id") == value
+    if strategy == "NAME":
+        return info.get("name") == value
+    if strategy == "CLASS_NAME":
+        return value in (info.get("class") or [])
+    if strategy == "TAG_NAME":
+        return info.get("tag") == value
+    if strategy == "LINK_TEXT":
+        return info.get("tag") == "a" and (info.get("text") or "").strip() == value.strip()
+    if strategy == "PARTIAL_LINK_TEXT":
+        return info.get("tag") == "a" and value in (info.get("text") or "")
+    if strategy == "CSS_SELECTOR":
+        return _match_css(value, info)
+    if strategy == "XPATH":
+        return _match_xpath(value, info)
+    return None
+
+
+def resolve(strategy, value, elements):
+    """Matching elements, or None when the locator can't be judged locally."""
+    matches = []
+    for info in elements:
+        result = locator_matches(strategy, value, info)
+        if result is None:
+            return None
+        if result:
+            matches.append(info)
+    return matches
+
+
+# ---------------------------------------------------------
+# FINGERPRINTS
+# ---------------------------------------------------------
+
+def _labels_by_target(tag_dict):
+    return {
+        _attr(label, "for"): (label.get("text") or "").strip()
+        for label in tag_dict.get("labels", [])
+        if _attr(label, "for")
+    }
+
+
+def element_fingerprint(info, labels=None):
+    """Stable description of one element, from extract_common_attrs output."""
+    fingerprint = {
+        "tag": info.get("tag"),
+        "text": (info.get("text") or "").strip()[:80] or None,
+        "id": info.get("id"),
+        "name": info.get("name"),
+        "data_test": info.get("data_test"),
+        "role": info.get("role"),
+        "aria_label": info.get("aria_label"),
+        "placeholder": info.get("placeholder"),
+        "type": info.get("type"),
+        "href": info.get("href"),
+        "alt": info.get("alt"),
+        "value": info.get("value"),
+        "class": info.get("class") or None,
+        "label": (labels or {}).get(info.get("id")),
+    }
+    return {k: v for k, v in fingerprint.items() if v}
+
+
+def fingerprint_code(code, tag_dict):
+    """
+    Fingerprints of the elements a step's code touches, resolved against the
+    DOM the code was written for. Locators that match no single element are skipped.
+    """
+    elements = all_elements(tag_dict)
+    labels = _labels_by_target(tag_dict)
+    fingerprints = []
+    for strategy, value, _, _ in find_locators(code):
+        matches = resolve(strategy, value, elements)
+        if matches and len(matches) == 1:
+            fingerprints.append({"by": strategy, "value": value,
+                                 "element": element_fingerprint(matches[0], labels)})
+    return fingerprints
+
+
+def similarity(fingerprint, info, labels=None):
+    """0..1 weighted agreement between a stored fingerprint and a live element."""
+    if fingerprint.get("tag") and fingerprint["tag"] != info.get("tag"):
+        return 0.0
+
+    current = element_fingerprint(info, labels)
+    total = score = 0.0
+    for field, weight in FINGERPRINT_WEIGHTS.items():
+        if field not in fingerprint:
+            continue
+        total += weight
+        if field == "class":
+            old, new = set(fingerprint["class"]), set(current.get("class") or [])
+            score += weight * (len(old & new) / len(old | new) if old | new else 0.0)
+        elif current.get(field) == fingerprint[field]:
+            score += weight
+    return score / total if total else 0.0
+
+
+def _unique(elements, field, value):
+    return sum(1 for info in elements if info.get(field) == value) == 1
+
+
+def stable_locator(info, elements):
+    """Best locator for a healed element: data-test, then id, then name, then xpath."""
+    if info.get("data_test"):
+        for attr in ("data-test", "data-testid", "data-qa"):
+            if _attr(info, attr) == info["data_test"]:
+                return "CSS_SELECTOR", f'[{attr}="{info["data_test"]}"]'
+    if info.get("id") and _unique(elements, "id", info["id"]):
+        return "ID", info["id"]
+    if info.get("name") and _unique(elements, "name", info["name"]):
+        return "NAME", info["name"]
+    return "XPATH", info.get("xpath")
+
+
+# ---------------------------------------------------------
+# HEALING
+# ---------------------------------------------------------
+
+def _splice(source, replacements):
+    """Applies (node, text) replacements using the AST's UTF-8 byte offsets."""
+    lines = source.encode("utf-8").splitlines(keepends=True)
+    starts = [0]
+    for line in lines:
+        starts.append(starts[-1] + len(line))
+
+    data = source.encode("utf-8")
+    edits = sorted(
+        ((starts[n.lineno - 1] + n.col_offset, starts[n.end_lineno - 1] + n.end_col_offset, text)
+         for n, text in replacements),
+        reverse=True,
+    )
+    for start, end, text in edits:
+        data = data[:start] + text.encode("utf-8") + data[end:]
+    return data.decode("utf-8")
+
+
+def heal_code(code, fingerprints, tag_dict, min_score=HEAL_MIN_SCORE, min_margin=HEAL_MIN_MARGIN):
+    """
+    Rewrites locators that no longer resolve in `tag_dict`, using the stored
+    element fingerprints. Returns (healed_code, changes), or (None, changes)
+    when nothing could (or needed to) be healed.
+    """
+    source = _source(code)
+    elements = all_elements(tag_dict)
+    labels = _labels_by_target(tag_dict)
+    by_locator = {(f["by"], f["value"]): f["element"] for f in fingerprints or []}
+
+    replacements, changes = [], []
+    for strategy, value, by_node, value_node in find_locators(source):
+        fingerprint = by_locator.get((strategy, value))
+        if fingerprint is None:
+            continue
+        matches = resolve(strategy, value, elements)
+        if matches is None or matches:
+            continue  # still matches something (or can't be judged) → leave it
+
+        scored = sorted(((similarity(fingerprint, info, labels), info) for info in elements),
+                        key=lambda pair: pair[0], reverse=True)
+        if not scored:
+            continue
+        best_score, best = scored[0]
+        runner_up = scored[1][0] if len(scored) > 1 else 0.0
+        if best_score < min_score or best_score - runner_up < min_margin:
+            changes.append({"by": strategy, "value": value, "healed": False, "score": round(best_score, 3)})
+            continue
+
+        new_by, new_value = stable_locator(best, elements)
+        if not new_value:
+            continue
+        replacements.append((by_node, f"By.{new_by}"))
+        replacements.append((value_node, repr(new_value)))
+        changes.append({"by": strategy, "value": value, "healed": True, "score": round(best_score, 3),
+                        "new_by": new_by, "new_value": new_value})
+
+    if not replacements or any(not change["healed"] for change in changes):
+        return None, changes
+    return _splice(source, replacements), changes
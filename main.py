@@ -1,9 +1,30 @@
+from startup import start_prewarm, startup_report, mark_imported
+import os
+import sys
+from contextlib import asynccontextmanager
+from functools import lru_cache
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, JSONResponse
 from chat_routes import router as chat_router
+from tracing import render_metrics
 
-app = FastAPI(title="AI Selenium Tester")
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # STARTUP_MODE=prewarm warms imports, DB, LLM pool and browsers in the background; /readyz flips when done
+    start_prewarm()
+    yield
+    # only shut down what this process actually started
+    if "memory_db_1" in sys.modules:
+        sys.modules["memory_db_1"].flush_writes()
+    if "browser_pool" in sys.modules:
+        sys.modules["browser_pool"].shutdown_browser_pool()
+
+
+app = FastAPI(title="AI Selenium Tester", lifespan=lifespan)
 
 # Allow all origins (for demo)
 app.add_middleware(
@@ -17,8 +38,44 @@ app.add_middleware(
 # Include chat API
 app.include_router(chat_router, prefix="/api/chat")
 
+
+@lru_cache(maxsize=None)
+def load_template(name):
+    """Template file contents, read from disk once per process."""
+    with open(os.path.join(TEMPLATES_DIR, name), "r", encoding="utf-8") as f:
+        return f.read()
+
+
 # Serve basic HTML frontend
 @app.get("/", response_class=HTMLResponse)
 def home():
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        return f.read()
+    return load_template("index.html")
+
+
+# Prometheus scrape target (span histograms, LLM calls, cache hit rate, step retries)
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+# Liveness: the process is up and serving
+@app.get("/healthz")
+def healthz():
+    return {"status": "ok"}
+
+
+# Readiness: 503 until the startup prewarm has finished (see startup.py)
+@app.get("/readyz")
+def readyz():
+    report = startup_report()
+    return JSONResponse({"ready": report["ready"], "checks": report["checks"]},
+                        status_code=200 if report["ready"] else 503)
+
+
+# Import timings, warm-up checks and cold-start time vs COLD_START_BUDGET_SECONDS
+@app.get("/startup")
+def startup_status():
+    return startup_report()
+
+
+mark_imported()
@@ -11,7 +11,7 @@ from test_executor import (
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.chrome.options import Options
-import time
+from page_settle import wait_for_page_settle
 
 # --- Constants ---
 TEST_FILE_NAME = "test_login_ai.py"
@@ -25,7 +25,7 @@ def get_rendered_html(url):
 
     driver = webdriver.Chrome(options=options)
     driver.get(url)
-    time.sleep(3)  # allow JS to render
+    wait_for_page_settle(driver)  # allow JS to render
     html = driver.page_source
     driver.quit()
     return html
@@ -52,7 +52,7 @@ def extract_dom_metadata(html):
 
 
 def main():
-    # 1. SETUP - Check/create the isolated testing environment
+    # 1. SETUP - Clone the isolated testing environment from its cached template (no pip on repeat runs)
     ensure_test_venv_exists(TEST_VENV_PATH)
 
     # Use a try...finally block to GUARANTEE cleanup happens, even if an error occurs
@@ -98,7 +98,7 @@ def main():
         #     os.remove(TEST_FILE_NAME)
         #     print(f"\n🗑️ Cleaned up temporary file: {TEST_FILE_NAME}")
 
-        # Clean up the Venv directory
+        # Clean up the per-run Venv clone (the template stays cached)
         cleanup_test_venv(TEST_VENV_PATH)
 
 
@@ -1,14 +1,33 @@
 import sqlite3
+import threading
+import queue
+import atexit
+import os
+import json
+import re
+import time
 from datetime import datetime
+from tracing import span, traced
+from page_identity import canonicalize_url, page_path
 
 DB_PATH = "ai_test_memory.db"
 
-def init_db():
-    """initializes sql db for memory"""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+# Queue step writes on a background thread (set MEMORY_DB_ASYNC_WRITES=0 to write inline)
+ASYNC_WRITES = os.getenv("MEMORY_DB_ASYNC_WRITES", "1") == "1"
+WRITE_BATCH_SIZE = 100
+
+# Fuzzy goal matching (FTS5): reuse code saved for near-identical step wording
+FUZZY_GOALS = os.getenv("MEMORY_FUZZY_GOALS", "1") == "1"
+FUZZY_THRESHOLD = float(os.getenv("MEMORY_FUZZY_THRESHOLD", "0.75"))
+FUZZY_CANDIDATES = int(os.getenv("MEMORY_FUZZY_CANDIDATES", "10"))
 
-    cur.execute("""
+# ---------------------------------------------------------
+# SCHEMA MIGRATIONS (tracked in PRAGMA user_version)
+# ---------------------------------------------------------
+
+MIGRATIONS = [
+    # 1: original table
+    """
     CREATE TABLE IF NOT EXISTS test_memory (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         base_url TEXT,
@@ -19,23 +38,207 @@ def init_db():
         tags TEXT,
         success INTEGER,
         created_at TEXT
-    )""")
+    )""",
+    # 2: composite indexes for the per-step cache lookup and recent-step reads
+    """
+    CREATE INDEX IF NOT EXISTS idx_test_memory_lookup
+        ON test_memory (base_url, page_url, goal, success, id);
+    CREATE INDEX IF NOT EXISTS idx_test_memory_page
+        ON test_memory (base_url, page_url, id);
+    CREATE INDEX IF NOT EXISTS idx_test_memory_base
+        ON test_memory (base_url, id);
+    """,
+    # 3: JSON fingerprints of the elements a step touched (used for locator self-healing)
+    """
+    ALTER TABLE test_memory ADD COLUMN fingerprints TEXT;
+    """,
+    # 4: full-text goal index (porter-stemmed, case/diacritic-folded), kept in sync by triggers
+    """
+    CREATE VIRTUAL TABLE IF NOT EXISTS test_memory_fts USING fts5(
+        goal, summary, base_url,
+        content='test_memory', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    );
+    CREATE TRIGGER IF NOT EXISTS test_memory_fts_insert AFTER INSERT ON test_memory BEGIN
+        INSERT INTO test_memory_fts (rowid, goal, summary, base_url)
+        VALUES (new.id, new.goal, new.summary, new.base_url);
+    END;
+    CREATE TRIGGER IF NOT EXISTS test_memory_fts_delete AFTER DELETE ON test_memory BEGIN
+        INSERT INTO test_memory_fts (test_memory_fts, rowid, goal, summary, base_url)
+        VALUES ('delete', old.id, old.goal, old.summary, old.base_url);
+    END;
+    CREATE TRIGGER IF NOT EXISTS test_memory_fts_update AFTER UPDATE ON test_memory BEGIN
+        INSERT INTO test_memory_fts (test_memory_fts, rowid, goal, summary, base_url)
+        VALUES ('delete', old.id, old.goal, old.summary, old.base_url);
+        INSERT INTO test_memory_fts (rowid, goal, summary, base_url)
+        VALUES (new.id, new.goal, new.summary, new.base_url);
+    END;
+    INSERT INTO test_memory_fts (test_memory_fts) VALUES ('rebuild');
+    """,
+    # 5: page identity keys: canonical URL (page_identity.canonicalize_url) + structural fingerprint
+    """
+    ALTER TABLE test_memory ADD COLUMN page_key TEXT;
+    ALTER TABLE test_memory ADD COLUMN page_fingerprint TEXT;
+    UPDATE test_memory SET page_key = canonical_url(page_url);
+    CREATE INDEX IF NOT EXISTS idx_test_memory_page_key
+        ON test_memory (base_url, page_key, goal, success, page_fingerprint, id);
+    CREATE INDEX IF NOT EXISTS idx_test_memory_page_fingerprint
+        ON test_memory (base_url, page_fingerprint, goal, success, id);
+    """,
+]
+
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
+
 
-    conn.commit()
-    conn.close()
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=30)
+    # switching to WAL needs an exclusive lock and doesn't wait on the busy handler,
+    # so a process racing another one's first open retries instead of failing
+    for attempt in range(50):
+        try:
+            conn.execute("PRAGMA journal_mode=WAL")
+            break
+        except sqlite3.OperationalError as e:
+            if "locked" not in str(e) or attempt == 49:
+                raise
+            time.sleep(0.05)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.create_function("canonical_url", 1, canonicalize_url, deterministic=True)
+    return conn
 
 
-def save_step_memory(base_url, page_url, goal, code, summary, tags, success):
-    """saves each AI step in to DB"""
+def _statements(script):
+    """Splits a migration script into single statements (trigger bodies stay whole)."""
+    statements, buffer = [], ""
+    for line in script.splitlines(keepends=True):
+        buffer += line
+        if sqlite3.complete_statement(buffer):
+            statements.append(buffer.strip())
+            buffer = ""
+    if buffer.strip():
+        statements.append(buffer.strip())
+    return statements
+
+
+def _migrate(conn):
+    """
+    Applies pending MIGRATIONS one transaction each. BEGIN IMMEDIATE takes the
+    write lock before user_version is re-read, so concurrent processes never
+    run the same (non-repeatable) ALTER TABLE twice, and a step that fails
+    halfway rolls back together with its version bump.
+    """
+    while conn.execute("PRAGMA user_version").fetchone()[0] < len(MIGRATIONS):
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            if version < len(MIGRATIONS):
+                for statement in _statements(MIGRATIONS[version]):
+                    conn.execute(statement)
+                conn.execute(f"PRAGMA user_version = {version + 1}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+
+
+def get_connection():
+    """Long-lived connection for the calling thread (schema migrated on first use)."""
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.path != DB_PATH:
+        if conn is not None:
+            conn.close()
+        conn = _connect(DB_PATH)
+        _local.conn, _local.path = conn, DB_PATH
+
+    if DB_PATH not in _schema_ready:
+        with _schema_lock:
+            if DB_PATH not in _schema_ready:
+                _migrate(conn)
+                _schema_ready.add(DB_PATH)
+    return conn
+
+
+def init_db():
+    """initializes sql db for memory"""
+    get_connection()
+
+
+def rekey_pages():
+    """Recomputes page_key for every row (after changing page_identity rules). Returns rows updated."""
+    conn = get_connection()
+    with conn:
+        return conn.execute("""
+            UPDATE test_memory SET page_key = canonical_url(page_url)
+            WHERE page_key IS NOT canonical_url(page_url)
+        """).rowcount
+
+
+# ---------------------------------------------------------
+# BATCHED BACKGROUND WRITER
+# ---------------------------------------------------------
+
+_INSERT_SQL = """
+    INSERT INTO test_memory (base_url, page_url, goal, code, summary, tags, success, created_at, fingerprints,
+                             page_key, page_fingerprint)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+"""
+
+_write_queue = queue.Queue()
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _writer_loop():
+    while True:
+        first = _write_queue.get()
+        batch = [first]
+        while len(batch) < WRITE_BATCH_SIZE:
+            try:
+                batch.append(_write_queue.get_nowait())
+            except queue.Empty:
+                break
+
+        try:
+            conn = get_connection()
+            with span("db_write_batch", rows=len(batch)), conn:
+                conn.executemany(_INSERT_SQL, batch)
+        except Exception as e:
+            print(f"⚠️ Memory DB batch write failed ({len(batch)} rows): {e}")
+        finally:
+            for _ in batch:
+                _write_queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="memory-db-writer", daemon=True)
+            _writer.start()
+
+
+def flush_writes():
+    """Blocks until every queued step write is committed."""
+    if _writer is not None:
+        with span("db_flush", pending=_write_queue.unfinished_tasks):
+            _write_queue.join()
+
+
+atexit.register(flush_writes)
+
+
+def save_step_memory(base_url, page_url, goal, code, summary, tags, success, fingerprints=None,
+                     page_fingerprint=None):
+    """
+    saves each AI step in to DB (fingerprints: element fingerprints from locator_healer;
+    page_fingerprint: page_identity.page_fingerprint of the page the step ran on)
+    """
     if not success:
         return
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-
-    cur.execute("""
-    INSERT INTO test_memory (base_url, page_url, goal, code, summary, tags, success, created_at)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-    """, (
+    row = (
         base_url,
         page_url,
         goal,
@@ -43,14 +246,26 @@ def save_step_memory(base_url, page_url, goal, code, summary, tags, success):
         summary,
         ",".join(tags) if isinstance(tags, list) else tags,
         int(success),
-        datetime.utcnow().isoformat()
-    ))
-    conn.commit()
-    conn.close()
+        datetime.utcnow().isoformat(),
+        json.dumps(fingerprints) if fingerprints else None,
+        canonicalize_url(page_url),
+        page_fingerprint
+    )
+
+    if ASYNC_WRITES:
+        _ensure_writer()
+        _write_queue.put(row)
+        return
+
+    conn = get_connection()
+    with span("db_write", rows=1), conn:
+        conn.execute(_INSERT_SQL, row)
+
+
+@traced("db_read")
 def get_recent_steps(base_url, page_url = None, limit = 5):
     """Fetches last N successful steps for the given URL or page."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+    cur = get_connection().cursor()
 
     if page_url:
         cur.execute("""
@@ -68,7 +283,6 @@ def get_recent_steps(base_url, page_url = None, limit = 5):
            """, (base_url, limit))
 
     rows = cur.fetchall()
-    conn.close()
 
     results = []
     for row in rows:
@@ -87,6 +301,7 @@ def filter_memory(memory_context, current_step_index, current_url, global_steps)
     - Must match this step's goal (based on goal text)
     - Must match same page
     - Only keeps most recent success + most recent failure
+    search_memory() does the same lookup through the FTS5 index, without loading rows first.
     """
     relevant = []
     last_success = None
@@ -120,22 +335,195 @@ def filter_memory(memory_context, current_step_index, current_url, global_steps)
 
     return relevant
 
-def get_cached_success(base_url, page_url, goal):
-    """Returns the most recent successful saved step, or None."""
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
+@traced("db_read")
+def get_cached_success(base_url, page_url, goal, page_fingerprint=None):
+    """
+    Returns the most recent successful saved step, or None. Pages are matched
+    by canonical URL (page_key), preferring rows with the same structural
+    fingerprint; failing that, by fingerprint on the same host + path template
+    (only the query / hash route changed, the page didn't).
+    """
+    page_key = canonicalize_url(page_url)
+    cur = get_connection().cursor()
 
-    cur.execute("""
-        SELECT id, code
-        FROM test_memory
-        WHERE base_url = ? AND page_url = ? AND goal = ? AND success = 1
-        ORDER BY id DESC LIMIT 1
-    """, (base_url, page_url, goal))
+    # one index seek per key; an OR across both keys makes SQLite scan the whole base_url
+    by_key = "base_url = ? AND page_key = ? AND goal = ? AND success = 1"
+    lookups = [("page_key", "idx_test_memory_page_key", by_key, (base_url, page_key, goal))]
+    if page_fingerprint:
+        lookups.insert(0, ("page_key", "idx_test_memory_page_key", by_key + " AND page_fingerprint = ?",
+                           (base_url, page_key, goal, page_fingerprint)))
+        path = page_path(page_key) or ""
+        lookups.append(("page_fingerprint", "idx_test_memory_page_fingerprint",
+                        "base_url = ? AND page_fingerprint = ? AND goal = ? AND success = 1"
+                        " AND (page_key = ? OR substr(page_key, 1, ?) IN (?, ?))",
+                        (base_url, page_fingerprint, goal, path, len(path) + 1, path + "?", path + "#")))
 
-    row = cur.fetchone()
-    conn.close()
+    row = None
+    for matched_by, index, where, params in lookups:
+        cur.execute(f"""
+            SELECT id, code, fingerprints FROM test_memory
+            WHERE id = (SELECT MAX(id) FROM test_memory INDEXED BY {index} WHERE {where})
+        """, params)
+        row = cur.fetchone()
+        if row:
+            break
 
     if row:
-        return {"id": row[0], "code": row[1]}
+        return {"id": row[0], "code": row[1], "fingerprints": json.loads(row[2]) if row[2] else [],
+                "matched_goal": goal, "similarity": 1.0, "matched_by": matched_by}
+
+    # No exact wording match → ranked full-text lookup for near-duplicate goals
+    if FUZZY_GOALS:
+        return find_similar_success(base_url, page_url, goal, page_fingerprint=page_fingerprint)
     return None
-            
+
+
+# ---------------------------------------------------------
+# FUZZY GOAL SEARCH (FTS5)
+# ---------------------------------------------------------
+
+STOPWORDS = {
+    "a", "an", "the", "to", "of", "in", "on", "into", "onto", "for", "from", "with",
+    "and", "then", "that", "this", "it", "its", "is", "be", "my", "your", "please",
+    "at", "by", "as", "page", "button", "field",
+}
+
+
+def _words(text):
+    """Lower-cased word tokens, with n't spelled out ("don't" -> "do", "not")."""
+    return re.findall(r"[a-z0-9]+", re.sub(r"n['’]t\b", " not", (text or "").lower()))
+
+
+def _goal_terms(text):
+    """Lower-cased word tokens without stopwords (fed to FTS5, which stems them)."""
+    return [t for t in _words(text) if t not in STOPWORDS]
+
+
+def _stem(token):
+    for suffix in ("ing", "ed", "es", "s"):
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            return token[:-len(suffix)]
+    return token
+
+
+# Words whose order carries the meaning ("low to high" vs "high to low")
+DIRECTION_WORDS = {
+    "low", "lowest", "high", "highest", "asc", "ascending", "desc", "descending",
+    "min", "max", "first", "last", "oldest", "newest", "older", "newer",
+    "top", "bottom", "up", "down", "increase", "decrease", "next", "previous", "prev",
+}
+
+
+def _direction_words(text):
+    """Direction words in order; "a"/"z" count too when both are there (A to Z)."""
+    tokens = re.findall(r"[a-z0-9]+", (text or "").lower())
+    alphabetical = {"a", "z"} <= set(tokens)
+    return [t for t in tokens if t in DIRECTION_WORDS or (alphabetical and t in ("a", "z"))]
+
+
+# Words that flip a goal ("do not add ..." vs "add ...")
+NEGATION_WORDS = {"not", "no", "never", "without", "nor", "cannot", "dont", "doesnt", "cant", "wont"}
+
+# Verbs whose un-/de- form undoes them ("uncheck", "deselect")
+REVERSIBLE_VERBS = {
+    "check", "select", "tick", "mark", "subscribe", "follow", "like", "pin", "star",
+    "block", "mute", "hide", "lock", "link", "assign", "install", "activate", "register",
+}
+
+
+def _negations(text):
+    """One "not" per negation word, n't contraction or un-/de- verb."""
+    return [
+        "not" for t in _words(text)
+        if t in NEGATION_WORDS or (t[:2] in ("un", "de") and _stem(t[2:]) in REVERSIBLE_VERBS)
+    ]
+
+
+def goal_similarity(a, b):
+    """
+    Dice coefficient over normalized, lightly stemmed goal terms (0..1).
+    0 when the direction words differ in order or count, so "sort by price
+    low to high" never matches "high to low", or when only one side is
+    negated ("do not add ..." vs "add ...").
+    """
+    if _direction_words(a) != _direction_words(b) or _negations(a) != _negations(b):
+        return 0.0
+    terms_a = {_stem(t) for t in _goal_terms(a)}
+    terms_b = {_stem(t) for t in _goal_terms(b)}
+    if not terms_a or not terms_b:
+        return 0.0
+    return 2 * len(terms_a & terms_b) / (len(terms_a) + len(terms_b))
+
+
+def _match_expression(base_url, goal):
+    terms = sorted(set(_goal_terms(goal)))
+    if not terms:
+        return None
+    expression = "{goal summary} : (" + " OR ".join(f'"{t}"' for t in terms) + ")"
+    host_terms = re.findall(r"[a-z0-9]+", (base_url or "").lower())
+    if host_terms:
+        # scope inside the index; the exact base_url check below drops look-alike hosts
+        expression = f'base_url : "{" ".join(host_terms)}" AND {expression}'
+    return expression
+
+
+@traced("db_search")
+def search_memory(base_url, goal, page_url=None, limit=FUZZY_CANDIDATES, success_only=True):
+    """
+    Ranked full-text search over saved goals/summaries for one base_url.
+    Same-page rows rank first, then BM25. Each result carries its similarity
+    to `goal`.
+    """
+    expression = _match_expression(base_url, goal)
+    if expression is None:
+        return []
+
+    cur = get_connection().cursor()
+    cur.execute(f"""
+        SELECT m.id, m.goal, m.code, m.summary, m.page_url, m.success, m.fingerprints, m.page_key,
+               m.page_fingerprint
+        FROM test_memory_fts
+        CROSS JOIN test_memory m ON m.id = test_memory_fts.rowid
+        WHERE test_memory_fts MATCH ? AND m.base_url = ?{" AND m.success = 1" if success_only else ""}
+        ORDER BY (m.page_key = ?) DESC, bm25(test_memory_fts, 1.0, 0.5, 0.0), m.id DESC
+        LIMIT ?
+    """, (expression, base_url, canonicalize_url(page_url) or "", limit))
+
+    return [
+        {
+            "id": row[0],
+            "goal": row[1],
+            "code": row[2],
+            "summary": row[3],
+            "page_url": row[4],
+            "success": bool(row[5]),
+            "fingerprints": json.loads(row[6]) if row[6] else [],
+            "page_key": row[7],
+            "page_fingerprint": row[8],
+            "similarity": goal_similarity(goal, row[1]),
+        }
+        for row in cur.fetchall()
+    ]
+
+
+def find_similar_success(base_url, page_url, goal, threshold=FUZZY_THRESHOLD, page_fingerprint=None):
+    """
+    Best saved success on the same page (page_key, or structural fingerprint
+    on the same path template) whose goal wording is close enough to `goal`, or None.
+    """
+    page_key = canonicalize_url(page_url)
+    candidates = [
+        c for c in search_memory(base_url, goal, page_url=page_url)
+        if c["similarity"] >= threshold
+        and (c["page_key"] == page_key
+             or (page_fingerprint and c["page_fingerprint"] == page_fingerprint
+                 and page_path(c["page_key"]) == page_path(page_key)))
+    ]
+    if not candidates:
+        return None
+
+    # same page key beats same fingerprint; then the closest wording; ranking order breaks ties
+    best = max(candidates, key=lambda c: (c["page_key"] == page_key, c["similarity"]))
+    return {"id": best["id"], "code": best["code"], "fingerprints": best["fingerprints"],
+            "matched_goal": best["goal"], "similarity": round(best["similarity"], 3),
+            "matched_by": "fuzzy_goal"}
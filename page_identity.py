@@ -0,0 +1,216 @@
+# page_identity.py
+import argparse
+import hashlib
+import json
+import os
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+# --- Configuration ---
+# Optional per-site rules, keyed by host:
+# {"www.saucedemo.com": {"drop_params": ["id"], "keep_params": ["page"],
+#                        "path_templates": [["^/item/[^/]+$", "/item/{slug}"]]}}
+PAGE_RULES_PATH = os.getenv("PAGE_RULES_PATH", "page_rules.json")
+# Extra query params to drop everywhere (comma-separated)
+PAGE_DROP_PARAMS = {p.strip().lower() for p in os.getenv("PAGE_DROP_PARAMS", "").split(",") if p.strip()}
+
+# Query params that never change which page is shown
+VOLATILE_PARAMS = {
+    "_", "cb", "cachebuster", "ts", "timestamp", "nonce", "state", "code",
+    "sid", "session", "sessionid", "session_id", "jsessionid", "phpsessid", "token", "auth",
+    "access_token", "gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src",
+} | PAGE_DROP_PARAMS
+VOLATILE_PREFIXES = ("utm_",)
+
+_NUMBER = re.compile(r"^\d+$")
+_UUID = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$", re.I)
+_HEX = re.compile(r"^[0-9a-f]{16,}$", re.I)
+_TOKEN = re.compile(r"^(?=.*\d)(?=.*[a-zA-Z])[\w-]{20,}$")
+_DIGITS = re.compile(r"\d+")
+_PATH_PARAMS = re.compile(r";(jsessionid|sid|phpsessid)=[^/?#]*", re.I)
+
+
+def load_site_rules(path=PAGE_RULES_PATH):
+    """Per-site canonicalization rules from PAGE_RULES_PATH (missing file → no rules)."""
+    if not path or not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            rules = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Could not load page rules from {path}: {e}")
+        return {}
+    for site in rules.values():
+        site["path_templates"] = [(re.compile(p), t) for p, t in site.get("path_templates", [])]
+        site["drop_params"] = {p.lower() for p in site.get("drop_params", [])}
+        site["keep_params"] = {p.lower() for p in site.get("keep_params", [])}
+    return rules
+
+
+SITE_RULES = load_site_rules()
+
+
+# ---------------------------------------------------------
+# URL CANONICALIZATION
+# ---------------------------------------------------------
+
+def template_value(value):
+    """Replaces id-like values (numbers, UUIDs, hashes, tokens) with a placeholder."""
+    if _NUMBER.match(value):
+        return "{n}"
+    if _UUID.match(value):
+        return "{uuid}"
+    if _HEX.match(value) or _TOKEN.match(value):
+        return "{token}"
+    return value
+
+
+def canonicalize_url(url, rules=None):
+    """
+    Page key for a URL: volatile params dropped, id-like path segments and
+    param values templated, params sorted, no fragment / trailing slash.
+    /inventory-item.html?id=4 and ?id=5 both become /inventory-item.html?id={n}.
+    """
+    if not url:
+        return url
+    parts = urlsplit(url.strip())
+    if not parts.netloc:
+        return url.strip()
+
+    host = (parts.hostname or "").lower()
+    port = parts.port
+    if port and not (parts.scheme == "http" and port == 80) and not (parts.scheme == "https" and port == 443):
+        host = f"{host}:{port}"
+    site = (SITE_RULES if rules is None else rules).get(host, {})
+
+    path = _PATH_PARAMS.sub("", parts.path)
+    for pattern, replacement in site.get("path_templates", []):
+        if pattern.search(path):
+            path = pattern.sub(replacement, path)
+            break
+    else:
+        path = "/".join(template_value(segment) for segment in path.split("/"))
+    path = path.rstrip("/") or "/"
+
+    params = []
+    for name, value in parse_qsl(parts.query, keep_blank_values=True):
+        key = name.lower()
+        if key in site.get("drop_params", ()) or key in VOLATILE_PARAMS or key.startswith(VOLATILE_PREFIXES):
+            continue
+        params.append((name, value if key in site.get("keep_params", ()) else template_value(value)))
+    query = urlencode(sorted(params), safe="{}")
+
+    # hash routes (#/cart) are pages in single-page apps; other fragments are just anchors
+    fragment = parts.fragment if parts.fragment.startswith(("/", "!/")) else ""
+    if fragment:
+        fragment = "/".join(template_value(segment) for segment in fragment.split("/")).rstrip("/")
+
+    return urlunsplit((parts.scheme.lower(), host, path, query, fragment))
+
+
+def page_path(page_key):
+    """Host + path template of a page key (query and hash route dropped)."""
+    if not page_key:
+        return page_key
+    parts = urlsplit(page_key)
+    return urlunsplit((parts.scheme, parts.netloc, parts.path, "", ""))
+
+
+# ---------------------------------------------------------
+# STRUCTURAL PAGE FINGERPRINT
+# ---------------------------------------------------------
+
+# Form fields are part of a page's structure; buttons/links often carry item-specific ids
+_NAMED_CATEGORIES = ("inputs", "selects")
+
+
+def page_skeleton(tag_dict):
+    """
+    Sorted tag/role skeleton of an extract_dom_metadata() result. A set, not
+    counts, so the same template with 3 or 30 list items looks the same.
+    """
+    skeleton = set()
+    for category, items in tag_dict.items():
+        if category == "products" or not isinstance(items, list):
+            continue
+        for info in items:
+            if not isinstance(info, dict):
+                continue
+            shape = f"{category}:{info.get('tag')}"
+            if info.get("type"):
+                shape += f"[type={info['type']}]"
+            if info.get("role"):
+                shape += f"[role={info['role']}]"
+            field_name = info.get("name") or info.get("id")
+            if category in _NAMED_CATEGORIES and field_name:
+                shape += f"[name={_DIGITS.sub('#', field_name)}]"
+            skeleton.add(shape)
+    if tag_dict.get("products"):
+        skeleton.add("products")
+    return sorted(skeleton)
+
+
+def page_fingerprint(tag_dict):
+    """Short hash of page_skeleton(), or None for an empty page."""
+    skeleton = page_skeleton(tag_dict or {})
+    if not skeleton:
+        return None
+    return hashlib.sha1("\n".join(skeleton).encode("utf-8")).hexdigest()[:16]
+
+
+# ---------------------------------------------------------
+# HIT-RATE REPORT (raw URL keys vs page keys)
+# ---------------------------------------------------------
+
+def hit_rate_report(visits, rules=None):
+    """
+    Replays (base_url, page_url, goal, page_fingerprint) visits in order,
+    as if each were looked up and then saved. Returns the hit rate keyed on
+    the raw URL ("before") and on the page key / fingerprint on the same
+    path template ("after").
+    """
+    raw_seen, key_seen, fingerprint_seen = set(), set(), set()
+    raw_hits = key_hits = 0
+    for base_url, page_url, goal, fingerprint in visits:
+        raw = (base_url, page_url, goal)
+        page_key = canonicalize_url(page_url, rules)
+        key = (base_url, page_key, goal)
+        by_fingerprint = (base_url, page_path(page_key), fingerprint, goal) if fingerprint else None
+
+        raw_hits += raw in raw_seen
+        key_hits += key in key_seen or (by_fingerprint is not None and by_fingerprint in fingerprint_seen)
+        raw_seen.add(raw)
+        key_seen.add(key)
+        if by_fingerprint:
+            fingerprint_seen.add(by_fingerprint)
+
+    total = len(visits)
+    return {
+        "lookups": total,
+        "raw_url_hit_rate": round(raw_hits / total, 4) if total else 0.0,
+        "page_key_hit_rate": round(key_hits / total, 4) if total else 0.0,
+        "distinct_raw_urls": len({v[1] for v in visits}),
+        "distinct_page_keys": len({canonicalize_url(v[1], rules) for v in visits}),
+    }
+
+
+if __name__ == "__main__":
+    # python page_identity.py --db ai_test_memory.db → hit rate of the saved history under both keyings
+    import sqlite3
+
+    parser = argparse.ArgumentParser(description="Cache hit rate of stored steps: raw URLs vs page keys.")
+    parser.add_argument("--db", default="ai_test_memory.db", help="Step memory database")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(test_memory)")}
+    fingerprint_column = "page_fingerprint" if "page_fingerprint" in columns else "NULL"
+    visits = conn.execute(f"""
+        SELECT base_url, page_url, goal, {fingerprint_column}
+        FROM test_memory WHERE success = 1 ORDER BY id
+    """).fetchall()
+
+    report = hit_rate_report(visits)
+    print(f"🔑 {report['lookups']} saved steps, {report['distinct_raw_urls']} raw URLs "
+          f"→ {report['distinct_page_keys']} page keys")
+    print(f"📊 Hit rate: raw URL {report['raw_url_hit_rate']:.1%} → page key {report['page_key_hit_rate']:.1%}")
@@ -0,0 +1,139 @@
+# page_settle.py
+import os
+import time
+from selenium.common.exceptions import WebDriverException
+from tracing import traced
+
+# --- Configuration ---
+# The page counts as settled once the DOM and the network have both been
+# quiet for SETTLE_QUIET_MS, or SETTLE_TIMEOUT seconds have passed.
+SETTLE_QUIET_MS = int(os.getenv("SETTLE_QUIET_MS", "500"))
+SETTLE_TIMEOUT = float(os.getenv("SETTLE_TIMEOUT", "8"))
+
+
+# ---------------------------------------------------------
+# IN-PAGE INSTRUMENTATION
+# ---------------------------------------------------------
+# Counts in-flight fetch/XHR calls and stamps the time of the last DOM
+# mutation or request completion. Idempotent: safe to inject repeatedly.
+
+INSTRUMENT_JS = r"""
+(function () {
+  if (window.__settle) { return; }
+  var s = window.__settle = { pending: 0, lastActivity: Date.now() };
+  function touch() { s.lastActivity = Date.now(); }
+  function done() { s.pending = Math.max(0, s.pending - 1); touch(); }
+
+  if (window.fetch) {
+    var origFetch = window.fetch;
+    window.fetch = function () {
+      s.pending++; touch();
+      try {
+        return origFetch.apply(this, arguments).finally(done);
+      } catch (e) { done(); throw e; }
+    };
+  }
+
+  if (window.XMLHttpRequest) {
+    var origSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+      s.pending++; touch();
+      this.addEventListener('loadend', done);
+      try {
+        return origSend.apply(this, arguments);
+      } catch (e) { done(); throw e; }
+    };
+  }
+
+  function observe() {
+    new MutationObserver(touch).observe(document.documentElement, {
+      childList: true, subtree: true, characterData: true,
+      attributes: true,
+      attributeFilter: ['disabled', 'hidden', 'aria-hidden', 'aria-busy', 'value', 'href', 'src']
+    });
+  }
+  if (document.documentElement) { observe(); }
+  else { document.addEventListener('DOMContentLoaded', observe); }
+})();
+"""
+
+WAIT_JS = r"""
+var quietMs = arguments[0], timeoutMs = arguments[1];
+var callback = arguments[arguments.length - 1];
+var started = Date.now();
+(function check() {
+  var s = window.__settle, now = Date.now();
+  if (document.readyState === 'complete' && s && s.pending === 0
+      && now - s.lastActivity >= quietMs) {
+    callback(true);
+  } else if (now - started >= timeoutMs) {
+    callback(false);
+  } else {
+    setTimeout(check, 50);
+  }
+})();
+"""
+
+
+def install_settle_instrumentation(driver):
+    """
+    Registers the instrumentation to run before page scripts on every new
+    document (Chrome only). Without it, requests started before the first
+    wait are not counted.
+    """
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": INSTRUMENT_JS})
+        return True
+    except Exception:
+        return False
+
+
+# ---------------------------------------------------------
+# WAITING
+# ---------------------------------------------------------
+
+def _script_timeout(driver):
+    """The driver's current async script timeout in seconds, or None if it can't be read."""
+    try:
+        return driver.timeouts.script
+    except (WebDriverException, AttributeError):
+        return None
+
+
+@traced("settle_wait")
+def wait_for_page_settle(driver, quiet_ms=SETTLE_QUIET_MS, timeout=SETTLE_TIMEOUT):
+    """
+    Blocks until the page is loaded, has no pending fetch/XHR and the DOM
+    has been stable for `quiet_ms`, or until `timeout` seconds pass.
+    Returns the seconds actually waited.
+    """
+    started = time.perf_counter()
+    deadline = started + timeout
+    settled = False
+    # the driver is shared with the generated step code: give back its script timeout
+    previous_script_timeout = _script_timeout(driver)
+
+    try:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                driver.execute_script(INSTRUMENT_JS)
+                driver.set_script_timeout(remaining + 2)
+                settled = driver.execute_async_script(WAIT_JS, quiet_ms, int(remaining * 1000))
+                break
+            except WebDriverException:
+                # the page navigated mid-wait → wait again on the new document
+                time.sleep(0.05)
+    finally:
+        if previous_script_timeout is not None:
+            try:
+                driver.set_script_timeout(previous_script_timeout)
+            except WebDriverException:
+                pass
+
+    waited = time.perf_counter() - started
+    if not settled:
+        print(f"⏳ Page did not settle within {timeout}s → continuing anyway")
+    return waited
@@ -0,0 +1,288 @@
+# run_recorder.py
+import argparse
+import hashlib
+import json
+import os
+import re
+import textwrap
+import time
+from urllib.parse import urlparse
+
+# --- Configuration ---
+RECORDINGS_DIR = os.getenv("RECORDINGS_DIR", "recordings")
+RECORD_RUNS = os.getenv("AGENT_RECORD_RUNS", "1") == "1"
+# 2: credentials are stored as placeholders (1: plaintext, still readable)
+MANIFEST_VERSION = 2
+SUPPORTED_VERSIONS = (1, 2)
+
+# Manifests never contain the run's credentials: every occurrence (fields,
+# step code, goals) is replaced by a placeholder, resolved at replay/export
+# time from these environment variables or --username / --password
+USERNAME_ENV = "RECORDING_USERNAME"
+PASSWORD_ENV = "RECORDING_PASSWORD"
+USERNAME_PLACEHOLDER = "${" + USERNAME_ENV + "}"
+PASSWORD_PLACEHOLDER = "${" + PASSWORD_ENV + "}"
+
+
+def _replace_all(value, replacements):
+    """Applies (old, new) string replacements to every string in a JSON-like value."""
+    if isinstance(value, str):
+        for old, new in replacements:
+            value = value.replace(old, new)
+        return value
+    if isinstance(value, list):
+        return [_replace_all(item, replacements) for item in value]
+    if isinstance(value, dict):
+        return {key: _replace_all(item, replacements) for key, item in value.items()}
+    return value
+
+
+def resolve_credentials(manifest, username=None, password=None):
+    """
+    Copy of `manifest` with the credential placeholders filled in from the
+    arguments, else RECORDING_USERNAME / RECORDING_PASSWORD. Raises
+    ValueError when a placeholder is used but no value is available.
+    """
+    values = [(USERNAME_PLACEHOLDER, username or os.getenv(USERNAME_ENV), USERNAME_ENV),
+              (PASSWORD_PLACEHOLDER, password or os.getenv(PASSWORD_ENV), PASSWORD_ENV)]
+    serialized = json.dumps(manifest)
+    missing = [env for placeholder, value, env in values if value is None and placeholder in serialized]
+    if missing:
+        raise ValueError(f"Recording needs credentials: set {' and '.join(missing)} "
+                         f"or pass --username / --password")
+    return _replace_all(manifest, [(placeholder, value) for placeholder, value, _ in values if value is not None])
+
+
+# ---------------------------------------------------------
+# RECORDING
+# ---------------------------------------------------------
+
+class RunRecorder:
+    """
+    Collects the ordered successful step codes of one agent run, plus the
+    page transition and settle wait around each of them.
+    """
+
+    def __init__(self, start_url, username, password, global_steps):
+        self.start_url = start_url
+        self.username = username
+        self.password = password
+        self.global_steps = list(global_steps or [])
+        self.steps = {}
+
+    def record_step(self, step_index, goal, code, url_before, url_after, settle_seconds):
+        self.steps[step_index] = {
+            "step": step_index + 1,
+            "goal": goal,
+            "code": code,
+            "url_before": url_before,
+            "url_after": url_after,
+            "settle_seconds": round(settle_seconds or 0.0, 3),
+        }
+
+    def is_complete(self):
+        return bool(self.global_steps) and all(i in self.steps for i in range(len(self.global_steps)))
+
+    def to_manifest(self):
+        manifest = {
+            "version": MANIFEST_VERSION,
+            "start_url": self.start_url,
+            "username": self.username,
+            "password": self.password,
+            "global_steps": self.global_steps,
+            "recorded_at": time.time(),
+            "steps": [self.steps[i] for i in sorted(self.steps)],
+        }
+        # longest first, so a password inside the username (or vice versa) still round-trips
+        secrets = sorted([(self.username, USERNAME_PLACEHOLDER), (self.password, PASSWORD_PLACEHOLDER)],
+                         key=lambda pair: len(pair[0] or ""), reverse=True)
+        return _replace_all(manifest, [(value, placeholder) for value, placeholder in secrets if value])
+
+    def default_path(self):
+        """Stable file name per (site, steps) so reruns overwrite instead of piling up."""
+        digest = hashlib.sha1(
+            json.dumps([self.start_url, self.global_steps]).encode("utf-8")
+        ).hexdigest()[:10]
+        host = re.sub(r"[^a-zA-Z0-9]+", "_", urlparse(self.start_url).netloc).strip("_")
+        return os.path.join(RECORDINGS_DIR, f"{host or 'run'}_{digest}.json")
+
+    def save(self, path=None):
+        path = path or self.default_path()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_manifest(), f, indent=2)
+        print(f"🎞 Recorded {len(self.steps)} steps → {path}")
+        return path
+
+
+def load_recording(path):
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") not in SUPPORTED_VERSIONS:
+        raise ValueError(f"Unsupported recording version: {manifest.get('version')}")
+    return manifest
+
+
+# ---------------------------------------------------------
+# REPLAY
+# ---------------------------------------------------------
+
+def _same_page(url_a, url_b):
+    a, b = urlparse(url_a or ""), urlparse(url_b or "")
+    return (a.netloc, a.path.rstrip("/")) == (b.netloc, b.path.rstrip("/"))
+
+
+def replay_recording(recording, fallback_to_agent=True, max_agent_steps=8, progress_callback=None,
+                     username=None, password=None):
+    """
+    Replays a recorded run without the LLM or per-step DOM extraction.
+    At the first step that breaks (code error or unexpected page), hands the
+    live browser over to the agent for the remaining steps.
+    Credentials come from the arguments or the environment (see resolve_credentials).
+    Returns a plain-text report.
+    """
+    from browser_pool import get_browser_pool
+    from test_executor_1 import run_ai_code_safely
+    from page_settle import wait_for_page_settle
+
+    manifest = load_recording(recording) if isinstance(recording, str) else recording
+    manifest = resolve_credentials(manifest, username, password)
+    steps = manifest["steps"]
+    started = time.perf_counter()
+    log_text = f"🎞 Replaying {len(steps)} recorded steps for {manifest['start_url']}\n"
+
+    with get_browser_pool().lease() as session:
+        session.open(manifest["start_url"])
+        driver = session.driver
+
+        broken_index = None
+        for index, step in enumerate(steps):
+            step_started = time.perf_counter()
+            success = run_ai_code_safely(driver, step["code"])
+            wait_for_page_settle(driver)
+
+            if success and not _same_page(driver.current_url, step["url_after"]):
+                print(f"⚠️ Step {step['step']} landed on {driver.current_url}, expected {step['url_after']}")
+                success = False
+
+            elapsed = time.perf_counter() - step_started
+            emoji = "✅" if success else "❌"
+            log_text += f"{emoji} Step {step['step']}: {step['goal']} ({elapsed:.2f}s)\n"
+            if progress_callback:
+                progress_callback({"event": "replay_step", "step": step["step"],
+                                   "success": success, "seconds": round(elapsed, 3)})
+
+            if not success:
+                broken_index = index
+                break
+
+        if broken_index is None:
+            log_text += f"\n🎉 Replay passed in {time.perf_counter() - started:.2f}s (0 LLM calls)\n"
+            return log_text
+
+        if not fallback_to_agent:
+            log_text += "\n🛑 Replay broke and agent fallback is disabled.\n"
+            return log_text
+
+        # hand over to the agent from the broken step, on the same live page
+        from controller_1 import run_agentic_test
+
+        log_text += f"\n🤖 Falling back to the agent from step {broken_index + 1}\n"
+        log_text += run_agentic_test(
+            start_url=manifest["start_url"],
+            username=manifest.get("username", ""),
+            password=manifest.get("password", ""),
+            global_steps=manifest["global_steps"],
+            max_steps=max_agent_steps,
+            progress_callback=progress_callback,
+            session=session,
+            start_index=broken_index,
+        )
+
+    return log_text
+
+
+# ---------------------------------------------------------
+# PYTEST EXPORT
+# ---------------------------------------------------------
+
+PYTEST_TEMPLATE = '''\
+# Generated by run_recorder.py — replays a recorded agent run without the LLM.
+import time
+
+import pytest
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.support import expected_conditions, expected_conditions as EC
+from selenium.webdriver.support.ui import Select, WebDriverWait
+
+START_URL = {start_url!r}
+
+
+@pytest.fixture
+def driver():
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    d = webdriver.Chrome(options=options)
+    yield d
+    d.quit()
+
+
+def _settle(driver, timeout=10):
+    WebDriverWait(driver, timeout).until(
+        lambda d: d.execute_script("return document.readyState") == "complete"
+    )
+
+
+{step_functions}
+
+def test_recorded_run(driver):
+    driver.get(START_URL)
+    _settle(driver)
+{step_calls}
+'''
+
+
+def export_pytest(recording, path, username=None, password=None):
+    """Writes the recording as a standalone pytest file (credentials resolved as for replay)."""
+    manifest = load_recording(recording) if isinstance(recording, str) else recording
+    manifest = resolve_credentials(manifest, username, password)
+
+    functions, calls = [], []
+    for step in manifest["steps"]:
+        body = textwrap.indent(textwrap.dedent(step["code"]).strip() or "pass", "    ")
+        functions.append(f"def step_{step['step']}(driver):\n    # {step['goal']}\n{body}\n")
+        calls.append(f"    step_{step['step']}(driver)\n    _settle(driver)")
+
+    source = PYTEST_TEMPLATE.format(
+        start_url=manifest["start_url"],
+        step_functions="\n\n".join(functions) + "\n",
+        step_calls="\n".join(calls),
+    )
+    compile(source, path, "exec")  # fail here, not at pytest collection time
+
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(source)
+    print(f"📝 Pytest replay written to {path}")
+    return path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay or export a recorded agent run.")
+    parser.add_argument("recording", help="Path to a recording JSON manifest")
+    parser.add_argument("--export-pytest", metavar="PATH", help="Write a standalone pytest file instead of replaying")
+    parser.add_argument("--no-fallback", action="store_true", help="Do not hand broken steps to the agent")
+    parser.add_argument("--username", help=f"Login username (default: ${USERNAME_ENV})")
+    parser.add_argument("--password", help=f"Login password (default: ${PASSWORD_ENV})")
+    args = parser.parse_args()
+
+    if args.export_pytest:
+        export_pytest(args.recording, args.export_pytest, args.username, args.password)
+    else:
+        print(replay_recording(args.recording, fallback_to_agent=not args.no_fallback,
+                               username=args.username, password=args.password))
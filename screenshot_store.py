@@ -0,0 +1,181 @@
+# screenshot_store.py
+import hashlib
+import io
+import os
+import queue
+import threading
+import time
+import uuid
+from tracing import span
+
+try:
+    from PIL import Image  # optional: only needed for downscaling / JPEG recompression
+except ImportError:
+    Image = None
+
+# --- Configuration ---
+# always | on_failure | off
+SCREENSHOT_POLICY = os.getenv("SCREENSHOT_POLICY", "always")
+SCREENSHOT_DIR = os.getenv("SCREENSHOT_DIR", "screenshots")
+# 0 keeps the captured size; otherwise frames wider than this are downscaled
+SCREENSHOT_MAX_WIDTH = int(os.getenv("SCREENSHOT_MAX_WIDTH", "0"))
+# png | jpeg (jpeg needs Pillow)
+SCREENSHOT_FORMAT = os.getenv("SCREENSHOT_FORMAT", "png")
+SCREENSHOT_QUALITY = int(os.getenv("SCREENSHOT_QUALITY", "70"))
+# success frames waiting for the writer; beyond this new ones are dropped, never waited on
+# (failure frames are always kept: they don't count against this limit)
+SCREENSHOT_QUEUE_SIZE = int(os.getenv("SCREENSHOT_QUEUE_SIZE", "64"))
+
+POLICIES = ("always", "on_failure", "off")
+
+
+def new_run_dir(base_dir=SCREENSHOT_DIR):
+    """Unique per-run directory, so concurrent runs never overwrite each other."""
+    return os.path.join(base_dir, f"{time.strftime('%Y%m%d-%H%M%S')}_{uuid.uuid4().hex[:8]}")
+
+
+# ---------------------------------------------------------
+# BACKGROUND WRITER
+# ---------------------------------------------------------
+
+_write_queue = queue.Queue()
+# capacity for success frames; failure frames bypass it so they are never dropped
+_success_slots = threading.BoundedSemaphore(SCREENSHOT_QUEUE_SIZE)
+_writer = None
+_writer_lock = threading.Lock()
+_warned_no_pillow = False
+
+
+def _encode(png_bytes, max_width, fmt, quality):
+    """Downscales / recompresses a PNG capture. Returns the bytes to write."""
+    global _warned_no_pillow
+    if not max_width and fmt == "png":
+        return png_bytes
+    if Image is None:
+        if not _warned_no_pillow:
+            print("⚠️ Pillow not installed → screenshots are written as captured PNGs")
+            _warned_no_pillow = True
+        return png_bytes
+
+    image = Image.open(io.BytesIO(png_bytes))
+    if max_width and image.width > max_width:
+        image = image.resize((max_width, round(image.height * max_width / image.width)))
+
+    out = io.BytesIO()
+    if fmt == "jpeg":
+        image.convert("RGB").save(out, format="JPEG", quality=quality, optimize=True)
+    else:
+        image.save(out, format="PNG", optimize=True)
+    return out.getvalue()
+
+
+def _writer_loop():
+    while True:
+        path, png_bytes, options, recorder, holds_slot = _write_queue.get()
+        try:
+            with span("screenshot_write", file=os.path.basename(path)):
+                data = _encode(png_bytes, *options)
+                os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                with open(path, "wb") as f:
+                    f.write(data)
+        except Exception as e:
+            print(f"⚠️ Screenshot write failed ({path}): {e}")
+        finally:
+            if holds_slot:
+                _success_slots.release()
+            recorder._frame_done()
+            _write_queue.task_done()
+
+
+def _ensure_writer():
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_writer_loop, name="screenshot-writer", daemon=True)
+            _writer.start()
+
+
+def flush_screenshots():
+    """Blocks until every queued screenshot of every run is on disk (shutdown; runs use recorder.flush())."""
+    if _writer is not None:
+        _write_queue.join()
+
+
+# ---------------------------------------------------------
+# PER-RUN RECORDER
+# ---------------------------------------------------------
+
+class ScreenshotRecorder:
+    """
+    Captures step screenshots for one run. Capturing is the only work done on
+    the caller's thread; encoding and disk writes happen on the background
+    writer. Frames identical to the previous capture are skipped.
+    """
+
+    def __init__(self, run_dir, policy=SCREENSHOT_POLICY, max_width=SCREENSHOT_MAX_WIDTH,
+                 fmt=SCREENSHOT_FORMAT, quality=SCREENSHOT_QUALITY):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown screenshot policy: {policy} (expected one of {POLICIES})")
+        if fmt == "jpeg" and Image is None:
+            fmt = "png"
+        self.run_dir = run_dir
+        self.policy = policy
+        self.options = (max_width, fmt, quality)
+        self.extension = ".jpg" if fmt == "jpeg" else ".png"
+        self._last_hash = None
+        self._pending = 0                   # frames of this run still waiting for the writer
+        self._pending_done = threading.Condition()
+        self.stats = {"captured": 0, "queued": 0, "duplicates": 0, "dropped": 0, "skipped_by_policy": 0}
+
+    def capture(self, driver, name, success=True):
+        """
+        Queues a screenshot named `name` (extension follows the format).
+        Returns the path it will be written to, or None if nothing was queued.
+        """
+        if self.policy == "off" or (self.policy == "on_failure" and success):
+            self.stats["skipped_by_policy"] += 1
+            return None
+
+        with span("screenshot", file=name) as attrs:
+            png_bytes = driver.get_screenshot_as_png()
+            self.stats["captured"] += 1
+
+            digest = hashlib.sha1(png_bytes).hexdigest()
+            if digest == self._last_hash:
+                self.stats["duplicates"] += 1
+                attrs["duplicate"] = True
+                return None
+
+            path = os.path.join(self.run_dir, os.path.splitext(name)[0] + self.extension)
+            # failure frames are the ones worth debugging: they never wait and are never dropped
+            if success and not _success_slots.acquire(blocking=False):
+                self.stats["dropped"] += 1
+                attrs["dropped"] = True
+                print(f"⚠️ Screenshot queue full → dropping {name}")
+                return None
+
+            with self._pending_done:
+                self._pending += 1
+            _ensure_writer()
+            _write_queue.put((path, png_bytes, self.options, self, success))
+
+            self._last_hash = digest
+            self.stats["queued"] += 1
+            return path
+
+    def _frame_done(self):
+        with self._pending_done:
+            self._pending -= 1
+            if self._pending == 0:
+                self._pending_done.notify_all()
+
+    def flush(self, timeout=None):
+        """Blocks until this run's screenshots are on disk (other runs' frames aren't waited for)."""
+        with self._pending_done:
+            return self._pending_done.wait_for(lambda: self._pending == 0, timeout)
+
+    def summary(self):
+        s = self.stats
+        return (f"{s['queued']} saved, {s['duplicates']} duplicates skipped"
+                + (f", {s['dropped']} dropped" if s["dropped"] else "")
+                + f" (policy: {self.policy}) → {self.run_dir}")
@@ -0,0 +1,183 @@
+# startup.py
+import argparse
+import importlib
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+
+try:
+    import psutil  # optional: counts interpreter + server startup too, not just from this import
+except ImportError:
+    psutil = None
+
+# Wall-clock start of the process (falls back to when main.py started importing)
+PROCESS_STARTED_AT = psutil.Process().create_time() if psutil is not None else time.time()
+
+# --- Configuration ---
+# prewarm: lifespan hook imports the agent stack and warms DB/browser/LLM pool in the background
+# lazy:    nothing heavy happens until the first request needs it
+STARTUP_MODE = os.getenv("STARTUP_MODE", "prewarm")
+PREWARM_BROWSER = os.getenv("PREWARM_BROWSER", "1") == "1"
+# Cold-start budget in seconds (import of main + prewarm until ready)
+COLD_START_BUDGET_SECONDS = float(os.getenv("COLD_START_BUDGET_SECONDS", "10"))
+# Budget for `import main` alone (checked by `python startup.py`)
+IMPORT_BUDGET_SECONDS = float(os.getenv("IMPORT_BUDGET_SECONDS", "1.0"))
+
+# Modules that make up the agent stack (Selenium, lxml, OpenAI SDK...), in warm-up order
+HEAVY_MODULES = ("llm_client", "locator_extractor_1", "controller_1")
+
+
+# ---------------------------------------------------------
+# TIMED / LAZY IMPORTS
+# ---------------------------------------------------------
+
+_imports = {}        # module -> seconds spent on its first import
+
+
+def timed_import(name):
+    """
+    importlib.import_module, recording how long the first import took.
+    Always goes through importlib (never straight to sys.modules), so a
+    module another thread is still initialising is waited for, not returned.
+    """
+    if name in _imports or name in sys.modules:
+        return importlib.import_module(name)
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    _imports.setdefault(name, round(time.perf_counter() - started, 4))
+    return module
+
+
+# ---------------------------------------------------------
+# READINESS
+# ---------------------------------------------------------
+
+_checks = {}          # name -> {"status", "seconds", "required", "error"?}
+_state = {"main_imported_seconds": None, "ready_seconds": None, "prewarm_started": False}
+_state_lock = threading.Lock()
+
+
+def mark_imported():
+    """Called at the end of main.py: time from process start to app importable."""
+    _state["main_imported_seconds"] = _since_start()
+
+
+def _since_start():
+    return round(time.time() - PROCESS_STARTED_AT, 4)
+
+
+def _run_check(name, fn, required=True):
+    _checks[name] = {"status": "running", "required": required}
+    started = time.perf_counter()
+    try:
+        fn()
+        _checks[name].update(status="ok")
+    except Exception as e:
+        _checks[name].update(status="failed", error=f"{type(e).__name__}: {e}")
+        print(f"⚠️ Warm-up '{name}' failed: {e}")
+    _checks[name]["seconds"] = round(time.perf_counter() - started, 4)
+
+
+def _warm_db():
+    timed_import("memory_db_1").init_db()
+
+
+def _warm_llm_client():
+    timed_import("llm_client")._get_loop()
+
+
+def _warm_browser():
+    timed_import("browser_pool").get_browser_pool()
+
+
+def prewarm(browser=PREWARM_BROWSER):
+    """Imports the agent stack and warms DB, LLM connection pool and (optionally) the browser pool."""
+    started = time.perf_counter()
+    for name in HEAVY_MODULES:
+        _run_check(f"import:{name}", lambda name=name: timed_import(name))
+    _run_check("db", _warm_db)
+    _run_check("llm_client", _warm_llm_client)
+    if browser:
+        # a missing/broken Chrome shouldn't keep the replica out of rotation; runs retry the launch
+        _run_check("browser_pool", _warm_browser, required=False)
+    _state["ready_seconds"] = _since_start()
+    print(f"🔥 Prewarm finished in {time.perf_counter() - started:.2f}s "
+          f"(ready {_state['ready_seconds']:.2f}s after process start)")
+
+
+def start_prewarm(mode=STARTUP_MODE):
+    """Lifespan entry: prewarms in a background thread so liveness answers at once."""
+    with _state_lock:
+        if _state["prewarm_started"]:
+            return
+        _state["prewarm_started"] = True
+    if mode == "prewarm":
+        threading.Thread(target=prewarm, name="prewarm", daemon=True).start()
+    else:
+        _state["ready_seconds"] = _since_start()
+
+
+def is_ready():
+    if _state["ready_seconds"] is None:
+        return False
+    return all(c["status"] == "ok" for c in _checks.values() if c["required"])
+
+
+def startup_report():
+    """Import timings, warm-up checks and cold-start time against the budget."""
+    ready_seconds = _state["ready_seconds"]
+    return {
+        "mode": STARTUP_MODE,
+        "ready": is_ready(),
+        "main_imported_seconds": _state["main_imported_seconds"],
+        "ready_seconds": ready_seconds,
+        "budget_seconds": COLD_START_BUDGET_SECONDS,
+        "within_budget": ready_seconds is not None and ready_seconds <= COLD_START_BUDGET_SECONDS,
+        "imports": dict(_imports),
+        "checks": {name: dict(check) for name, check in _checks.items()},
+    }
+
+
+# ---------------------------------------------------------
+# IMPORT-TIME REPORT (fresh interpreter, python -X importtime)
+# ---------------------------------------------------------
+
+def measure_import(module="main", top=15):
+    """
+    Imports `module` in a fresh interpreter and returns (total_seconds,
+    [(cumulative_seconds, module), ...] slowest first).
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, env=os.environ.copy())
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)", line)
+        if m:
+            rows.append((int(m.group(1)) / 1e6, m.group(2)))
+    total = next((seconds for seconds, name in rows if name == module), None)
+    # cumulative times, so a slow leaf also shows up through the modules that imported it
+    slowest = sorted((row for row in rows if row[1] != module), reverse=True)[:top]
+    return total, slowest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import-time report and cold-start budget check.")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--budget", type=float, default=IMPORT_BUDGET_SECONDS, help="Seconds allowed for the import")
+    args = parser.parse_args()
+
+    total, slowest = measure_import(args.module, args.top)
+    print(f"📦 import {args.module}: {total:.3f}s (budget {args.budget:.3f}s)")
+    for seconds, name in slowest:
+        print(f"   {seconds * 1000:8.1f}ms  {name}")
+    if total > args.budget:
+        print("❌ Import time over budget")
+        sys.exit(1)
+    print("✅ Import time within budget")
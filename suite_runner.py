@@ -0,0 +1,206 @@
+# suite_runner.py
+import argparse
+import json
+import multiprocessing
+import os
+import re
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+# --- Configuration ---
+SUITE_OUTPUT_DIR = os.getenv("SUITE_OUTPUT_DIR", "suite_results")
+# Rough resident memory of one headless Chrome + worker process
+PER_BROWSER_MB = int(os.getenv("SUITE_PER_BROWSER_MB", "700"))
+
+
+# ---------------------------------------------------------
+# SCENARIOS
+# ---------------------------------------------------------
+
+def load_scenarios(path):
+    """
+    Reads scenarios from a JSON list or a JSONL file. Each scenario is either
+      {"name": ..., "prompt": "<same text you would send to /api/chat>"}
+    or
+      {"name": ..., "url": ..., "username": ..., "password": ..., "steps": [...]}
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        raw = f.read().strip()
+
+    if raw.startswith("["):
+        scenarios = json.loads(raw)
+    else:
+        scenarios = [json.loads(line) for line in raw.splitlines() if line.strip()]
+
+    for i, scenario in enumerate(scenarios):
+        scenario.setdefault("name", f"scenario_{i + 1}")
+    return scenarios
+
+
+def _slug(name):
+    return re.sub(r"[^a-zA-Z0-9_-]+", "_", name).strip("_")[:80] or "scenario"
+
+
+def default_workers(memory_mb=None):
+    """One browser per core, capped by the memory budget if one is given."""
+    workers = os.cpu_count() or 1
+    if memory_mb:
+        workers = min(workers, max(1, memory_mb // PER_BROWSER_MB))
+    return workers
+
+
+# ---------------------------------------------------------
+# WORKER PROCESS
+# ---------------------------------------------------------
+
+def _init_worker():
+    """Each worker drives exactly one warm browser."""
+    os.environ["BROWSER_POOL_MIN"] = "1"
+    os.environ["BROWSER_POOL_MAX"] = "1"
+
+    from browser_pool import shutdown_browser_pool
+    # atexit does not run in pool workers; multiprocessing finalizers do
+    multiprocessing.util.Finalize(None, shutdown_browser_pool, exitpriority=10)
+
+
+def _run_scenario(scenario, artifacts_dir, max_steps):
+    from controller_1 import run_agentic_test_with_details
+
+    os.makedirs(artifacts_dir, exist_ok=True)
+    started = time.perf_counter()
+    result = {
+        "name": scenario["name"],
+        "artifacts_dir": artifacts_dir,
+        "passed": False,
+        "error": None,
+    }
+
+    try:
+        if scenario.get("prompt"):
+            from chat_routes import extract_test_parameters, parse_steps_from_ui_prompt
+
+            url, username, password, goal = extract_test_parameters(scenario["prompt"])
+            steps = parse_steps_from_ui_prompt(scenario["prompt"]) or parse_steps_from_ui_prompt(goal or "")
+        else:
+            url = scenario.get("url")
+            username, password = scenario.get("username", ""), scenario.get("password", "")
+            goal, steps = scenario.get("goal"), scenario.get("steps", [])
+
+        if not url or not steps:
+            raise ValueError("scenario needs a URL and at least one step")
+
+        details = run_agentic_test_with_details(
+            start_url=url,
+            username=username or "",
+            password=password or "",
+            user_prompt=goal,
+            global_steps=steps,
+            max_steps=scenario.get("max_steps", max_steps),
+            artifacts_dir=artifacts_dir,
+        )
+
+        with open(os.path.join(artifacts_dir, "report.txt"), "w", encoding="utf-8") as f:
+            f.write(details["report"])
+
+        result.update({
+            "passed": details["passed"],
+            "steps_total": details["steps_total"],
+            "steps_completed": details["steps_completed"],
+            "agent_steps": details["agent_steps"],
+            "llm_calls": details["llm_calls"],
+        })
+
+    except Exception as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        with open(os.path.join(artifacts_dir, "error.txt"), "w", encoding="utf-8") as f:
+            f.write(traceback.format_exc())
+
+    result["duration_seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+# ---------------------------------------------------------
+# SUITE
+# ---------------------------------------------------------
+
+def _result_line(result):
+    emoji = "✅" if result["passed"] else "❌"
+    duration = "no timing" if result["duration_seconds"] is None else f"{result['duration_seconds']}s"
+    return (f"{emoji} {result['name']} ({duration})"
+            + (f" — {result['error']}" if result["error"] else ""))
+
+
+def run_suite(scenarios, workers=None, output_dir=SUITE_OUTPUT_DIR, max_steps=8):
+    """
+    Fans scenarios out over a process pool (one browser per worker).
+    Returns the summary dict, also written to <output_dir>/summary.json.
+    """
+    workers = workers or default_workers()
+    run_dir = os.path.join(output_dir, time.strftime("%Y%m%d-%H%M%S"))
+    os.makedirs(run_dir, exist_ok=True)
+
+    # migrate the step memory once, here: otherwise every worker would try on its first DB use
+    from memory_db_1 import init_db
+    init_db()
+
+    print(f"🚀 Running {len(scenarios)} scenarios on {workers} browser workers → {run_dir}")
+    started = time.perf_counter()
+    results = []
+
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=workers, mp_context=ctx, initializer=_init_worker) as pool:
+        futures = {}
+        for i, scenario in enumerate(scenarios):
+            artifacts_dir = os.path.join(run_dir, f"{i + 1:03d}_{_slug(scenario['name'])}")
+            futures[pool.submit(_run_scenario, scenario, artifacts_dir, max_steps)] = (i, scenario)
+
+        for future in as_completed(futures):
+            index, scenario = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:  # worker crashed (e.g. killed by OOM)
+                result = {"name": scenario["name"], "passed": False,
+                          "error": f"worker crashed: {e}", "duration_seconds": None}
+            results.append((index, result))
+            print(_result_line(result))
+
+    # submission order (scenario names may repeat)
+    results = [result for _, result in sorted(results, key=lambda pair: pair[0])]
+
+    durations = [r["duration_seconds"] for r in results if r["duration_seconds"] is not None]
+    summary = {
+        "run_dir": run_dir,
+        "workers": workers,
+        "total": len(results),
+        "passed": sum(1 for r in results if r["passed"]),
+        "failed": sum(1 for r in results if not r["passed"]),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "scenario_seconds_total": round(sum(durations), 3),
+        "results": results,
+    }
+
+    with open(os.path.join(run_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+
+    print(f"\n📊 {summary['passed']}/{summary['total']} passed in {summary['wall_seconds']}s "
+          f"(sum of scenario times {summary['scenario_seconds_total']}s)")
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a suite of agent scenarios in parallel.")
+    parser.add_argument("scenarios", help="JSON list or JSONL file of scenarios")
+    parser.add_argument("--workers", type=int, help="Concurrent browsers (default: CPU count, capped by --memory-mb)")
+    parser.add_argument("--memory-mb", type=int, help=f"RAM budget; allows one browser per {PER_BROWSER_MB} MB")
+    parser.add_argument("--output-dir", default=SUITE_OUTPUT_DIR)
+    parser.add_argument("--max-steps", type=int, default=8)
+    args = parser.parse_args()
+
+    summary = run_suite(
+        load_scenarios(args.scenarios),
+        workers=args.workers or default_workers(args.memory_mb),
+        output_dir=args.output_dir,
+        max_steps=args.max_steps,
+    )
+    raise SystemExit(0 if summary["failed"] == 0 else 1)
@@ -1,132 +1,191 @@
 import os
-import sys
 import subprocess
-import shutil
+import threading
+import time
+import xml.etree.ElementTree as ET
+from concurrent.futures import ThreadPoolExecutor
 
-# --- Configuration ---
-TEST_VENV_DIR = ".venv-tests"
-TEST_VENV_PATH = os.path.join(os.getcwd(), TEST_VENV_DIR)
+# Venv handling lives in venv_manager_1 (content-addressed templates + per-run clones);
+# re-exported here so existing imports keep working.
+from venv_manager_1 import (
+    TEST_VENV_DIR,
+    TEST_VENV_PATH,
+    get_venv_python_executable,
+    ensure_test_venv_exists,
+    cleanup_test_venv,
+)
 
 
-# --- OS-Agnostic Venv Helpers ---
+# ---------------------------------------------------------
+# STREAMED PYTEST RUNS + JUNIT RESULTS
+# ---------------------------------------------------------
 
-def get_venv_python_executable(venv_root):
-    """
-    Returns the absolute path to the Python executable within a virtual environment,
-    regardless of the operating system (Windows, Linux, macOS).
-    """
-    if sys.platform.startswith('win'):
-        # Windows: executables are in 'Scripts' for venv
-        exec_dir = 'Scripts'
-        executable_name = 'python.exe'
-    else:
-        # POSIX (Linux, macOS): executables are in 'bin'
-        exec_dir = 'bin'
-        executable_name = 'python'
+PYTEST_WORKERS = int(os.getenv("PYTEST_WORKERS", str(os.cpu_count() or 1)))
+PYTEST_RESULTS_DIR = os.getenv("PYTEST_RESULTS_DIR", "pytest_results")
 
-    python_path = os.path.join(venv_root, exec_dir, executable_name)
+_print_lock = threading.Lock()
 
-    # Fallback check for Windows systems
-    if not os.path.exists(python_path) and sys.platform.startswith('win'):
-        python_path = os.path.join(venv_root, 'bin', 'python.exe')
 
-    return python_path
+def parse_junit_xml(junit_path):
+    """Per-test outcomes and timings from a pytest JUnit XML report."""
+    tests = []
+    if not os.path.exists(junit_path):
+        return tests
 
-
-def ensure_test_venv_exists(venv_path):
+    try:
+        root = ET.parse(junit_path).getroot()
+    except ET.ParseError as e:
+        # pytest killed mid-write leaves a truncated report
+        print(f"⚠️ Unreadable JUnit report {junit_path}: {e}")
+        return tests
+    for case in root.iter("testcase"):
+        outcome, message = "passed", None
+        for tag in ("failure", "error", "skipped"):
+            child = case.find(tag)
+            if child is not None:
+                outcome = {"failure": "failed", "error": "error", "skipped": "skipped"}[tag]
+                message = child.get("message") or (child.text or "").strip()[:500]
+                break
+
+        tests.append({
+            "file": case.get("file"),
+            "classname": case.get("classname"),
+            "name": case.get("name"),
+            "outcome": outcome,
+            "seconds": float(case.get("time") or 0.0),
+            "message": message,
+        })
+    return tests
+
+
+def _summarize(tests):
+    counts = {"passed": 0, "failed": 0, "error": 0, "skipped": 0}
+    for test in tests:
+        counts[test["outcome"]] += 1
+    return {"total": len(tests), **counts}
+
+
+def _stream_pytest(file_paths, junit_path, prefix="", line_callback=None):
     """
-    Creates the dedicated virtual environment if it doesn't exist and installs
-    necessary dependencies (pytest, selenium, webdriver-manager).
+    Runs pytest with the venv Python, printing output line by line as it arrives.
+    Returns the pytest exit code.
     """
-    if os.path.isdir(venv_path):
-        print(f"\n✅ Dedicated Venv Found: {venv_path}")
-        return
-
-    print(f"\n⏳ Creating dedicated Venv: {venv_path}")
-
-    try:
-        # Create the venv using the system's current Python interpreter
-        subprocess.run([sys.executable, "-m", "venv", venv_path], check=True)
-        print("🎉 Venv created successfully.")
-
-        # Use the Venv's Python interpreter path for installation
-        python_executable = get_venv_python_executable(venv_path)
-
-        # Install necessary testing dependencies
-        print("⏳ Installing core test dependencies: pytest, selenium, webdriver-manager...")
-        subprocess.run(
-            [python_executable, "-m", "pip", "install", "pytest", "selenium", "webdriver-manager"],
-            check=True,
-            capture_output=True,
-            text=True
-        )
-        print("🎉 Dependencies installed successfully.")
-
-    except subprocess.CalledProcessError as e:
-        print(f"❌ Error during Venv creation/setup. Deleting partial Venv.")
-        print(f"STDOUT: {e.stdout}\nSTDERR: {e.stderr}")
-        shutil.rmtree(venv_path, ignore_errors=True)
-        sys.exit(1)
-    except Exception as e:
-        print(f"❌ An unexpected error occurred: {e}")
-        sys.exit(1)
+    # report paths are reused between runs: a stale one must never be read as this run's
+    if os.path.exists(junit_path):
+        os.remove(junit_path)
 
-
-def run_pytest_test_file(file_path):
+    python_executable = get_venv_python_executable(TEST_VENV_PATH)
+    command = [python_executable, "-m", "pytest", *file_paths,
+               f"--junitxml={junit_path}", "-o", "junit_family=xunit1"]
+
+    process = subprocess.Popen(
+        command,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        text=True,
+        bufsize=1
+    )
+    for line in process.stdout:
+        line = line.rstrip("\n")
+        with _print_lock:
+            print(f"{prefix}{line}")
+        if line_callback:
+            line_callback(line)
+    return process.wait()
+
+
+def run_pytest_test_file(file_path, junit_path=None, line_callback=None):
     """
     Executes a specific pytest file using the dedicated Venv's Python interpreter.
+    Output is streamed; returns a result dict with per-test outcomes from JUnit XML.
     """
     python_executable = get_venv_python_executable(TEST_VENV_PATH)
     print(f"\n🚀 Running generated test using Venv Python: {python_executable}")
 
-    # Command: Execute the "pytest" module using the VENV's Python
-    command = [python_executable, "-m", "pytest", file_path]
+    os.makedirs(PYTEST_RESULTS_DIR, exist_ok=True)
+    junit_path = junit_path or os.path.join(
+        PYTEST_RESULTS_DIR, f"{os.path.splitext(os.path.basename(file_path))[0]}.xml")
+    result = {"files": [file_path], "returncode": None, "junit_path": junit_path, "tests": []}
 
     try:
-        # Execute the command
-        result = subprocess.run(
-            command,
-            capture_output=True,
-            text=True,
-            check=False
-        )
-
-        # Print the output
         print("\n--- Pytest Test Output ---")
-        print(result.stdout)
-        print("--- Pytest Standard Error (if any) ---")
-        print(result.stderr)
+        started = time.perf_counter()
+        result["returncode"] = _stream_pytest([file_path], junit_path, line_callback=line_callback)
+        result["seconds"] = round(time.perf_counter() - started, 3)
         print("--------------------------")
 
-        if result.returncode == 0:
+        if result["returncode"] == 0:
             print("🎉 Result: ALL tests PASSED.")
-        elif result.returncode == 1:
+        elif result["returncode"] == 1:
             print("❌ Result: Some tests FAILED.")
         else:
             print(
-                f"⚠️ Result: Pytest finished with status code {result.returncode} (Internal Error or No tests found).")
+                f"⚠️ Result: Pytest finished with status code {result['returncode']} (Internal Error or No tests found).")
+
+        result["tests"] = parse_junit_xml(junit_path)
 
     except FileNotFoundError:
         print("❌ Error: Venv Python executable not found. Did the Venv setup fail?")
     except Exception as e:
         print(f"❌ An unexpected error occurred during subprocess execution: {e}")
 
+    result.update(_summarize(result["tests"]))
+    return result
+
 
-def cleanup_test_venv(venv_path):
+def shard_files(file_paths, shards):
+    """Round-robin split of test files into at most `shards` non-empty groups."""
+    groups = [[] for _ in range(max(1, min(shards, len(file_paths))))]
+    for i, path in enumerate(file_paths):
+        groups[i % len(groups)].append(path)
+    return groups
+
+
+def run_pytest_files_parallel(file_paths, workers=PYTEST_WORKERS, output_dir=PYTEST_RESULTS_DIR,
+                              line_callback=None):
     """
-    Safely removes the dedicated virtual environment directory.
+    Shards generated test files across `workers` pytest processes (each test
+    file drives its own browser) and merges their JUnit results.
+    `line_callback(shard_index, line)` receives streamed output if given.
     """
-    if os.path.isdir(venv_path):
-        print(f"\n🗑️ Cleaning up dedicated Venv: {venv_path}...")
+    if not file_paths:
+        return {"workers": 0, "wall_seconds": 0.0, "shards": [], "tests": [], **_summarize([])}
+
+    os.makedirs(output_dir, exist_ok=True)
+    groups = shard_files(list(file_paths), workers)
+    print(f"\n🚀 Running {len(file_paths)} test files on {len(groups)} pytest workers")
+
+    def run_shard(index, files):
+        junit_path = os.path.join(output_dir, f"shard_{index}.xml")
+        callback = (lambda line: line_callback(index, line)) if line_callback else None
+        started = time.perf_counter()
         try:
-            # shutil.rmtree recursively deletes the directory and its contents
-            shutil.rmtree(venv_path)
-            print("🎉 Venv deleted successfully.")
-        except OSError as e:
-            # Handle permissions or other OS-level errors
-            print(f"❌ Error deleting Venv directory {venv_path}: {e}")
-    else:
-        print(f"\n⚠️ Venv directory not found at {venv_path}. Nothing to clean up.")
+            returncode = _stream_pytest(files, junit_path, prefix=f"[shard {index}] ", line_callback=callback)
+        except FileNotFoundError:
+            print("❌ Error: Venv Python executable not found. Did the Venv setup fail?")
+            returncode = None
+        tests = parse_junit_xml(junit_path)
+        return {"shard": index, "files": files, "returncode": returncode, "junit_path": junit_path,
+                "seconds": round(time.perf_counter() - started, 3), "tests": tests, **_summarize(tests)}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+        shards = list(pool.map(lambda args: run_shard(*args), enumerate(groups)))
+
+    tests = [test for shard in shards for test in shard["tests"]]
+    summary = {
+        "workers": len(groups),
+        "wall_seconds": round(time.perf_counter() - started, 3),
+        "shards": shards,
+        "tests": tests,
+        **_summarize(tests),
+    }
+
+    emoji = "🎉" if summary["failed"] == 0 and summary["error"] == 0 and all(
+        s["returncode"] == 0 for s in shards) else "❌"
+    print(f"{emoji} {summary['passed']}/{summary['total']} tests passed in {summary['wall_seconds']}s "
+          f"across {summary['workers']} workers")
+    return summary
 
 
 if __name__ == '__main__':
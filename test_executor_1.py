@@ -1,40 +1,234 @@
 # test_executor_1.py
+import ast
+import builtins
+import hashlib
+import inspect
 import textwrap
+import threading
+import time
+from collections import OrderedDict
+from selenium.webdriver.common.by import By
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver.common.action_chains import ActionChains
+from selenium.webdriver.support.ui import WebDriverWait, Select
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.webdriver import WebDriver as ChromeDriver
+from selenium.webdriver.common.alert import Alert
+from selenium.webdriver.remote.shadowroot import ShadowRoot
+from selenium.webdriver.remote.switch_to import SwitchTo
+from selenium.webdriver.remote.webelement import WebElement
+from tracing import span
+
+# ---------------------------------------------------------
+# ALLOWLISTS
+# ---------------------------------------------------------
+
+# Exact names generated code may import (`import time`, `from selenium... import By`)
+ALLOWED_IMPORTS = {
+    "By": By,
+    "Keys": Keys,
+    "WebDriverWait": WebDriverWait,
+    "expected_conditions": EC,
+    "Select": Select,
+    "time": time,
+}
+
+# Builtins available to generated code
+SAFE_BUILTINS = {
+    name: getattr(builtins, name) for name in (
+        "abs", "all", "any", "bool", "dict", "enumerate", "Exception", "float",
+        "int", "isinstance", "len", "list", "max", "min", "print", "range",
+        "reversed", "round", "set", "sorted", "str", "sum", "tuple", "zip",
+        "AssertionError", "ValueError", "TimeoutError", "True", "False", "None",
+    ) if hasattr(builtins, name)
+}
+
+# Attributes generated code must never touch (browser lifecycle / driver constructors)
+FORBIDDEN_ATTRIBUTES = {"quit", "Chrome", "Firefox", "Edge", "Safari", "Remote"}
+
+# Attribute names that reach the OS or the import system, denied at any depth
+# (e.g. some_selenium_module.subprocess.run) - plus every module re-exported
+# by an allowed module, so aliasing one doesn't get around the check
+DENIED_ATTRIBUTES = {"os", "subprocess", "sys", "shutil", "socket", "builtins", "importlib"} | {
+    name for module in ALLOWED_IMPORTS.values() if inspect.ismodule(module)
+    for name, value in vars(module).items() if inspect.ismodule(value)
+}
+
+
+# Objects generated code legitimately reaches attributes on: the driver and what
+# it hands back, the Selenium helpers, time, and plain values (str/list/dict...)
+_ATTRIBUTE_SOURCES = (
+    ChromeDriver, WebElement, SwitchTo, Alert, ShadowRoot, WebDriverException,
+    By, Keys, ActionChains, WebDriverWait, Select, EC, time,
+    str, bytes, int, float, list, tuple, dict, set,
+)
+
+# Only public attributes of those objects can be used (allowlist: frame / code
+# object attributes such as gi_frame, f_back, f_globals are never on it)
+ALLOWED_ATTRIBUTES = {
+    name for source in _ATTRIBUTE_SOURCES for name in dir(source) if not name.startswith("_")
+} - FORBIDDEN_ATTRIBUTES - DENIED_ATTRIBUTES
 
-def run_ai_code_safely(driver, code):
-    # ---- Basic safety ----
-    forbidden = [
-        "webdriver.Chrome",
-        "driver.quit",
-        "os.",
-        "subprocess",
-        "open(",
-        "socket",
-        "shutil",
-        "sys.exit",
-        "eval(",
-        "exec("
-    ]
-    for bad in forbidden:
-        if bad in code:
-            print(f"🚫 Unsafe pattern detected: {bad}")
-            return False
 
-    # ---- Normalize indentation ----
-    code = textwrap.dedent(code).strip()
+def _safe_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if fromlist:
+        allowed = name.startswith("selenium.") and all(n in ALLOWED_IMPORTS for n in fromlist)
+    else:
+        allowed = name == "time"
+    if level != 0 or not allowed:
+        raise ImportError(f"import of '{name}' is not allowed")
+    return __import__(name, globals, locals, fromlist, level)
 
-    # ---- Ensure import By exists (correct logic) ----
-    if "from selenium.webdriver.common.by import By" not in code:
-        code = (
-            "from selenium.webdriver.common.by import By\n" +
-            code
-        )
 
-    # ---- Execute with restricted globals ----
+# Prebuilt execution namespace: common Selenium helpers are already there,
+# so no import text has to be injected into the generated code.
+BASE_NAMESPACE = {
+    "__builtins__": {**SAFE_BUILTINS, "__import__": _safe_import},
+    "By": By,
+    "Keys": Keys,
+    "ActionChains": ActionChains,
+    "WebDriverWait": WebDriverWait,
+    "Select": Select,
+    "EC": EC,
+    "expected_conditions": EC,
+    "time": time,
+}
+
+
+# ---------------------------------------------------------
+# AST VALIDATION
+# ---------------------------------------------------------
+
+def _bound_names(tree):
+    """Names the snippet defines itself (assignments, loops, defs, imports...)."""
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and isinstance(node.ctx, (ast.Store, ast.Del)):
+            names.add(node.id)
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            names.add(node.name)
+        elif isinstance(node, ast.arg):
+            names.add(node.arg)
+        elif isinstance(node, ast.ExceptHandler) and node.name:
+            names.add(node.name)
+        elif isinstance(node, (ast.Import, ast.ImportFrom)):
+            for alias in node.names:
+                names.add((alias.asname or alias.name).split(".")[0])
+    return names
+
+
+_UNRESOLVED = object()
+
+
+def _resolve(node, known):
+    """Object a Name/Attribute chain refers to, when it starts at a known object."""
+    if isinstance(node, ast.Name):
+        return known.get(node.id, _UNRESOLVED)
+    if isinstance(node, ast.Attribute):
+        base = _resolve(node.value, known)
+        if base is not _UNRESOLVED:
+            return getattr(base, node.attr, _UNRESOLVED)
+    return _UNRESOLVED
+
+
+def validate_code(code):
+    """
+    Walks the AST of generated code. Returns (tree, None) when it only uses
+    allowed imports, names and attributes, else (None, reason).
+    """
     try:
-        safe_globals = {"driver": driver}
-        exec(code, safe_globals)
-        return True
-    except Exception as e:
-        print(f"❌ Execution error: {e}")
-        return False
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        return None, f"syntax error: {e}"
+
+    allowed_names = set(BASE_NAMESPACE) | set(SAFE_BUILTINS) | {"driver"} | _bound_names(tree)
+    # objects names are known to refer to, for resolving attribute chains
+    known = {name: value for name, value in BASE_NAMESPACE.items() if name != "__builtins__"}
+
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.name != "time":
+                    return None, f"import of '{alias.name}'"
+                known[alias.asname or alias.name] = time
+
+        elif isinstance(node, ast.ImportFrom):
+            if node.level or not (node.module or "").startswith("selenium."):
+                return None, f"import from '{node.module}'"
+            for alias in node.names:
+                if alias.name not in ALLOWED_IMPORTS or alias.name == "time":
+                    return None, f"import of '{alias.name}' from '{node.module}'"
+                known[alias.asname or alias.name] = ALLOWED_IMPORTS[alias.name]
+
+        elif isinstance(node, (ast.Global, ast.Nonlocal)):
+            return None, "global/nonlocal statement"
+
+        elif isinstance(node, ast.Name) and isinstance(node.ctx, ast.Load):
+            if node.id not in allowed_names:
+                return None, f"name '{node.id}'"
+
+        elif isinstance(node, ast.Attribute):
+            if node.attr.startswith("__"):
+                return None, f"dunder attribute '{node.attr}'"
+            if node.attr not in ALLOWED_ATTRIBUTES:
+                return None, f"attribute '{node.attr}'"
+            # time.sleep is fine; a module reached through an attribute (EC.re, x.subprocess) is not
+            if inspect.ismodule(_resolve(node, known)):
+                return None, f"module attribute '{node.attr}'"
+
+    return tree, None
+
+
+# ---------------------------------------------------------
+# COMPILED CODE CACHE (keyed by source hash)
+# ---------------------------------------------------------
+
+CODE_CACHE_SIZE = 512
+_code_cache = OrderedDict()   # sha256 -> (code_object | None, rejection_reason | None)
+_code_cache_lock = threading.Lock()
+code_cache_stats = {"hits": 0, "misses": 0}
+
+
+def compile_ai_code(code):
+    """Returns (code_object, None) or (None, reason), reusing earlier results."""
+    key = hashlib.sha256(code.encode("utf-8")).hexdigest()
+
+    with _code_cache_lock:
+        if key in _code_cache:
+            _code_cache.move_to_end(key)
+            code_cache_stats["hits"] += 1
+            return _code_cache[key]
+        code_cache_stats["misses"] += 1
+
+    source = textwrap.dedent(code).strip()
+    tree, reason = validate_code(source)
+    entry = (compile(tree, "<ai_step>", "exec"), None) if tree is not None else (None, reason)
+
+    with _code_cache_lock:
+        _code_cache[key] = entry
+        while len(_code_cache) > CODE_CACHE_SIZE:
+            _code_cache.popitem(last=False)
+    return entry
+
+
+def run_ai_code_safely(driver, code):
+    with span("code_exec", code_chars=len(code)) as attrs:
+        # ---- Validate + compile (cached per source) ----
+        compiled, reason = compile_ai_code(code)
+        if compiled is None:
+            print(f"🚫 Unsafe or invalid code rejected: {reason}")
+            attrs["result"] = "rejected"
+            return False
+
+        # ---- Execute with restricted globals ----
+        try:
+            safe_globals = dict(BASE_NAMESPACE)
+            safe_globals["driver"] = driver
+            exec(compiled, safe_globals)
+            attrs["result"] = "success"
+            return True
+        except Exception as e:
+            print(f"❌ Execution error: {e}")
+            attrs["result"] = "error"
+            return False
@@ -0,0 +1,8 @@
+# tests/conftest.py
+import os
+import sys
+
+# The app modules live at the repo root and read their config at import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("OPEN_ROUTER_KEY", "test-key")
+os.environ.setdefault("TRACE_EXPORT", "0")
@@ -0,0 +1,114 @@
+# tests/test_browser_pool.py
+import threading
+import time
+
+import pytest
+
+import browser_pool
+from browser_pool import BrowserPool
+
+
+class FakeDriver:
+    window_handles = ["main"]
+
+    def __init__(self):
+        self.switch_to = self
+
+    def window(self, handle):
+        pass
+
+    def execute_script(self, script):
+        return 1
+
+    def execute_cdp_cmd(self, cmd, params):
+        return {}
+
+    def get(self, url):
+        pass
+
+
+class FakeSession:
+    launch_delay = 0.0
+    launched = 0
+
+    def __init__(self, headless=True):
+        self.driver = FakeDriver()
+        self.closed = False
+
+    def start(self):
+        time.sleep(FakeSession.launch_delay)
+        FakeSession.launched += 1
+        return self
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_sessions(monkeypatch):
+    monkeypatch.setattr(browser_pool, "BrowserSession", FakeSession)
+    monkeypatch.setattr(FakeSession, "launch_delay", 0.0)
+    monkeypatch.setattr(FakeSession, "launched", 0)
+    yield
+    browser_pool.shutdown_browser_pool()
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+def test_release_refills_in_background():
+    pool = BrowserPool(min_size=1, max_size=2, max_uses=1).start()
+    session = pool.acquire()
+
+    FakeSession.launch_delay = 0.5
+    started = time.perf_counter()
+    pool.release(session)  # used up → recycled
+    assert time.perf_counter() - started < 0.25
+    assert session.closed
+    assert _wait_for(lambda: pool.stats()["idle"] == 1)
+
+
+def test_old_browsers_are_recycled():
+    pool = BrowserPool(min_size=0, max_size=1, max_uses=100, max_age_seconds=60).start()
+    session = pool.acquire()
+    session.pool_entry.created_at -= 120
+    pool.release(session)
+    assert session.closed
+    assert pool.stats() == {"idle": 0, "total": 0, "min_size": 0, "max_size": 1}
+
+
+def test_young_browsers_are_kept():
+    pool = BrowserPool(min_size=0, max_size=1, max_uses=100, max_age_seconds=60).start()
+    session = pool.acquire()
+    pool.release(session)
+    assert not session.closed
+    assert pool.stats()["idle"] == 1
+
+
+def test_get_browser_pool_launches_outside_the_lock():
+    FakeSession.launch_delay = 0.5
+    first = threading.Thread(target=browser_pool.get_browser_pool)
+    first.start()
+    assert _wait_for(lambda: browser_pool._pool is not None)
+
+    started = time.perf_counter()
+    pool = browser_pool.get_browser_pool()
+    assert time.perf_counter() - started < 0.25
+    first.join()
+    assert pool is browser_pool._pool
+
+
+def test_shutdown_during_warmup_does_not_leak():
+    FakeSession.launch_delay = 0.3
+    warming = threading.Thread(target=browser_pool.get_browser_pool)
+    warming.start()
+    assert _wait_for(lambda: browser_pool._pool is not None)
+    pool = browser_pool._pool
+
+    browser_pool.shutdown_browser_pool()
+    warming.join()
+    assert pool.stats()["idle"] == 0 and pool.stats()["total"] == 0
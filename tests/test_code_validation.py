@@ -0,0 +1,71 @@
+# tests/test_code_validation.py
+import pytest
+
+from test_executor_1 import validate_code, run_ai_code_safely
+
+
+@pytest.mark.parametrize("code", [
+    "from selenium.webdriver.common.by import By\ndriver.find_element(By.ID, 'user-name')",
+    "from selenium.webdriver.support import expected_conditions as EC\n"
+    "WebDriverWait(driver, 5).until(EC.presence_of_element_located((By.ID, 'x')))",
+    "import time\ntime.sleep(0.1)",
+    "Select(driver.find_element(By.TAG_NAME, 'select')).select_by_index(1)",
+    "driver.find_element(By.ID, 'q').send_keys('shoes', Keys.ENTER)",
+])
+def test_selenium_steps_pass(code):
+    tree, reason = validate_code(code)
+    assert tree is not None, reason
+
+
+@pytest.mark.parametrize("code", [
+    # regression: attribute chains on an imported selenium module reached subprocess / os
+    "from selenium.webdriver.common import service\nservice.subprocess.run(['touch', '/tmp/pwned'])",
+    "from selenium.webdriver.common import service\nservice.os.system('id')",
+    "import selenium\nselenium.webdriver.common.service.subprocess.run(['id'])",
+    "import os",
+    "import time as t\nt.sleep(0)\nimport subprocess",
+    "from time import sleep",
+    "from selenium.webdriver.common.by import *",
+    "from selenium.webdriver import Chrome",
+    "EC.re.compile('x')",
+    "m = EC\nm.re.compile('x')",
+    "driver.sys.exit()",
+    "x = driver.parent.builtins",
+    "driver.__class__",
+    "open('/etc/passwd')",
+    "driver.quit()",
+    "driver.service.process.kill()",
+    "driver.find_element(By.ID, 'x')._parent",
+    "def g():\n    yield 1\nfr = g().gi_frame.f_back",
+])
+def test_escapes_rejected(code):
+    tree, reason = validate_code(code)
+    assert tree is None
+    assert reason
+
+
+def test_service_subprocess_escape_never_runs(tmp_path):
+    target = tmp_path / "pwned"
+    code = ("from selenium.webdriver.common import service\n"
+            f"service.subprocess.run(['touch', {str(target)!r}])")
+    assert run_ai_code_safely(driver=None, code=code) is False
+    assert not target.exists()
+
+
+FRAME_ESCAPE = """
+def g():
+    yield 1
+gen = g()
+fr = gen.gi_frame.f_back.f_back
+fr.f_globals['__builtins__']['__import__']('os').system('touch {target}')
+"""
+
+
+def test_frame_introspection_escape_rejected(tmp_path):
+    # regression: generator frames reached the real builtins through f_back / f_globals
+    target = tmp_path / "pwned"
+    code = FRAME_ESCAPE.format(target=target)
+    tree, reason = validate_code(code)
+    assert tree is None and reason.startswith("attribute")
+    assert run_ai_code_safely(driver=None, code=code) is False
+    assert not target.exists()
@@ -0,0 +1,25 @@
+# tests/test_dom_pruner.py
+import json
+
+import pytest
+
+from dom_pruner import prune_tag_dict
+
+
+@pytest.mark.parametrize("field, value", [
+    ("aria_label", "Open menu"),
+    ("placeholder", "Search"),
+    ("title", "Close"),
+    ("alt", "Cart"),
+])
+def test_keeps_elements_named_only_by_a_strong_field(field, value):
+    tag_dict = {"buttons": [{"tag": "button", "xpath": "/html/body/button", field: value}]}
+    dom_text, stats = prune_tag_dict(tag_dict, "Click the button")
+    assert stats["elements_kept"] == 1
+    assert json.loads(dom_text)["elements"][0][field] == value
+
+
+def test_drops_elements_without_anything_to_target():
+    tag_dict = {"buttons": [{"tag": "button", "xpath": "/html/body/button"}]}
+    _, stats = prune_tag_dict(tag_dict, "Click the button")
+    assert stats["elements_kept"] == 0
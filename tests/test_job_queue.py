@@ -0,0 +1,51 @@
+# tests/test_job_queue.py
+import time
+
+import pytest
+
+import chat_routes
+from job_queue import JobManager
+
+
+def _wait(job, timeout=5):
+    deadline = time.time() + timeout
+    while not job.done and time.time() < deadline:
+        time.sleep(0.01)
+    return job
+
+
+@pytest.fixture
+def manager():
+    manager = JobManager(workers=1)
+    yield manager
+    manager.shutdown(wait=True)
+
+
+def test_job_finished(manager):
+    job = _wait(manager.submit(lambda text, progress_callback=None: text.upper(), "report"))
+    assert (job.status, job.result, job.error) == ("finished", "REPORT", None)
+    assert job.events[-1]["event"] == "job_finished"
+
+
+def test_chat_job_without_url_fails(manager, monkeypatch):
+    monkeypatch.setattr(chat_routes, "extract_test_parameters", lambda text: (None, None, None, text))
+    job = _wait(manager.submit(chat_routes.run_chat_or_raise, "1. Log in"))
+    assert job.status == "failed"
+    assert "valid URL" in job.error
+    assert job.events[-1]["event"] == "job_failed"
+
+
+def test_chat_job_agent_error_fails(manager, monkeypatch):
+    class BrokenController:
+        @staticmethod
+        def run_agentic_test(**kwargs):
+            raise RuntimeError("Chrome failed to start")
+
+    monkeypatch.setattr(chat_routes, "extract_test_parameters",
+                        lambda text: ("https://www.saucedemo.com/", "u", "p", text))
+    monkeypatch.setattr(chat_routes, "timed_import", lambda name: BrokenController)
+    job = _wait(manager.submit(chat_routes.run_chat_or_raise, "1. Log in"))
+    assert (job.status, job.error) == ("failed", "Chrome failed to start")
+
+    # the synchronous endpoint still answers with a ❌ report
+    assert chat_routes.run_chat("1. Log in") == "❌ Error: Chrome failed to start"
@@ -0,0 +1,65 @@
+# tests/test_junit_results.py
+import sys
+
+import pytest
+
+import test_executor
+from test_executor import parse_junit_xml, run_pytest_test_file, run_pytest_files_parallel
+
+STALE_REPORT = """<?xml version="1.0" encoding="utf-8"?>
+<testsuites><testsuite name="pytest" tests="2">
+<testcase classname="test_login" name="test_login" file="test_login.py" time="1.5"/>
+<testcase classname="test_login" name="test_logout" file="test_login.py" time="0.25">
+<failure message="AssertionError: logged in">trace</failure></testcase>
+</testsuite></testsuites>
+"""
+
+
+def test_parse_junit_xml(tmp_path):
+    report = tmp_path / "report.xml"
+    report.write_text(STALE_REPORT)
+    tests = parse_junit_xml(str(report))
+    assert [(t["name"], t["outcome"], t["seconds"]) for t in tests] == [
+        ("test_login", "passed", 1.5), ("test_logout", "failed", 0.25)]
+    assert tests[1]["message"] == "AssertionError: logged in"
+
+
+def test_parse_junit_xml_missing_or_truncated(tmp_path):
+    assert parse_junit_xml(str(tmp_path / "missing.xml")) == []
+    truncated = tmp_path / "truncated.xml"
+    truncated.write_text(STALE_REPORT[:120])
+    assert parse_junit_xml(str(truncated)) == []
+
+
+@pytest.fixture
+def broken_venv(monkeypatch):
+    monkeypatch.setattr(test_executor, "get_venv_python_executable", lambda venv: "/nonexistent/bin/python")
+
+
+def test_stale_report_not_reported_for_single_file(tmp_path, broken_venv):
+    junit_path = tmp_path / "test_login.xml"
+    junit_path.write_text(STALE_REPORT)
+
+    result = run_pytest_test_file("test_login.py", junit_path=str(junit_path))
+    assert result["tests"] == [] and result["total"] == 0
+    assert not junit_path.exists()
+
+
+def test_stale_report_not_reported_for_shard(tmp_path, broken_venv):
+    (tmp_path / "shard_0.xml").write_text(STALE_REPORT)
+
+    summary = run_pytest_files_parallel(["test_login.py"], workers=1, output_dir=str(tmp_path))
+    assert summary["total"] == 0
+    assert summary["shards"][0]["returncode"] is None
+
+
+def test_report_comes_from_this_run(tmp_path, monkeypatch):
+    monkeypatch.setattr(test_executor, "get_venv_python_executable", lambda venv: sys.executable)
+    test_file = tmp_path / "test_generated.py"
+    test_file.write_text("def test_ok():\n    assert True\n")
+    junit_path = tmp_path / "test_generated.xml"
+    junit_path.write_text(STALE_REPORT)
+
+    result = run_pytest_test_file(str(test_file), junit_path=str(junit_path))
+    assert result["returncode"] == 0
+    assert [(t["name"], t["outcome"]) for t in result["tests"]] == [("test_ok", "passed")]
@@ -0,0 +1,98 @@
+# tests/test_llm_cache.py
+import json
+
+import pytest
+
+import ai_test_generator_1
+from llm_cache import LLMResponseCache, make_cache_key
+
+TAG_DICT = {"inputs": [{"tag": "input", "id": "user-name"}], "buttons": [{"tag": "input", "id": "login-button"}]}
+STEPS = ["Enter username", "Click login"]
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = LLMResponseCache(path=str(tmp_path / "llm_cache.db"))
+    monkeypatch.setattr(ai_test_generator_1, "get_llm_cache", lambda: cache)
+    return cache
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    calls = []
+
+    def fake_complete(system_prompt, user_prompt, kind="step"):
+        calls.append(kind)
+        if kind == "plan":
+            return json.dumps({"steps": [{"goal": s, "code": f"# {s} {len(calls)}"} for s in STEPS]})
+        return json.dumps({"goal": "Enter username", "code": f"# attempt {len(calls)}"})
+
+    monkeypatch.setattr(ai_test_generator_1, "_complete", fake_complete)
+    return calls
+
+
+def _step(history=None):
+    return ai_test_generator_1.ask_ai_to_generate_test(
+        url="https://www.saucedemo.com/", tag_dict=TAG_DICT, username="u", password="p",
+        history=history, global_steps=STEPS, next_required_step=STEPS[0],
+        prune_dom=False, bypass_cache=False)
+
+
+def _plan(history=None):
+    return ai_test_generator_1.ask_ai_to_generate_plan(
+        url="https://www.saucedemo.com/", tag_dict=TAG_DICT, username="u", password="p",
+        history=history, global_steps=STEPS, prune_dom=False, bypass_cache=False)
+
+
+def test_failures_change_the_key():
+    base = make_cache_key("dom", "step", ["step"], "model")
+    assert base == make_cache_key("dom", "step", ["step"], "model", failures=[])
+    assert base != make_cache_key("dom", "step", ["step"], "model", failures=["Enter username"])
+
+
+def test_answer_not_cached_until_it_succeeds(cache, llm):
+    answer = _step()
+    assert cache.stats["stores"] == 0
+    assert cache.get(answer["cache_key"]) is None
+
+    ai_test_generator_1.record_step_outcome(answer, True)
+    hit = _step()
+    assert hit["code"] == answer["code"]
+    assert hit["cached"] and "cached" not in answer
+    assert llm == ["step"]
+
+
+def test_failed_cached_answer_is_evicted(cache, llm):
+    answer = _step()
+    ai_test_generator_1.record_step_outcome(answer, True)
+
+    hit = _step()
+    ai_test_generator_1.record_step_outcome(hit, False)
+    assert cache.get(hit["cache_key"]) is None
+    assert _step()["code"] != answer["code"]
+    assert llm == ["step", "step"]
+
+
+def test_retry_after_failure_asks_again(cache, llm):
+    first = _step()
+    ai_test_generator_1.record_step_outcome(first, False)
+    history = [{"step": 1, "goal": first["goal"], "url": "https://www.saucedemo.com/", "success": False}]
+
+    retry = _step(history)
+    assert retry["cache_key"] != first["cache_key"]
+    assert llm == ["step", "step"]
+
+
+def test_plan_cached_only_when_every_step_worked(cache, llm):
+    plan = _plan()
+    assert cache.stats["stores"] == 0
+
+    ai_test_generator_1.record_plan_outcome(plan, False)
+    assert _plan()[0]["code"] != plan[0]["code"]
+
+    plan = _plan()
+    ai_test_generator_1.record_plan_outcome(plan, True)
+    hit = _plan()
+    assert [s["code"] for s in hit] == [s["code"] for s in plan]
+    assert all(s["cached"] for s in hit) and not any("cached" in s for s in plan)
+    assert llm == ["plan", "plan", "plan"]
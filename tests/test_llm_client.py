@@ -0,0 +1,111 @@
+# tests/test_llm_client.py
+import collections
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import llm_client
+from llm_client import LLMDeadlineExceeded, complete_hedged, is_json_answer
+from llm_stub_server import FaultConfig, ResponseBook, StubStats, make_handler
+
+MESSAGES = [{"role": "user", "content": "Open https://www.saucedemo.com/ and log in"}]
+
+
+class ScriptedFaults:
+    """FaultConfig stand-in that answers requests with the given faults, in order."""
+
+    def __init__(self, *faults):
+        self.faults = list(faults)
+
+    def draw(self):
+        return self.faults.pop(0) if self.faults else None
+
+
+@pytest.fixture
+def stub():
+    """Starts llm_stub_server handlers on a free port: stub(latency=fn, faults=obj) -> server."""
+    servers = []
+
+    def start(latency=lambda: 0.0, faults=None):
+        stats = StubStats()
+        server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(ResponseBook(), latency, faults or FaultConfig(), stats))
+        server.daemon_threads = True
+        server.stats = stats
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """A fresh client loop pointed at the stub; client(base_url, **scheduler kwargs) -> scheduler."""
+    monkeypatch.setattr(llm_client, "_latencies", collections.defaultdict(llm_client.LatencyWindow))
+    monkeypatch.setattr(llm_client, "LLM_HEDGE_DEFAULT_DELAY", 0.2)
+
+    def start(server, **scheduler):
+        monkeypatch.setattr(llm_client, "LLM_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+        for name in ("_loop", "_async_client", "_scheduler"):
+            monkeypatch.setattr(llm_client, name, None)
+        llm_client._get_loop()
+        monkeypatch.setattr(llm_client, "_scheduler", llm_client.LLMScheduler(**scheduler))
+        return llm_client._scheduler
+
+    yield start
+    if llm_client._loop is not None:
+        llm_client._loop.call_soon_threadsafe(llm_client._loop.stop)
+
+
+def test_hedge_wins_and_slow_primary_is_cancelled(stub, client):
+    latencies = iter([3.0])  # the primary's request hangs, the hedge answers at once
+    client(stub(latency=lambda: next(latencies, 0.0)))
+
+    started = time.monotonic()
+    result = complete_hedged(MESSAGES, models=["primary", "backup"], validate=is_json_answer)
+
+    assert time.monotonic() - started < 2
+    assert result["model"] == "backup"
+    outcomes = {a["model"]: a["outcome"] for a in result["attempts"]}
+    assert outcomes == {"primary": "cancelled", "backup": "ok"}
+
+
+def test_deadline_exceeded_when_no_model_answers(stub, client):
+    client(stub(latency=lambda: 3.0))
+
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        complete_hedged(MESSAGES, models=["primary"], deadline=0.5)
+    assert time.monotonic() - started < 2
+
+
+def test_rate_limit_pauses_admission_for_everyone(stub, client):
+    server = stub(faults=ScriptedFaults(("error", 429)))  # the stub sends Retry-After: 1
+    client(server)
+
+    first = {}
+    thread = threading.Thread(target=lambda: first.update(complete_hedged(MESSAGES, models=["primary"])))
+    thread.start()
+    while "429" not in server.stats.to_dict()["responses"]:
+        time.sleep(0.01)
+    time.sleep(0.1)
+
+    second = complete_hedged(MESSAGES, models=["primary"])
+    thread.join()
+    assert first["attempts"][0]["retries"] == 1
+    assert second["queue_seconds"] >= 0.5  # waited out the pause instead of collecting its own 429
+    assert server.stats.to_dict()["responses"] == {"429": 1, "200": 2}
+
+
+def test_token_bucket_queueing_shows_in_queue_seconds(stub, client):
+    scheduler = client(stub(), requests_per_minute=120)
+    scheduler.requests.level = 0  # budget used up by earlier calls; refills at 2 requests/s
+
+    result = complete_hedged(MESSAGES, models=["primary"], deadline=0.3)
+    assert 0.4 <= result["queue_seconds"] < 2  # queueing doesn't count against the deadline
+    assert result["attempts"][0]["queue_seconds"] == result["queue_seconds"]
@@ -0,0 +1,66 @@
+# tests/test_locator_healer.py
+from locator_healer import fingerprint_code, heal_code
+
+OLD_DOM = {
+    "inputs": [
+        {"tag": "input", "id": "user-name", "name": "user-name", "placeholder": "Username",
+         "data_test": "username", "type": "text", "xpath": "/html/body/form/input[1]"},
+        {"tag": "input", "id": "password", "name": "password", "placeholder": "Password",
+         "data_test": "password", "type": "password", "xpath": "/html/body/form/input[2]"},
+    ],
+}
+
+
+def _renamed(old_id, new_id):
+    """OLD_DOM after a release renamed one element's id."""
+    inputs = [dict(info, id=new_id) if info["id"] == old_id else dict(info) for info in OLD_DOM["inputs"]]
+    return {"inputs": inputs}
+
+
+def test_heals_locator_after_id_change():
+    code = "driver.find_element(By.ID, 'user-name').send_keys('standard_user')"
+    fingerprints = fingerprint_code(code, OLD_DOM)
+
+    healed, changes = heal_code(code, fingerprints, _renamed("user-name", "login-user"))
+    assert healed == "driver.find_element(By.ID, 'login-user').send_keys('standard_user')"
+    assert changes[0]["healed"] and changes[0]["new_value"] == "login-user"
+
+
+def test_working_locator_is_left_alone():
+    code = "driver.find_element(By.ID, 'user-name').click()"
+    healed, changes = heal_code(code, fingerprint_code(code, OLD_DOM), OLD_DOM)
+    assert (healed, changes) == (None, [])
+
+
+def test_refuses_ambiguous_match():
+    code = "driver.find_element(By.ID, 'submit').click()"
+    old_dom = {"buttons": [{"tag": "button", "id": "submit", "type": "submit", "xpath": "/html/body/button"}]}
+    fingerprints = fingerprint_code(code, old_dom)
+    twins = {"buttons": [
+        {"tag": "button", "id": "save", "type": "submit", "xpath": "/html/body/button[1]"},
+        {"tag": "button", "id": "send", "type": "submit", "xpath": "/html/body/button[2]"},
+    ]}
+
+    healed, changes = heal_code(code, fingerprints, twins, min_score=0.0)
+    assert healed is None
+    assert changes == [{"by": "ID", "value": "submit", "healed": False, "score": changes[0]["score"]}]
+
+
+def test_splice_keeps_non_ascii_source_intact():
+    code = ("driver.find_element(By.ID, 'user-name').send_keys('Zoë — 日本')\n"
+            "secret = 'pässwörd'; driver.find_element(By.ID, 'password').send_keys(secret)")
+    fingerprints = fingerprint_code(code, OLD_DOM)
+    dom = _renamed("password", "pass")
+
+    healed, _ = heal_code(code, fingerprints, dom)
+    assert healed == ("driver.find_element(By.ID, 'user-name').send_keys('Zoë — 日本')\n"
+                      "secret = 'pässwörd'; driver.find_element(By.ID, 'pass').send_keys(secret)")
+
+
+def test_locator_that_cannot_be_judged_locally_is_unchanged():
+    code = "driver.find_element(By.CSS_SELECTOR, 'form > input:first-child').click()"
+    fingerprints = [{"by": "CSS_SELECTOR", "value": "form > input:first-child",
+                     "element": {"tag": "input", "id": "user-name", "placeholder": "Username"}}]
+
+    healed, changes = heal_code(code, fingerprints, _renamed("user-name", "login-user"))
+    assert (healed, changes) == (None, [])
@@ -0,0 +1,113 @@
+# tests/test_memory_migrations.py
+import os
+import sqlite3
+import subprocess
+import sys
+
+import pytest
+
+import memory_db_1
+
+# test_memory exactly as the pre-migration init_db() created it (user_version 0)
+BASELINE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS test_memory (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    base_url TEXT,
+    page_url TEXT,
+    goal TEXT,
+    code TEXT,
+    summary TEXT,
+    tags TEXT,
+    success INTEGER,
+    created_at TEXT
+)"""
+
+BASELINE_ROWS = [
+    ("www.saucedemo.com", "https://www.saucedemo.com/?utm_source=mail", "Log in", "login()", "Log in",
+     "user-name,password", 1, "2024-01-01T00:00:00"),
+    ("www.saucedemo.com", "https://www.saucedemo.com/inventory-item.html?id=4", "Add backpack to cart",
+     "add()", "Add backpack to cart", "", 1, "2024-01-01T00:01:00"),
+]
+
+
+@pytest.fixture
+def baseline_db(tmp_path, monkeypatch):
+    path = str(tmp_path / "ai_test_memory.db")
+    conn = sqlite3.connect(path)
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany("""
+        INSERT INTO test_memory (base_url, page_url, goal, code, summary, tags, success, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    """, BASELINE_ROWS)
+    conn.commit()
+    conn.close()
+
+    monkeypatch.setattr(memory_db_1, "DB_PATH", path)
+    monkeypatch.setattr(memory_db_1, "ASYNC_WRITES", False)
+    return path
+
+
+def test_baseline_db_migrates_to_latest(baseline_db):
+    conn = memory_db_1.get_connection()
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(memory_db_1.MIGRATIONS)
+
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(test_memory)")}
+    assert {"fingerprints", "page_key", "page_fingerprint"} <= columns
+    indexes = {row[1] for row in conn.execute("PRAGMA index_list(test_memory)")}
+    assert {"idx_test_memory_lookup", "idx_test_memory_page_key", "idx_test_memory_page_fingerprint"} <= indexes
+
+    # existing rows were keyed and indexed by the migrations
+    assert [row[0] for row in conn.execute("SELECT page_key FROM test_memory ORDER BY id")] == [
+        "https://www.saucedemo.com/", "https://www.saucedemo.com/inventory-item.html?id={n}"]
+    assert conn.execute("SELECT count(*) FROM test_memory_fts WHERE test_memory_fts MATCH 'backpack'").fetchone()[0] == 1
+
+
+def test_baseline_rows_are_served_after_migration(baseline_db):
+    hit = memory_db_1.get_cached_success("www.saucedemo.com", "https://www.saucedemo.com/inventory-item.html?id=5",
+                                         "Add backpack to cart", page_fingerprint="fp-item")
+    assert (hit["code"], hit["matched_by"]) == ("add()", "page_key")
+
+    memory_db_1.save_step_memory("www.saucedemo.com", "https://www.saucedemo.com/cart.html", "Open cart",
+                                 "cart()", "Open cart", [], True, page_fingerprint="fp-cart")
+    assert memory_db_1.get_cached_success("www.saucedemo.com", "https://www.saucedemo.com/cart.html",
+                                          "Open cart", "fp-cart")["code"] == "cart()"
+
+
+def test_migrations_run_once(baseline_db):
+    memory_db_1.get_connection()
+    conn = sqlite3.connect(baseline_db)
+    memory_db_1._migrate(conn)  # already at the latest version → no-op
+    assert conn.execute("SELECT count(*) FROM test_memory").fetchone()[0] == len(BASELINE_ROWS)
+    conn.close()
+
+
+def test_concurrent_processes_migrate_once(tmp_path):
+    path = str(tmp_path / "fresh.db")
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = (f"import memory_db_1; memory_db_1.DB_PATH = {path!r}; memory_db_1.init_db()")
+    processes = [subprocess.Popen([sys.executable, "-c", script], cwd=root, env={**os.environ, "TRACE_EXPORT": "0"},
+                                  stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+                 for _ in range(4)]
+    errors = [p.communicate(timeout=60)[1] for p in processes]
+    assert [p.returncode for p in processes] == [0, 0, 0, 0], errors
+
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(memory_db_1.MIGRATIONS)
+    conn.close()
+
+
+def test_failed_migration_rolls_back_with_its_version(baseline_db, monkeypatch):
+    broken = memory_db_1.MIGRATIONS[:2] + [
+        "ALTER TABLE test_memory ADD COLUMN fingerprints TEXT;\nSELECT no_such_function();"]
+    monkeypatch.setattr(memory_db_1, "MIGRATIONS", broken)
+    conn = sqlite3.connect(baseline_db)
+    with pytest.raises(sqlite3.OperationalError):
+        memory_db_1._migrate(conn)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert "fingerprints" not in {row[1] for row in conn.execute("PRAGMA table_info(test_memory)")}
+    conn.close()
+
+    # the next start picks up where it stopped
+    monkeypatch.undo()
+    monkeypatch.setattr(memory_db_1, "DB_PATH", baseline_db)
+    assert memory_db_1.get_connection().execute("PRAGMA user_version").fetchone()[0] == len(memory_db_1.MIGRATIONS)
@@ -0,0 +1,68 @@
+# tests/test_page_identity.py
+import re
+
+import pytest
+
+from page_identity import canonicalize_url, page_fingerprint, page_path, page_skeleton, hit_rate_report
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://www.saucedemo.com/inventory-item.html?id=4", "https://www.saucedemo.com/inventory-item.html?id={n}"),
+    ("HTTPS://WWW.SauceDemo.com:443/inventory.html/", "https://www.saucedemo.com/inventory.html"),
+    ("https://shop.test/cart?utm_source=mail&sessionid=abc&b=2&a=1#reviews", "https://shop.test/cart?a={n}&b={n}"),
+    ("https://shop.test/orders/123/items/550e8400-e29b-41d4-a716-446655440000",
+     "https://shop.test/orders/{n}/items/{uuid}"),
+    ("https://shop.test/app;jsessionid=ABC123/home", "https://shop.test/app/home"),
+    ("https://shop.test/#/orders/42", "https://shop.test/#/orders/{n}"),
+    ("http://localhost:8000/login", "http://localhost:8000/login"),
+    ("", ""),
+    ("about:blank", "about:blank"),
+])
+def test_canonicalize_url(url, expected):
+    assert canonicalize_url(url, rules={}) == expected
+
+
+def test_canonicalize_url_site_rules():
+    rules = {"shop.test": {"path_templates": [(re.compile(r"^/p/[^/]+$"), "/p/{slug}")],
+                           "drop_params": {"variant"}, "keep_params": {"page"}}}
+    assert canonicalize_url("https://shop.test/p/red-shoes?variant=9&page=2", rules) == "https://shop.test/p/{slug}?page=2"
+
+
+def test_page_path():
+    assert page_path("https://shop.test/cart?a={n}#/x") == "https://shop.test/cart"
+    assert page_path(None) is None
+
+
+def _inventory(items):
+    return {
+        "inputs": [{"tag": "input", "type": "text", "name": "search"}],
+        "buttons": [{"tag": "button", "id": f"add-to-cart-{i}"} for i in range(items)],
+        "links": [{"tag": "a", "role": "link"}],
+        "products": [{"name": f"item {i}"} for i in range(items)],
+    }
+
+
+def test_page_skeleton_ignores_list_length_and_item_ids():
+    assert page_skeleton(_inventory(3)) == page_skeleton(_inventory(30))
+    assert page_fingerprint(_inventory(3)) == page_fingerprint(_inventory(30))
+    assert page_skeleton(_inventory(2)) == [
+        "buttons:button", "inputs:input[type=text][name=search]", "links:a[role=link]", "products",
+    ]
+
+
+def test_page_skeleton_tells_forms_apart():
+    login = {"inputs": [{"tag": "input", "type": "text", "id": "user-name"},
+                        {"tag": "input", "type": "password", "id": "password"}]}
+    checkout = {"inputs": [{"tag": "input", "type": "text", "id": "first-name"},
+                           {"tag": "input", "type": "text", "id": "postal-code"}]}
+    assert page_fingerprint(login) != page_fingerprint(checkout)
+    assert page_fingerprint({}) is None
+
+
+def test_hit_rate_report_fingerprint_needs_same_path():
+    visits = [("shop.test", "https://shop.test/a?step=1", "go", "fp"),
+              ("shop.test", "https://shop.test/a?step=2", "go", "fp"),
+              ("shop.test", "https://shop.test/b", "go", "fp")]
+    report = hit_rate_report(visits, rules={})
+    assert report["raw_url_hit_rate"] == 0.0
+    assert report["page_key_hit_rate"] == round(1 / 3, 4)
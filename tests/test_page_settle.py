@@ -0,0 +1,44 @@
+# tests/test_page_settle.py
+from selenium.common.exceptions import WebDriverException
+
+from page_settle import wait_for_page_settle
+
+
+class FakeTimeouts:
+    def __init__(self, driver):
+        self.driver = driver
+
+    @property
+    def script(self):
+        return self.driver.script_timeout
+
+
+class FakeDriver:
+    def __init__(self, navigations=0):
+        self.script_timeout = 30.0
+        self.navigations = navigations
+        self.timeouts = FakeTimeouts(self)
+
+    def execute_script(self, script, *args):
+        return None
+
+    def set_script_timeout(self, seconds):
+        self.script_timeout = seconds
+
+    def execute_async_script(self, script, *args):
+        if self.navigations:
+            self.navigations -= 1
+            raise WebDriverException("document unloaded")
+        return True
+
+
+def test_script_timeout_restored():
+    driver = FakeDriver()
+    wait_for_page_settle(driver, quiet_ms=0, timeout=1)
+    assert driver.script_timeout == 30.0
+
+
+def test_script_timeout_restored_after_navigation_retries():
+    driver = FakeDriver(navigations=2)
+    wait_for_page_settle(driver, quiet_ms=0, timeout=1)
+    assert driver.script_timeout == 30.0
@@ -0,0 +1,67 @@
+# tests/test_run_recorder.py
+import json
+import runpy
+
+import pytest
+
+from test_executor_1 import BASE_NAMESPACE
+from run_recorder import RunRecorder, load_recording, resolve_credentials, export_pytest
+
+STEPS = ["Log in as standard_user", "Open the cart"]
+LOGIN_CODE = ("driver.find_element(By.ID, 'user-name').send_keys('standard_user')\n"
+              "driver.find_element(By.ID, 'password').send_keys('secret_sauce')")
+
+
+def _recorder():
+    recorder = RunRecorder("https://www.saucedemo.com/", "standard_user", "secret_sauce", STEPS)
+    recorder.record_step(0, STEPS[0], LOGIN_CODE, "https://www.saucedemo.com/",
+                         "https://www.saucedemo.com/inventory.html", 0.2)
+    recorder.record_step(1, STEPS[1], "driver.find_element(By.ID, 'shopping_cart_container').click()",
+                         "https://www.saucedemo.com/inventory.html", "https://www.saucedemo.com/cart.html", 0.1)
+    return recorder
+
+
+def test_manifest_contains_no_credentials(tmp_path):
+    path = _recorder().save(str(tmp_path / "run.json"))
+    text = open(path, encoding="utf-8").read()
+    assert "standard_user" not in text
+    assert "secret_sauce" not in text
+
+    manifest = load_recording(path)
+    assert (manifest["username"], manifest["password"]) == ("${RECORDING_USERNAME}", "${RECORDING_PASSWORD}")
+
+
+def test_credentials_resolve_from_env_or_args(monkeypatch):
+    manifest = json.loads(json.dumps(_recorder().to_manifest()))
+    monkeypatch.setenv("RECORDING_USERNAME", "standard_user")
+    monkeypatch.setenv("RECORDING_PASSWORD", "env_secret")
+
+    resolved = resolve_credentials(manifest, password="secret_sauce")
+    assert resolved["steps"][0]["code"] == LOGIN_CODE
+    assert resolved["global_steps"] == STEPS
+    assert resolve_credentials(manifest)["password"] == "env_secret"
+
+
+def test_missing_credentials_raise(monkeypatch):
+    monkeypatch.delenv("RECORDING_USERNAME", raising=False)
+    monkeypatch.delenv("RECORDING_PASSWORD", raising=False)
+    with pytest.raises(ValueError, match="RECORDING_PASSWORD"):
+        resolve_credentials(_recorder().to_manifest(), username="standard_user")
+
+
+def test_export_resolves_credentials(tmp_path):
+    path = export_pytest(_recorder().to_manifest(), str(tmp_path / "test_replay.py"),
+                         username="standard_user", password="secret_sauce")
+    source = open(path, encoding="utf-8").read()
+    assert "send_keys('secret_sauce')" in source
+    assert "${" not in source
+
+
+def test_export_provides_every_name_steps_can_use(tmp_path):
+    """Recorded code ran against BASE_NAMESPACE, so the exported module must define the same names."""
+    path = export_pytest(_recorder().to_manifest(), str(tmp_path / "test_replay.py"),
+                         username="standard_user", password="secret_sauce")
+    namespace = runpy.run_path(path)
+    for name, value in BASE_NAMESPACE.items():
+        if name != "__builtins__":
+            assert namespace[name] is value
@@ -0,0 +1,57 @@
+# tests/test_screenshot_store.py
+import threading
+
+import screenshot_store
+from screenshot_store import ScreenshotRecorder
+
+
+class FakeDriver:
+    def __init__(self):
+        self.frames = 0
+
+    def get_screenshot_as_png(self):
+        self.frames += 1
+        return f"frame {self.frames}".encode()
+
+
+def test_failure_frames_never_dropped(tmp_path, monkeypatch):
+    monkeypatch.setattr(screenshot_store, "_success_slots", threading.BoundedSemaphore(1))
+    screenshot_store._success_slots.acquire()  # success capacity used up
+    recorder = ScreenshotRecorder(str(tmp_path), policy="always")
+    driver = FakeDriver()
+
+    assert recorder.capture(driver, "step_1.png", success=True) is None
+    failure_path = recorder.capture(driver, "step_2.png", success=False)
+    assert recorder.flush(timeout=5)
+
+    assert recorder.stats["dropped"] == 1
+    assert open(failure_path, "rb").read() == b"frame 2"
+
+
+def test_flush_waits_only_for_own_frames(tmp_path, monkeypatch):
+    release = threading.Event()
+    encode = screenshot_store._encode
+
+    def slow_encode(png_bytes, *options):
+        if png_bytes.startswith(b"slow"):
+            release.wait(5)
+        return encode(png_bytes, *options)
+
+    class SlowDriver(FakeDriver):
+        def get_screenshot_as_png(self):
+            return b"slow " + super().get_screenshot_as_png()
+
+    monkeypatch.setattr(screenshot_store, "_encode", slow_encode)
+    mine = ScreenshotRecorder(str(tmp_path / "mine"), policy="on_failure")
+    other = ScreenshotRecorder(str(tmp_path / "other"), policy="always")
+
+    path = mine.capture(FakeDriver(), "step_1.png", success=False)
+    assert mine.flush(timeout=5)
+    other.capture(SlowDriver(), "step_1.png")
+    try:
+        assert not other.flush(timeout=0.05)
+        assert mine.flush(timeout=0.05)
+        assert open(path, "rb").read() == b"frame 1"
+    finally:
+        release.set()
+    assert other.flush(timeout=5)
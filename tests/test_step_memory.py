@@ -0,0 +1,110 @@
+# tests/test_step_memory.py
+import pytest
+
+import memory_db_1
+from memory_db_1 import goal_similarity, get_cached_success, save_step_memory
+
+BASE = "www.saucedemo.com"
+INVENTORY = "https://www.saucedemo.com/inventory.html"
+
+
+@pytest.fixture
+def memory_db(tmp_path, monkeypatch):
+    monkeypatch.setattr(memory_db_1, "DB_PATH", str(tmp_path / "memory.db"))
+    monkeypatch.setattr(memory_db_1, "ASYNC_WRITES", False)
+    return memory_db_1.get_connection()
+
+
+def _save(goal, page_url=INVENTORY, code="pass", page_fingerprint="fp-inventory"):
+    save_step_memory(BASE, page_url, goal, code, goal, [], True, page_fingerprint=page_fingerprint)
+
+
+# ---------------------------------------------------------
+# goal_similarity
+# ---------------------------------------------------------
+
+def test_similarity_ignores_stopwords_and_case():
+    assert goal_similarity("Click the Login button", "click login") == 1.0
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Sort by price low to high", "Sort by price high to low"),
+    ("Sort products by name A to Z", "Sort products by name Z to A"),
+    ("Scroll to the top of the page", "Scroll to the bottom of the page"),
+    ("Sort by price low to high", "Sort by price"),
+])
+def test_similarity_respects_direction_order(a, b):
+    assert goal_similarity(a, b) == 0.0
+
+
+def test_similarity_same_direction_still_matches():
+    assert goal_similarity("Sort by price low to high", "Sort the products by price low to high") >= 0.75
+
+
+@pytest.mark.parametrize("a, b", [
+    ("Do not add backpack to cart", "Add backpack to cart"),
+    ("Don't add the backpack to the cart", "Add backpack to cart"),
+    ("Continue without saving", "Continue saving"),
+    ("Uncheck remember me", "Check remember me"),
+    ("Deselect all items", "Select all items"),
+])
+def test_similarity_respects_negation(a, b):
+    assert goal_similarity(a, b) == 0.0
+
+
+def test_similarity_same_negation_still_matches():
+    assert goal_similarity("Do not add backpack to cart", "Don't add the backpack to cart") >= 0.75
+    assert goal_similarity("Delete the backpack", "delete backpack") == 1.0
+
+
+# ---------------------------------------------------------
+# fuzzy reuse
+# ---------------------------------------------------------
+
+def test_fuzzy_match_reuses_same_page(memory_db):
+    _save("Sort products by price low to high", code="low_to_high()")
+    hit = get_cached_success(BASE, INVENTORY, "Sort the products by price low to high", "fp-inventory")
+    assert hit["code"] == "low_to_high()"
+    assert hit["matched_by"] == "fuzzy_goal"
+
+
+def test_fuzzy_match_never_flips_direction(memory_db):
+    _save("Sort products by price low to high", code="low_to_high()")
+    assert get_cached_success(BASE, INVENTORY, "Sort products by price high to low", "fp-inventory") is None
+
+
+def test_fuzzy_match_never_drops_negation(memory_db):
+    _save("Add backpack to cart", code="add_backpack()")
+    assert get_cached_success(BASE, INVENTORY, "Do not add backpack to cart", "fp-inventory") is None
+
+
+def test_fuzzy_match_requires_same_page(memory_db):
+    _save("Click the checkout button", page_url="https://www.saucedemo.com/cart.html",
+          code="cart_checkout()", page_fingerprint="fp-cart")
+    assert get_cached_success(BASE, INVENTORY, "Click checkout", "fp-inventory") is None
+    assert get_cached_success(BASE, INVENTORY, "Click checkout", "fp-cart") is None
+    # same structure on the same path with another query still counts as the same page
+    hit = get_cached_success(BASE, "https://www.saucedemo.com/cart.html?step=2", "Click checkout", "fp-cart")
+    assert hit["code"] == "cart_checkout()"
+
+
+# ---------------------------------------------------------
+# exact lookups by page key / fingerprint
+# ---------------------------------------------------------
+
+def test_lookup_by_page_key_ignores_volatile_params(memory_db):
+    _save("Add backpack to cart", page_url=INVENTORY + "?utm_source=mail&sessionid=abc", code="add()")
+    hit = get_cached_success(BASE, INVENTORY + "#top", "Add backpack to cart", "fp-inventory")
+    assert (hit["code"], hit["matched_by"]) == ("add()", "page_key")
+
+
+def test_fingerprint_fallback_stays_on_same_path(memory_db):
+    _save("Click continue", page_url="https://www.saucedemo.com/checkout.html?step=one",
+          code="continue()", page_fingerprint="fp-form")
+
+    hit = get_cached_success(BASE, "https://www.saucedemo.com/checkout.html?step=two", "Click continue", "fp-form")
+    assert (hit["code"], hit["matched_by"]) == ("continue()", "page_fingerprint")
+    # same structure on an unrelated path is not the same page
+    assert get_cached_success(BASE, "https://www.saucedemo.com/signup.html", "Click continue", "fp-form") is None
+    assert get_cached_success(BASE, "https://www.saucedemo.com/checkout.html.bak", "Click continue",
+                              "fp-form") is None
@@ -0,0 +1,51 @@
+# tests/test_suite_runner.py
+import os
+import sqlite3
+import threading
+
+import pytest
+
+import memory_db_1
+from suite_runner import run_suite, _result_line
+from test_memory_migrations import BASELINE_SCHEMA
+
+
+@pytest.fixture(autouse=True)
+def suite_cwd(tmp_path, monkeypatch):
+    """Runs in tmp_path so parent and spawned workers share the default, relative DB_PATH there."""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(memory_db_1, "DB_PATH", "ai_test_memory.db")
+    monkeypatch.setattr(memory_db_1, "_local", threading.local())
+    monkeypatch.setattr(memory_db_1, "_schema_ready", set())
+
+
+def test_result_line_without_duration():
+    line = _result_line({"name": "checkout", "passed": False, "error": "worker crashed: OOM",
+                         "duration_seconds": None})
+    assert line == "❌ checkout (no timing) — worker crashed: OOM"
+    assert "None" not in line
+
+
+def test_results_keep_submission_order_with_duplicate_names(tmp_path):
+    # no URL → every scenario fails fast inside its worker
+    scenarios = [{"name": "login", "steps": ["a"]}, {"name": "cart", "steps": ["b"]},
+                 {"name": "login", "steps": ["c"]}]
+    summary = run_suite(scenarios, workers=2, output_dir=str(tmp_path))
+
+    folders = [os.path.basename(r["artifacts_dir"]) for r in summary["results"]]
+    assert folders == ["001_login", "002_cart", "003_login"]
+    assert summary["failed"] == 3
+
+
+def test_suite_migrates_step_memory_before_starting_workers(tmp_path):
+    conn = sqlite3.connect("ai_test_memory.db")
+    conn.execute(BASELINE_SCHEMA)  # unmigrated, user_version 0
+    conn.commit()
+    conn.close()
+
+    summary = run_suite([{"name": "login", "steps": ["a"]}], workers=1, output_dir=str(tmp_path / "out"))
+    assert summary["results"][0]["error"] == "ValueError: scenario needs a URL and at least one step"
+
+    conn = sqlite3.connect("ai_test_memory.db")
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == len(memory_db_1.MIGRATIONS)
+    conn.close()
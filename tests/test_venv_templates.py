@@ -0,0 +1,55 @@
+# tests/test_venv_templates.py
+import os
+import sys
+
+import pytest
+
+import venv_manager_1
+
+
+@pytest.fixture
+def fake_venv_build(tmp_path, monkeypatch):
+    """`python -m venv` stand-in: writes activate + a console script with the target path baked in."""
+    def fake_run(cmd, check=False, **kwargs):
+        target = cmd[-1]
+        bin_dir = os.path.join(target, "bin")
+        os.makedirs(bin_dir)
+        os.symlink(sys.executable, os.path.join(bin_dir, "python"))
+        with open(os.path.join(bin_dir, "activate"), "w") as f:
+            f.write(f'VIRTUAL_ENV="{target}"\nexport VIRTUAL_ENV\n')
+        with open(os.path.join(bin_dir, "pytest"), "w") as f:
+            f.write(f"#!{target}/bin/python\nimport pytest\n")
+        os.chmod(os.path.join(bin_dir, "pytest"), 0o755)
+
+    monkeypatch.setattr(venv_manager_1, "TEMPLATES_DIR", str(tmp_path / "templates"))
+    monkeypatch.setattr(venv_manager_1.subprocess, "run", fake_run)
+    monkeypatch.setattr(venv_manager_1, "_fill_wheel_cache", lambda python, requirements: None)
+
+
+def _read(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def test_template_scripts_point_at_published_path(fake_venv_build):
+    template = venv_manager_1.ensure_template(["pytest"])
+    assert ".building-" not in template
+
+    for name in ("activate", "pytest"):
+        text = _read(os.path.join(template, "bin", name))
+        assert ".building-" not in text
+        assert template in text
+    assert os.access(os.path.join(template, "bin", "pytest"), os.X_OK)
+
+
+def test_clone_scripts_point_at_clone(fake_venv_build, tmp_path):
+    template = venv_manager_1.ensure_template(["pytest"])
+    clone = str(tmp_path / "run-venv")
+    venv_manager_1.clone_template(template, clone)
+
+    activate = _read(os.path.join(clone, "bin", "activate"))
+    assert f'VIRTUAL_ENV="{clone}"' in activate
+    assert _read(os.path.join(clone, "bin", "pytest")).startswith(f"#!{clone}/bin/python")
+    assert os.access(os.path.join(clone, "bin", "pytest"), os.X_OK)
+    # the template itself was not edited through the hardlinks
+    assert f'VIRTUAL_ENV="{template}"' in _read(os.path.join(template, "bin", "activate"))
@@ -0,0 +1,253 @@
+# tracing.py
+import bisect
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# --- Configuration ---
+TRACE_DIR = os.getenv("TRACE_DIR", "traces")
+TRACE_EXPORT = os.getenv("TRACE_EXPORT", "1") == "1"
+
+# Seconds; covers sub-ms DB reads up to multi-second LLM calls and page loads
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+# ---------------------------------------------------------
+# METRICS (Prometheus text exposition, no client library needed)
+# ---------------------------------------------------------
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{n}="{str(v).replace(chr(34), chr(39))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.labels), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_text(self.labels, key)} {value}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name, self.help, self.labels = name, help_text, tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}   # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labels)
+        with self._lock:
+            state = self._values.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            index = bisect.bisect_left(self.buckets, value)
+            if index < len(self.buckets):  # larger values only land in +Inf
+                state[index] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, state in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, state):
+                    cumulative += count
+                    labels = _label_text(self.labels + ("le",), key + (bound,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_bucket{_label_text(self.labels + ('le',), key + ('+Inf',))} {state[-1]}")
+                lines.append(f"{self.name}_sum{_label_text(self.labels, key)} {state[-2]:.6f}")
+                lines.append(f"{self.name}_count{_label_text(self.labels, key)} {state[-1]}")
+        return lines
+
+
+SPAN_SECONDS = Histogram("agent_span_seconds", "Duration of traced agent phases", labels=("span",))
+RUNS = Counter("agent_runs_total", "Agent runs by outcome", labels=("outcome",))
+LLM_CALLS = Counter("agent_llm_calls_total", "LLM round trips", labels=("kind",))
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM token usage", labels=("kind",))
+LLM_CALLS_PER_RUN = Histogram("agent_llm_calls_per_run", "LLM calls per agent run",
+                              buckets=(0, 1, 2, 3, 5, 8, 13, 21))
+STEP_ATTEMPTS = Counter("agent_step_attempts_total", "Step attempts by source and result",
+                        labels=("source", "result"))
+STEP_RETRIES = Counter("agent_step_retries_total", "Attempts that stayed on the same required step")
+CACHE_LOOKUPS = Counter("agent_cache_lookups_total", "Cache lookups", labels=("cache", "result"))
+HEAL_ATTEMPTS = Counter("agent_heal_attempts_total", "Locator self-healing attempts on failed cached steps",
+                        labels=("result",))
+LLM_MODEL_SECONDS = Histogram("agent_llm_model_seconds", "LLM attempt latency per model and outcome",
+                              labels=("model", "outcome"))
+LLM_HEDGES = Counter("agent_llm_hedges_total", "Hedged LLM requests launched / won", labels=("result",))
+LLM_QUEUE_SECONDS = Histogram("agent_llm_queue_seconds", "Time LLM requests waited for rate-limit budget / a free slot")
+LLM_RETRIES = Counter("agent_llm_retries_total", "LLM request retries after 429 / 5xx / connection errors",
+                      labels=("model", "reason"))
+PROMPT_TOKENS = Histogram("agent_prompt_tokens", "Estimated prompt size in tokens",
+                          buckets=(250, 500, 1000, 2000, 4000, 8000, 16000, 32000))
+
+REGISTRY = [SPAN_SECONDS, RUNS, LLM_CALLS, LLM_TOKENS, LLM_CALLS_PER_RUN,
+            STEP_ATTEMPTS, STEP_RETRIES, CACHE_LOOKUPS, HEAL_ATTEMPTS, LLM_MODEL_SECONDS, LLM_HEDGES,
+            LLM_QUEUE_SECONDS, LLM_RETRIES, PROMPT_TOKENS]
+
+
+def record_cache_lookup(cache, hit):
+    CACHE_LOOKUPS.inc(cache=cache, result="hit" if hit else "miss")
+
+
+def render_metrics():
+    """All metrics in Prometheus text format, plus derived cache hit-rate gauges."""
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+
+    lines += ["# HELP agent_cache_hit_ratio Cache hits / lookups since start",
+              "# TYPE agent_cache_hit_ratio gauge"]
+    caches = sorted({key[0] for key in CACHE_LOOKUPS._values})
+    for cache in caches:
+        hits = CACHE_LOOKUPS.value(cache=cache, result="hit")
+        total = hits + CACHE_LOOKUPS.value(cache=cache, result="miss")
+        lines.append(f'agent_cache_hit_ratio{{cache="{cache}"}} {hits / total if total else 0:.4f}')
+
+    healed = HEAL_ATTEMPTS.value(result="healed")
+    attempts = sum(HEAL_ATTEMPTS._values.values())
+    lines += ["# HELP agent_heal_success_ratio Healed and passing retries / healing attempts since start",
+              "# TYPE agent_heal_success_ratio gauge",
+              f"agent_heal_success_ratio {healed / attempts if attempts else 0:.4f}"]
+    return "\n".join(lines) + "\n"
+
+
+# ---------------------------------------------------------
+# SPANS / PER-RUN TRACES
+# ---------------------------------------------------------
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class RunTrace:
+    """Spans of one agent run; exported as JSON when the run ends."""
+
+    def __init__(self, name, **attrs):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self._t0 = time.perf_counter()
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def totals(self):
+        """Seconds per span name (nested spans are counted in their parents too)."""
+        totals = {}
+        for span in self.spans:
+            totals[span["name"]] = round(totals.get(span["name"], 0.0) + span["seconds"], 6)
+        return totals
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started_at": self.started,
+            "seconds": round(time.perf_counter() - self._t0, 6),
+            "totals": self.totals(),
+            "spans": sorted(self.spans, key=lambda s: s["start"]),
+        }
+
+    def save(self, directory=TRACE_DIR):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}_{self.trace_id}.json")
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
+        return path
+
+
+@contextmanager
+def start_trace(name, export=TRACE_EXPORT, **attrs):
+    """Makes a new RunTrace current for the block; spans inside attach to it."""
+    trace = RunTrace(name, **attrs)
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+        if export:
+            try:
+                trace.path = trace.save()
+                print(f"🧵 Trace saved → {trace.path}")
+            except OSError as e:
+                print(f"⚠️ Could not save trace: {e}")
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Times a phase. Always feeds the span histogram; also records the span on
+    the current run trace, if any. Yields the attribute dict so callers can
+    add results (token counts, hit/miss...) while inside the block.
+    """
+    trace = _current_trace.get()
+    parent = _current_span.get()
+    span_id = uuid.uuid4().hex[:8]
+    token = _current_span.set(span_id)
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attrs
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        seconds = time.perf_counter() - started
+        _current_span.reset(token)
+        SPAN_SECONDS.observe(seconds, span=name)
+        if trace is not None:
+            record = {
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start": round(started - trace._t0, 6),
+                "seconds": round(seconds, 6),
+                "thread": threading.current_thread().name,
+                "attrs": attrs,
+            }
+            if error:
+                record["error"] = error
+            trace.add(record)
+
+
+def traced(name):
+    """Decorator form of span()."""
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,5 +1,9 @@
 import os
 import sys
+import json
+import time
+import hashlib
+import platform
 import subprocess
 import shutil
 
@@ -7,6 +11,15 @@ import shutil
 TEST_VENV_DIR = ".venv-tests"
 TEST_VENV_PATH = os.path.join(os.getcwd(), TEST_VENV_DIR)
 
+# Templates + wheel cache live here and survive between runs
+VENV_CACHE_DIR = os.getenv("TEST_VENV_CACHE_DIR", os.path.join(os.getcwd(), ".venv-cache"))
+TEMPLATES_DIR = os.path.join(VENV_CACHE_DIR, "templates")
+WHEELS_DIR = os.path.join(VENV_CACHE_DIR, "wheels")
+MAX_TEMPLATES = int(os.getenv("TEST_VENV_MAX_TEMPLATES", "3"))
+
+DEFAULT_REQUIREMENTS = ["pytest", "selenium", "webdriver-manager"]
+TEMPLATE_MARKER = ".template.json"
+
 
 # --- OS-Agnostic Venv Helpers ---
 
@@ -31,39 +44,164 @@ def get_venv_python_executable(venv_root):
     return python_path
 
 
-def ensure_test_venv_exists(venv_path=TEST_VENV_PATH):
+# --- Content-addressed templates ---
+
+def requirements_key(requirements=DEFAULT_REQUIREMENTS):
+    """Hash of the requirement set + interpreter, used as the template name."""
+    normalized = sorted({r.strip().lower().replace("_", "-") for r in requirements if r.strip()})
+    fingerprint = {
+        "requirements": normalized,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": sys.platform,
+        "machine": platform.machine(),
+    }
+    return hashlib.sha256(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _touch_template(template_path):
+    marker = os.path.join(template_path, TEMPLATE_MARKER)
+    with open(marker, "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    meta["last_used"] = time.time()
+    with open(marker, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+
+
+def _fill_wheel_cache(python_executable, requirements):
     """
-    Creates the dedicated virtual environment if it doesn't exist and installs
-    necessary dependencies (pytest, selenium, webdriver-manager).
+    Installs from the local wheel cache only. Hits the network (pip wheel)
+    just once, when the cache does not cover the requirement set yet.
     """
-    if os.path.isdir(venv_path):
-        print(f"\n✅ Dedicated test venv found: {venv_path}")
+    os.makedirs(WHEELS_DIR, exist_ok=True)
+    offline = [python_executable, "-m", "pip", "install", "--no-index",
+               "--find-links", WHEELS_DIR, *requirements]
+    if subprocess.run(offline, capture_output=True, text=True).returncode == 0:
+        print("📦 Installed from local wheel cache (no network).")
         return
 
-    print(f"\n⏳ Creating dedicated test venv: {venv_path}")
+    print("⏳ Wheel cache miss → downloading wheels once...")
+    subprocess.run(
+        [python_executable, "-m", "pip", "wheel", "--wheel-dir", WHEELS_DIR, *requirements],
+        check=True, capture_output=True, text=True
+    )
+    subprocess.run(offline, check=True, capture_output=True, text=True)
+
+
+def ensure_template(requirements=DEFAULT_REQUIREMENTS):
+    """Returns the path of a ready template venv for this requirement set, building it if needed."""
+    key = requirements_key(requirements)
+    template_path = os.path.abspath(os.path.join(TEMPLATES_DIR, key))
+
+    if os.path.isfile(os.path.join(template_path, TEMPLATE_MARKER)):
+        _touch_template(template_path)
+        return template_path
+
+    print(f"\n⏳ Building venv template {key} for: {', '.join(requirements)}")
+    os.makedirs(TEMPLATES_DIR, exist_ok=True)
+    building = f"{template_path}.building-{os.getpid()}"
+
     try:
-        # Create venv
-        subprocess.run([sys.executable, "-m", "venv", venv_path], check=True)
-        print("🎉 Virtual environment created successfully.")
+        subprocess.run([sys.executable, "-m", "venv", building], check=True)
+        _fill_wheel_cache(get_venv_python_executable(building), requirements)
 
-        python_executable = get_venv_python_executable(venv_path)
+        with open(os.path.join(building, TEMPLATE_MARKER), "w", encoding="utf-8") as f:
+            json.dump({"key": key, "requirements": list(requirements),
+                       "created": time.time(), "last_used": time.time()}, f)
 
-        # Install dependencies
-        print("⏳ Installing dependencies: selenium, webdriver-manager, pytest")
-        subprocess.run(
-            [python_executable, "-m", "pip", "install", "--upgrade", "pip", "selenium", "webdriver-manager", "pytest"],
-            check=True
-        )
-        print("🎉 Dependencies installed successfully.")
+        try:
+            os.rename(building, template_path)  # atomic publish
+        except OSError:
+            # another process published the same template first
+            shutil.rmtree(building, ignore_errors=True)
+        else:
+            # venv wrote the build path into activate + shebangs; point them at the published template
+            _retarget_scripts(building, template_path)
 
     except subprocess.CalledProcessError as e:
-        print(f"❌ Error creating virtual environment: {e}")
-        shutil.rmtree(venv_path, ignore_errors=True)
+        print(f"❌ Error building venv template: {e}")
+        print(f"STDOUT: {e.stdout}\nSTDERR: {e.stderr}")
+        shutil.rmtree(building, ignore_errors=True)
         sys.exit(1)
 
+    print(f"🎉 Venv template ready: {template_path}")
+    evict_old_templates(keep=template_path)
+    return template_path
+
+
+def evict_old_templates(max_templates=MAX_TEMPLATES, keep=None):
+    """Deletes least recently used templates beyond `max_templates`."""
+    if not os.path.isdir(TEMPLATES_DIR):
+        return
+
+    templates = []
+    for name in os.listdir(TEMPLATES_DIR):
+        marker = os.path.join(TEMPLATES_DIR, name, TEMPLATE_MARKER)
+        if os.path.isfile(marker):
+            with open(marker, "r", encoding="utf-8") as f:
+                templates.append((json.load(f).get("last_used", 0), os.path.join(TEMPLATES_DIR, name)))
+
+    templates.sort(reverse=True)
+    for _, path in templates[max_templates:]:
+        if path != keep:
+            print(f"🗑️ Evicting old venv template: {path}")
+            shutil.rmtree(path, ignore_errors=True)
+
+
+# --- Per-run clones ---
+
+def _link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copy2(src, dst)
+
+
+def _retarget_scripts(old_path, venv_path):
+    """Rewrites absolute `old_path` paths in bin/ scripts (shebangs, activate) of `venv_path`."""
+    bin_dir = os.path.dirname(get_venv_python_executable(venv_path))
+    old, new = old_path.encode("utf-8"), venv_path.encode("utf-8")
+
+    for name in os.listdir(bin_dir):
+        path = os.path.join(bin_dir, name)
+        if os.path.islink(path) or not os.path.isfile(path):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        if old not in data:
+            continue
+        # the file may be a hardlink into the template: replace it, never edit in place
+        mode = os.stat(path).st_mode
+        os.unlink(path)
+        with open(path, "wb") as f:
+            f.write(data.replace(old, new))
+        os.chmod(path, mode)
+
+
+def clone_template(template_path, venv_path):
+    """Creates a per-run venv from a template using hardlinks (falls back to copies)."""
+    shutil.copytree(template_path, venv_path, symlinks=True, copy_function=_link_or_copy,
+                    ignore=shutil.ignore_patterns(TEMPLATE_MARKER))
+    _retarget_scripts(os.path.abspath(template_path), os.path.abspath(venv_path))
+
+
+def ensure_test_venv_exists(venv_path=TEST_VENV_PATH, requirements=DEFAULT_REQUIREMENTS):
+    """
+    Makes sure `venv_path` is a virtual environment with `requirements`.
+    It is cloned from a cached template, so repeated runs need no pip and no network.
+    """
+    if os.path.isdir(venv_path):
+        print(f"\n✅ Dedicated test venv found: {venv_path}")
+        return
+
+    template_path = ensure_template(requirements)
+    started = time.perf_counter()
+    clone_template(template_path, venv_path)
+    print(f"\n⚡ Test venv cloned from template in {time.perf_counter() - started:.2f}s: {venv_path}")
+
 
 def cleanup_test_venv(venv_path=TEST_VENV_PATH):
-    """Deletes the dedicated venv safely."""
+    """Deletes the per-run venv (the template it was cloned from stays cached)."""
     if os.path.isdir(venv_path):
         print(f"\n🗑️ Cleaning up dedicated test venv: {venv_path}")
         shutil.rmtree(venv_path, ignore_errors=True)